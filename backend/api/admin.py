@@ -1,6 +1,7 @@
 from django.contrib import admin
 
 # Register your models here.
-from .models import HR, Employee
+from .models import HR, Employee, OutboxMessage
 admin.site.register(HR)
-admin.site.register(Employee)
\ No newline at end of file
+admin.site.register(Employee)
+admin.site.register(OutboxMessage)
@@ -0,0 +1,223 @@
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.db.models import Count
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework import status
+
+from .cache import cached_response
+from .db_router import read_replica
+from .endpoints import (
+	EndpointError, employee_list_params, employee_list_queryset, employee_list_rows, hr_password_matches, login_payload,
+	my_tasks_employee,
+)
+from .fieldsets import LEAVE_LIST, TASK_LIST, FieldsetError
+from .models import HR, Employee, Leave, Task
+from .passwords import PasswordPoolUnavailable, acheck_password
+from .search import search_employee_ids
+from .tokens import InvalidToken, averify_token, bearer_token
+from .stats import EMPTY_EMPLOYEE_STATS, aemployee_stats, aleave_status_counts
+from .versions import aprecondition, conditional_collection
+
+
+# Async twins of the read-heavy endpoints, mounted under /api/async/ with the
+# same parameters and response bodies. Under an ASGI server they wait on the
+# database without holding a thread-pool slot for the whole request.
+# Independent queries are awaited together with asyncio.gather; with Django's
+# sync database backends the async ORM still runs them one at a time on the
+# shared database thread, but the event loop keeps serving other requests.
+# Login is here too: it awaits the password pool rather than blocking a thread.
+
+
+async def _alist(qs):
+	return [obj async for obj in qs]
+
+
+def _error(message, code):
+	return JsonResponse({'error': message}, status=code)
+
+
+async def _token_identity(request):
+	"""The TokenUser of a Bearer token (as SignedTokenAuthentication would
+	find it), None without one, or the 401 response for a bad one."""
+	token = bearer_token(request)
+	if token is None:
+		return None
+	try:
+		return await averify_token(token)
+	except InvalidToken as e:
+		response = JsonResponse({'detail': str(e)}, status=status.HTTP_401_UNAUTHORIZED)
+		response['WWW-Authenticate'] = 'Bearer'
+		return response
+
+
+async def _list_response(request, qs, schema):
+	try:
+		names = schema.parse(request.GET.get('fields'))
+	except FieldsetError as e:
+		return _error(str(e), status.HTTP_400_BAD_REQUEST)
+	not_modified = await aprecondition(request)
+	if not_modified is not None:
+		return not_modified
+	rows = await _alist(schema.queryset(qs, names))
+	return JsonResponse(schema.render(rows, names), safe=False)
+
+
+# csrf_exempt like DRF's @api_view, which the sync login goes through
+@csrf_exempt
+@require_POST
+async def login(request):
+	if request.content_type == 'application/json':
+		try:
+			data = json.loads(request.body or b'{}')
+		except ValueError:
+			return _error('Malformed JSON body', status.HTTP_400_BAD_REQUEST)
+	else:
+		data = request.POST
+	email = data.get('email')
+	password = data.get('password')
+	hr = await HR.objects.filter(email=email).afirst()
+	if hr_password_matches(hr, password):
+		return JsonResponse(login_payload('hr', hr))
+	emp = await Employee.objects.filter(email=email).afirst()
+	if emp is not None:
+		try:
+			matched = await acheck_password(password, emp.password)
+		except PasswordPoolUnavailable as e:
+			response = JsonResponse({'detail': str(e.detail)}, status=e.status_code)
+			response['Retry-After'] = str(e.wait)
+			return response
+		if matched:
+			return JsonResponse(login_payload('employee', emp))
+	return _error('Invalid credentials', status.HTTP_401_UNAUTHORIZED)
+
+
+@require_GET
+@cached_response('leaves-status-summary', tags=('Leave',))
+@read_replica
+async def leaves_status_summary(request):
+	try:
+		return JsonResponse(await aleave_status_counts())
+	except Exception as e:
+		return _error(str(e), status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@require_GET
+@cached_response('employees-department-count', tags=('Employee',))
+@read_replica
+async def employees_department_count(request):
+	try:
+		qs = Employee.objects.values('department').annotate(count=Count('id'))
+		data = [{'department': d['department'], 'count': d['count']} async for d in qs]
+		return JsonResponse(data, safe=False)
+	except Exception as e:
+		return _error(str(e), status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@require_GET
+@cached_response('stats-counts', tags=('Employee',))
+@read_replica
+async def stats_counts(request):
+	employees_count, departments_count = await asyncio.gather(
+		Employee.objects.acount(),
+		Employee.objects.values('department').distinct().acount(),
+	)
+	return JsonResponse({'employees_count': employees_count, 'departments_count': departments_count})
+
+
+@require_GET
+@read_replica
+async def attendance_percentage(request, employee_id):
+	try:
+		stats = (await aemployee_stats([employee_id])).get(employee_id)
+		if stats is None:
+			return JsonResponse({'detail': 'No Employee matches the given query.'}, status=status.HTTP_404_NOT_FOUND)
+		return JsonResponse({
+			'employee_id': stats['id'],
+			'employee_name': stats['name'],
+			'total_days': stats['total_days'],
+			'present_days': stats['present_days'],
+			'attendance_percentage': stats['attendance_percent'],
+		})
+	except Exception as e:
+		return _error(str(e), status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@require_GET
+@read_replica
+async def attendance_stats_employee(request):
+	emp_id = request.GET.get('employee')
+	if not emp_id:
+		return _error('Employee ID required', status.HTTP_400_BAD_REQUEST)
+	try:
+		stats = (await aemployee_stats([int(emp_id)])).get(int(emp_id), EMPTY_EMPLOYEE_STATS)
+	except ValueError:
+		return _error('Employee ID must be an integer', status.HTTP_400_BAD_REQUEST)
+	except Exception as e:
+		return _error(str(e), status.HTTP_500_INTERNAL_SERVER_ERROR)
+	return JsonResponse({
+		'total_leaves': stats['approved_leaves'],
+		'pending_leaves': stats['pending_leaves'],
+		'attendance_percent': stats['attendance_percent'],
+	})
+
+
+@require_GET
+@read_replica
+async def employee_list(request):
+	try:
+		department, search, limit = employee_list_params(request.GET)
+	except EndpointError as e:
+		return _error(e.message, e.status_code)
+	ids = await sync_to_async(search_employee_ids)(search, limit=limit, department=department) if search else None
+	queryset, rank = employee_list_queryset(department, search, limit, ids)
+	data = employee_list_rows(await _alist(queryset), rank)
+	return JsonResponse(data, safe=False)
+
+
+@require_GET
+@conditional_collection('leaves')
+async def leave_pending(request):
+	return await _list_response(request, Leave.objects.filter(status='Pending').order_by('-created_at'), LEAVE_LIST)
+
+
+@require_GET
+async def leave_mine(request):
+	emp_id = request.GET.get('employee')
+	if not emp_id:
+		return _error('Employee ID required', status.HTTP_400_BAD_REQUEST)
+	return await _list_response(request, Leave.objects.filter(employee_id=emp_id).order_by('-created_at'), LEAVE_LIST)
+
+
+@require_GET
+@read_replica
+@conditional_collection('tasks')
+async def tasks_my_tasks(request):
+	identity = await _token_identity(request)
+	if isinstance(identity, JsonResponse):
+		return identity
+	try:
+		employee_id, vouched = my_tasks_employee(request.GET, identity)
+	except EndpointError as e:
+		return _error(e.message, e.status_code)
+	try:
+		names = TASK_LIST.parse(request.GET.get('fields'))
+	except FieldsetError as e:
+		return _error(str(e), status.HTTP_400_BAD_REQUEST)
+	qs = TASK_LIST.queryset(Task.objects.filter(employee_id=employee_id).order_by('-created_at'), names)
+	if vouched:
+		not_modified = await aprecondition(request)
+	else:
+		# independent lookups; a 304 only counts once the employee is known to exist
+		exists, not_modified = await asyncio.gather(
+			Employee.objects.filter(pk=employee_id).aexists(),
+			aprecondition(request),
+		)
+		if not exists:
+			return _error('Employee not found', status.HTTP_404_NOT_FOUND)
+	if not_modified is not None:
+		return not_modified
+	return JsonResponse(TASK_LIST.render(await _alist(qs), names), safe=False)
@@ -0,0 +1,124 @@
+from datetime import timedelta
+
+from django.db import connection, transaction
+
+from .cache import invalidate_on_commit
+from .changelog import log_upserts
+from .models import Attendance, Employee, Leave, seconds_since_midnight
+from .rollups import record_attendance_changes
+
+
+# keep each INSERT well under SQLite's bound-parameter limit
+BACKFILL_BATCH_SIZE = 500
+
+
+def _leave_days(leave):
+	"""Yield every date covered by a leave, inclusive of both ends."""
+	current = leave.start_date
+	while current <= leave.end_date:
+		yield current
+		current = current + timedelta(days=1)
+
+
+def backfill_leave_attendance(leaves):
+	"""Mark every day covered by the given approved leaves as 'Leave' attendance.
+
+	Works on any number of leaves at once: existing rows are looked up with one
+	query and the whole date range is written as a batched upsert on
+	(employee, date) inside a single transaction, so the number of round trips
+	does not grow with the length of the leave. The attendance rollups are
+	adjusted in the same transaction.
+
+	Returns: { "inserted": int, "updated": int }
+	"""
+	keys = set()
+	for leave in leaves:
+		for day in _leave_days(leave):
+			keys.add((leave.employee_id, day))
+	if not keys:
+		return {'inserted': 0, 'updated': 0}
+
+	employee_ids = {emp_id for emp_id, _ in keys}
+	first_day = min(day for _, day in keys)
+	last_day = max(day for _, day in keys)
+	rows = [
+		Attendance(
+			employee_id=emp_id, date=day, status='Leave',
+			check_in=None, check_out=None, check_in_seconds=None, check_out_seconds=None,
+		)
+		for emp_id, day in sorted(keys)
+	]
+	with transaction.atomic():
+		existing = {
+			(emp_id, day): (row_status, check_in, check_out)
+			for emp_id, day, row_status, check_in, check_out in
+			Attendance.objects.filter(employee_id__in=employee_ids, date__range=(first_day, last_day))
+			.values_list('employee_id', 'date', 'status', 'check_in', 'check_out')
+		}
+		Attendance.objects.bulk_create(
+			rows,
+			batch_size=BACKFILL_BATCH_SIZE,
+			update_conflicts=True,
+			unique_fields=['employee', 'date'],
+			update_fields=['status', 'check_in', 'check_out', 'check_in_seconds', 'check_out_seconds'],
+		)
+		departments = dict(Employee.objects.filter(id__in=employee_ids).values_list('id', 'department'))
+		record_attendance_changes(
+			(emp_id, departments[emp_id], day, existing.get((emp_id, day)), ('Leave', None, None))
+			for emp_id, day in keys
+		)
+		# bulk_create sends no post_save, so evict dependent responses here
+		invalidate_on_commit('Attendance')
+		# (may also log untouched 'Leave' days in the same range; clients just
+		# receive those rows again)
+		log_upserts(Attendance.objects.filter(employee_id__in=employee_ids, date__range=(first_day, last_day), status='Leave'))
+	updated = len(keys & existing.keys())
+	return {'inserted': len(keys) - updated, 'updated': updated}
+
+
+def insert_check_in(employee_id, day, check_in):
+	"""Record today's check-in in a single statement, if that is all it takes.
+
+	One INSERT ... SELECT ... ON CONFLICT DO NOTHING both confirms the
+	employee exists and has no approved leave covering `day`, and creates the
+	Present row; the unique (employee, date) constraint settles concurrent
+	callers. RETURNING hands back the row plus the employee fields the
+	response and rollups need, so no follow-up SELECT is required.
+
+	Returns an unsaved-looking Attendance with .employee populated, or None
+	when nothing was inserted (unknown employee, approved leave, or a row for
+	the day already exists); callers fall back to the slow path then.
+	"""
+	qn = connection.ops.quote_name
+	att = qn(Attendance._meta.db_table)
+	emp = qn(Employee._meta.db_table)
+	leave = qn(Leave._meta.db_table)
+	seconds = seconds_since_midnight(check_in)
+	date_param = Attendance._meta.get_field('date').get_db_prep_value(day, connection)
+	time_param = Attendance._meta.get_field('check_in').get_db_prep_value(check_in, connection)
+	sql = f'''
+		INSERT INTO {att} ("employee_id", "date", "status", "check_in", "check_out", "check_in_seconds", "check_out_seconds")
+		SELECT e."id", %s, 'Present', %s, NULL, %s, NULL
+		FROM {emp} e
+		WHERE e."id" = %s AND NOT EXISTS (
+			SELECT 1 FROM {leave} l
+			WHERE l."employee_id" = e."id" AND l."status" = 'Approved'
+				AND l."start_date" <= %s AND l."end_date" >= %s
+		)
+		ON CONFLICT ("employee_id", "date") DO NOTHING
+		RETURNING "id",
+			(SELECT "name" FROM {emp} WHERE "id" = {att}."employee_id"),
+			(SELECT "email" FROM {emp} WHERE "id" = {att}."employee_id"),
+			(SELECT "department" FROM {emp} WHERE "id" = {att}."employee_id")
+	'''
+	with connection.cursor() as cursor:
+		cursor.execute(sql, [date_param, time_param, seconds, employee_id, date_param, date_param])
+		row = cursor.fetchone()
+	if row is None:
+		return None
+	pk, name, email, department = row
+	employee = Employee(id=employee_id, name=name, email=email, department=department)
+	return Attendance(
+		id=pk, employee=employee, date=day, status='Present',
+		check_in=check_in, check_out=None, check_in_seconds=seconds, check_out_seconds=None,
+	)
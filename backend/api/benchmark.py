@@ -0,0 +1,379 @@
+import http.client
+import io
+import json
+import re
+import time
+from contextlib import nullcontext
+from datetime import time as time_of_day, timedelta
+from urllib.parse import urlencode, urlsplit
+
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import URLPattern, resolve, reverse
+from django.utils import timezone
+
+from .dataset import SYNTHETIC_PASSWORD
+from .models import HR, Attendance, Employee, Leave, Task
+from .tokens import issue_token
+from .urls import urlpatterns
+
+
+# End-to-end benchmark of every route in api/urls.py (see `manage.py bench_api`).
+# Each route has a request spec below, built from a fixture of real ids in the
+# database (best with a generate_dataset dataset). In-process runs use the
+# Django test client and roll every write back, so the data never drifts;
+# against a running server only safe methods run unless writes are asked for.
+# Reports are JSON and compare_reports() diffs one against a baseline.
+
+REPORT_VERSION = 1
+
+
+def _today(days=0):
+	return (timezone.localdate() + timedelta(days=days)).isoformat()
+
+
+def _import_csv(f):
+	rows = ['name,email,password,department,designation,salary']
+	rows += [f'Bench Import {i},bench.import.{i}@bench.invalid,{SYNTHETIC_PASSWORD},Engineering,Dev,50000' for i in range(10)]
+	upload = io.BytesIO('\n'.join(rows).encode())
+	upload.name = 'employees.csv'
+	return {'file': upload, 'hr': f['hr'].id}
+
+
+def _checked_in_today(f):
+	Attendance.objects.update_or_create(
+		employee=f['employee'], date=timezone.localdate(), defaults={'status': 'Present', 'check_in': time_of_day(9)},
+	)
+
+
+# route name -> request: method, kwargs (URL), params (query), data (body,
+# JSON unless multipart); callables receive the fixture. setup runs in the
+# rolled-back transaction before each (untimed) in-process request;
+# max_requests caps the password-hashing routes. 'skip' gives a reason.
+ROUTE_SPECS = {
+	'login': {'method': 'POST', 'max_requests': 10, 'data': lambda f: {'email': f['employee'].email, 'password': SYNTHETIC_PASSWORD}},
+	'logout': {'method': 'POST', 'data': lambda f: {'token': issue_token('employee', f['employee'].id, f['hr'].id)}},
+	'employee_list_by_hr': {'params': lambda f: {'hr_id': f['hr'].id}},
+	'employee_create': {'method': 'POST', 'max_requests': 10, 'data': lambda f: {
+		'name': 'Bench Hire', 'email': 'bench.hire@bench.invalid', 'password': SYNTHETIC_PASSWORD,
+		'department': f['employee'].department, 'designation': 'Dev', 'salary': '50000.00', 'hr': f['hr'].id,
+	}},
+	'employee_import': {'method': 'POST', 'multipart': True, 'max_requests': 5, 'data': _import_csv},
+	'employee_detail': {'kwargs': lambda f: {'pk': f['employee'].id}},
+	'employee_update': {'method': 'PUT', 'kwargs': lambda f: {'pk': f['employee'].id}, 'data': {'designation': 'Senior Dev'}},
+	'employee_delete': {'method': 'DELETE', 'kwargs': lambda f: {'pk': f['employee'].id}},
+	'stats-counts': {},
+	'response-cache-stats': {},
+	'write-queue-stats': {},
+	'password-pool-stats': {},
+	'employee-list': {'params': lambda f: {'search': f['employee'].name.split()[-1][:5]}},
+	'leave-request': {'method': 'POST', 'data': lambda f: {
+		'employee': f['employee'].id, 'start_date': _today(60), 'end_date': _today(61), 'reason': 'Benchmark',
+	}},
+	'leave-mine': {'params': lambda f: {'employee': f['employee'].id}},
+	'leave-pending': {},
+	'leave-summary': {'params': lambda f: {'employee': f['employee'].id}},
+	'leaves-status-summary': {},
+	'leave-action': {'method': 'POST', 'kwargs': lambda f: {'leave_id': f['pending_leave_ids'][0]}, 'data': {'action': 'approve'}},
+	'leave-export': {'params': {'status': 'Pending'}},
+	'leave-action-bulk': {'method': 'POST', 'data': lambda f: {'action': 'reject', 'leave_ids': f['pending_leave_ids']}},
+	'employees-department-count': {},
+	'attendance-mark': {'method': 'POST', 'data': lambda f: {'employee': f['employee'].id}},
+	'attendance-checkout': {'method': 'POST', 'setup': _checked_in_today, 'data': lambda f: {'employee': f['employee'].id}},
+	'attendance-list': {'params': lambda f: {'employee': f['employee'].id, 'page_size': 100}},
+	'attendance-export': {'params': lambda f: {'employee': f['employee'].id}},
+	'attendance-update': {'method': 'PUT', 'kwargs': lambda f: {'pk': f['attendance'].id}, 'data': {'status': 'Present'}},
+	'attendance-stats-employee': {'params': lambda f: {'employee': f['employee'].id}},
+	'attendance-stats-team': {'params': lambda f: {'hr_id': f['hr'].id}},
+	'attendance-stats-punctuality': {'params': {'days': 30, 'limit': 20}},
+	'attendance-stats-hr': {'params': {'days': 30}},
+	'attendance-percentage': {'kwargs': lambda f: {'employee_id': f['employee'].id}},
+	'events-stream': {'skip': 'Server-Sent Events stream: ASGI only and never completes'},
+	'events-stats': {},
+	'sync-changes': {'params': lambda f: {'employee': f['employee'].id, 'since': 0}},
+	'tasks-list-create': {'params': lambda f: {'hr_id': f['hr'].id}},
+	'tasks-export': {'params': lambda f: {'hr_id': f['hr'].id}},
+	'tasks-my-tasks': {'params': lambda f: {'employee': f['employee'].id}},
+	'tasks-update-status': {'method': 'PATCH', 'kwargs': lambda f: {'pk': f['task'].id}, 'data': lambda f: {
+		'employee': f['employee'].id, 'status': Task.STATUS_COMPLETED,
+	}},
+	'employee-change-password': {'method': 'POST', 'max_requests': 10, 'data': lambda f: {
+		'employee': f['employee'].id, 'old_password': SYNTHETIC_PASSWORD,
+		'new_password': 'bench-pass-2', 'confirm_password': 'bench-pass-2',
+	}},
+	'async-stats-counts': {},
+	'async-employee-list': {'params': lambda f: {'search': f['employee'].name.split()[-1][:5]}},
+	'async-employees-department-count': {},
+	'async-leave-pending': {},
+	'async-leave-mine': {'params': lambda f: {'employee': f['employee'].id}},
+	'async-leaves-status-summary': {},
+	'async-attendance-stats-employee': {'params': lambda f: {'employee': f['employee'].id}},
+	'async-attendance-percentage': {'kwargs': lambda f: {'employee_id': f['employee'].id}},
+	'async-tasks-my-tasks': {'params': lambda f: {'employee': f['employee'].id}},
+	'async-login': {'method': 'POST', 'max_requests': 10, 'data': lambda f: {'email': f['employee'].email, 'password': SYNTHETIC_PASSWORD}},
+}
+
+
+def route_names():
+	return [p.name for p in urlpatterns if isinstance(p, URLPattern) and p.name]
+
+
+def load_fixture():
+	"""Real ids for the request specs: the HR with the most employees, one of
+	their employees that has tasks and attendance, and pending leaves."""
+	hr = HR.objects.annotate(staff=Count('employees')).filter(staff__gt=0).order_by('-staff', 'id').first()
+	if hr is None:
+		raise LookupError('no HR with employees; run generate_dataset first')
+	employee = Employee.objects.filter(hr=hr, tasks__isnull=False, attendances__isnull=False).order_by('id').first()
+	employee = employee or hr.employees.order_by('id').first()
+	pending = list(Leave.objects.filter(status='Pending').order_by('id').values_list('id', flat=True)[:20])
+	return {
+		'hr': hr,
+		'employee': employee,
+		'task': Task.objects.filter(employee=employee).order_by('id').first(),
+		'attendance': Attendance.objects.filter(employee=employee).order_by('-date').first(),
+		'pending_leave_ids': pending or [0],
+	}
+
+
+def _resolve(value, fixture):
+	return value(fixture) if callable(value) else value
+
+
+class RouteRequest:
+
+	def __init__(self, method, path, params, data, multipart, setup):
+		self.method = method
+		self.path = path
+		self.params = params
+		self.data = data
+		self.multipart = multipart
+		self.setup = setup
+
+
+def build_request(name, fixture):
+	"""The RouteRequest for a route, or None when it is skipped."""
+	spec = ROUTE_SPECS[name]
+	if 'skip' in spec:
+		return None
+	setup = spec.get('setup')
+	return RouteRequest(
+		spec.get('method', 'GET'), reverse(name, kwargs=_resolve(spec.get('kwargs'), fixture) or None),
+		_resolve(spec.get('params'), fixture) or {}, _resolve(spec.get('data'), fixture), spec.get('multipart', False),
+		(lambda: setup(fixture)) if setup else None,
+	)
+
+
+def _percentile(sorted_values, fraction):
+	return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def _summary(method, path, latencies, status_code, size, queries):
+	latencies = sorted(latencies)
+	return {
+		'method': method,
+		'path': path,
+		'status': status_code,
+		'requests': len(latencies),
+		'p50_ms': round(_percentile(latencies, 0.50) * 1000, 3),
+		'p95_ms': round(_percentile(latencies, 0.95) * 1000, 3),
+		'p99_ms': round(_percentile(latencies, 0.99) * 1000, 3),
+		'mean_ms': round(sum(latencies) / len(latencies) * 1000, 3),
+		# one client, back to back: requests per second of handler time
+		'throughput_rps': round(len(latencies) / sum(latencies), 1) if sum(latencies) else None,
+		'queries': queries,
+		'bytes': size,
+	}
+
+
+class _InProcess:
+	"""Drive a route through the Django test client, rolling writes back."""
+
+	def __init__(self):
+		self.client = Client()
+
+	def _send(self, req):
+		if req.method == 'GET':
+			return self.client.get(req.path, req.params)
+		query = ('?' + urlencode(req.params)) if req.params else ''
+		if req.multipart:
+			for value in req.data.values():
+				if hasattr(value, 'seek'):
+					value.seek(0)
+			return self.client.post(req.path + query, req.data)
+		body = json.dumps(req.data) if req.data is not None else ''
+		return getattr(self.client, req.method.lower())(req.path + query, body, content_type='application/json')
+
+	def request(self, req, count_queries=False):
+		"""Returns (status, body bytes, seconds, queries or None)."""
+		with transaction.atomic():
+			if req.setup:
+				req.setup()
+			with CaptureQueriesContext(connection) if count_queries else nullcontext() as ctx:
+				start = time.perf_counter()
+				response = self._send(req)
+				body = b''.join(response.streaming_content) if response.streaming else response.content
+				elapsed = time.perf_counter() - start
+			transaction.set_rollback(True)
+		queries = None
+		if count_queries:
+			# savepoints of the rollback wrapper and of the view are not queries
+			queries = sum(1 for q in ctx.captured_queries if not re.match(r'\s*(BEGIN|SAVEPOINT|RELEASE|ROLLBACK)', q['sql']))
+		return response.status_code, len(body), elapsed, queries
+
+
+class _Server:
+	"""Drive a route over keep-alive HTTP; query counts come from /metrics."""
+
+	def __init__(self, base_url):
+		parts = urlsplit(base_url)
+		self.host, self.port = parts.hostname, parts.port or 80
+		self.prefix = parts.path.rstrip('/')
+		self.connection = http.client.HTTPConnection(self.host, self.port, timeout=60)
+
+	def _send(self, req):
+		url = self.prefix + req.path + (('?' + urlencode(req.params)) if req.params else '')
+		headers = {}
+		body = None
+		if req.data is not None:
+			body = json.dumps(req.data)
+			headers['Content-Type'] = 'application/json'
+		start = time.perf_counter()
+		try:
+			self.connection.request(req.method, url, body, headers)
+			response = self.connection.getresponse()
+			size = len(response.read())
+		except (OSError, http.client.HTTPException):
+			self.connection.close()
+			raise
+		return response.status, size, time.perf_counter() - start
+
+	def _counters(self, name):
+		self.connection.request('GET', self.prefix + '/metrics')
+		response = self.connection.getresponse()
+		text = response.read().decode()
+		if response.status != 200:
+			return None, None
+		requests = queries = 0.0
+		for line in text.splitlines():
+			if f'route="{name}"' not in line:
+				continue
+			value = float(line.rpartition(' ')[2])
+			if line.startswith('api_requests_total{'):
+				requests += value
+			elif line.startswith('api_db_queries_total{'):
+				queries += value
+		return requests, queries
+
+	def request(self, req, count_queries=False):
+		"""Returns (status, body bytes, seconds, queries or None)."""
+		if not count_queries:
+			return self._send(req) + (None,)
+		name = resolve(req.path).url_name
+		before_requests, before_queries = self._counters(name)
+		result = self._send(req)
+		after_requests, after_queries = self._counters(name)
+		queries = None
+		if None not in (before_requests, after_requests) and after_requests > before_requests:
+			queries = round((after_queries - before_queries) / (after_requests - before_requests))
+		return result + (queries,)
+
+
+def run_benchmark(requests=50, warmup=5, routes=None, base_url=None, include_writes=False, progress=None):
+	"""Time every route (or the named `routes`): `warmup` untimed requests,
+	then `requests` sequential timed ones (fewer for routes with
+	max_requests), then one with its queries counted.
+
+	Returns the report: { "version", "created_at", "mode", "requests", "warmup",
+	"dataset": {table: rows}, "routes": {name: {method, path, status, requests,
+	p50_ms, p95_ms, p99_ms, mean_ms, throughput_rps, queries, bytes} or {"skipped": reason}} }
+	"""
+	fixture = load_fixture()
+	driver = _Server(base_url) if base_url else _InProcess()
+	report = {
+		'version': REPORT_VERSION,
+		'created_at': timezone.now().isoformat(),
+		'mode': 'server' if base_url else 'client',
+		'requests': requests,
+		'warmup': warmup,
+		'dataset': {model.__name__: model.objects.count() for model in (HR, Employee, Attendance, Leave, Task)},
+		'routes': {},
+	}
+	names = route_names()
+	unknown = set(routes or ()) - set(names)
+	if unknown:
+		raise LookupError('unknown routes: ' + ', '.join(sorted(unknown)))
+	# writes go straight to the database instead of the single-writer queue, so
+	# they run inside the rollback wrapper
+	with override_settings(WRITE_QUEUE_ENABLED=False):
+		for name in names:
+			if routes and name not in routes:
+				continue
+			if name not in ROUTE_SPECS:
+				report['routes'][name] = {'skipped': 'no request spec in api/benchmark.py'}
+				continue
+			built = build_request(name, fixture)
+			if built is None:
+				report['routes'][name] = {'skipped': ROUTE_SPECS[name]['skip']}
+				continue
+			if base_url and built.method != 'GET' and not include_writes:
+				report['routes'][name] = {'skipped': 'write route; pass include_writes to run it against a server'}
+				continue
+			if base_url and (built.multipart or built.setup):
+				report['routes'][name] = {'skipped': 'needs in-process setup or a multipart upload'}
+				continue
+			for _ in range(warmup):
+				driver.request(built)
+			latencies = []
+			for _ in range(min(requests, ROUTE_SPECS[name].get('max_requests', requests))):
+				status_code, size, seconds, _ = driver.request(built)
+				latencies.append(seconds)
+			queries = driver.request(built, count_queries=True)[3]
+			report['routes'][name] = _summary(built.method, built.path, latencies, status_code, size, queries)
+			if progress:
+				progress(name, report['routes'][name])
+	return report
+
+
+def compare_reports(current, baseline, max_latency_increase=0.5, max_throughput_drop=0.25, max_query_increase=0,
+		min_latency_delta_ms=1.0):
+	"""Diff a report against a baseline, route by route.
+
+	A route regresses when its p95 grows by more than max_latency_increase
+	(a fraction) and by at least min_latency_delta_ms, its throughput drops
+	by more than max_throughput_drop, it runs more than max_query_increase
+	extra queries, or it now answers with a different status class.
+	Returns: [ { "route", "metric", "baseline", "current", "change", "regression": bool } ]
+	"""
+	rows = []
+	for name in sorted(set(baseline['routes']) | set(current['routes'])):
+		old, new = baseline['routes'].get(name), current['routes'].get(name)
+		old_measured = old is not None and 'skipped' not in old
+		new_measured = new is not None and 'skipped' not in new
+		if not (old_measured and new_measured):
+			if old_measured != new_measured:
+				# a route that stopped being measured is a regression; a new one is not
+				rows.append({'route': name, 'metric': 'coverage', 'baseline': 'measured' if old_measured else None,
+					'current': 'measured' if new_measured else (new or {}).get('skipped', 'missing'), 'change': None,
+					'regression': old_measured})
+			continue
+		if old['status'] // 100 != new['status'] // 100:
+			rows.append({'route': name, 'metric': 'status', 'baseline': old['status'], 'current': new['status'],
+				'change': None, 'regression': True})
+		delta = new['p95_ms'] - old['p95_ms']
+		change = delta / old['p95_ms'] if old['p95_ms'] else None
+		rows.append({'route': name, 'metric': 'p95_ms', 'baseline': old['p95_ms'], 'current': new['p95_ms'], 'change': change,
+			'regression': change is not None and change > max_latency_increase and delta >= min_latency_delta_ms})
+		if old.get('throughput_rps') and new.get('throughput_rps'):
+			change = new['throughput_rps'] / old['throughput_rps'] - 1
+			# as with p95, ignore drops that cost less than min_latency_delta_ms per request
+			slower_ms = (1 / new['throughput_rps'] - 1 / old['throughput_rps']) * 1000
+			rows.append({'route': name, 'metric': 'throughput_rps', 'baseline': old['throughput_rps'],
+				'current': new['throughput_rps'], 'change': change,
+				'regression': -change > max_throughput_drop and slower_ms >= min_latency_delta_ms})
+		if old.get('queries') is not None and new.get('queries') is not None:
+			rows.append({'route': name, 'metric': 'queries', 'baseline': old['queries'], 'current': new['queries'],
+				'change': new['queries'] - old['queries'], 'regression': new['queries'] - old['queries'] > max_query_increase})
+	return rows
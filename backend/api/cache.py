@@ -0,0 +1,113 @@
+import functools
+import hashlib
+from urllib.parse import urlencode
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+from rest_framework.response import Response
+
+
+# Entries are keyed by endpoint, query string and the current version of each
+# model tag they depend on. Invalidating a tag bumps its version, so every
+# entry built from the old version stops matching and is never served again.
+# Versions and counters live in the cache itself, which makes them shared
+# across worker processes when a shared backend (file) is configured.
+
+TAG_PREFIX = 'resp-tag:'
+STAT_PREFIX = 'resp-stat:'
+STAT_NAMES = ('hits', 'misses', 'evictions')
+
+
+def _cache():
+	return caches[getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default')]
+
+
+def _timeout():
+	return getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300)
+
+
+def _incr(key, delta=1):
+	cache = _cache()
+	try:
+		return cache.incr(key, delta)
+	except ValueError:
+		# first use: add() so a concurrent creator is not overwritten
+		if not cache.add(key, delta, timeout=None):
+			return cache.incr(key, delta)
+		return delta
+
+
+def _tag_versions(tags):
+	keys = [TAG_PREFIX + tag for tag in tags]
+	found = _cache().get_many(keys)
+	return [str(found.get(key, 0)) for key in keys]
+
+
+def _cache_key(endpoint, query_params, tags):
+	query = urlencode(sorted(query_params.lists()), doseq=True)
+	digest = hashlib.sha1(query.encode()).hexdigest()
+	return 'resp:{}:{}:{}'.format(endpoint, digest, '.'.join(_tag_versions(tags)))
+
+
+def cached_response(endpoint, tags):
+	"""Cache-aside for GET views whose data depends only on the given model tags.
+
+	Only 200 responses are stored. Apply beneath @api_view (or via
+	method_decorator on an APIView's get). On an async view the rendered
+	JSON body is stored instead of response.data.
+	"""
+	def decorator(view):
+		if iscoroutinefunction(view):
+			@functools.wraps(view)
+			async def async_wrapper(request, *args, **kwargs):
+				key = _cache_key('async:' + endpoint, request.GET, tags)
+				cached = _cache().get(key)
+				if cached is not None:
+					_incr(STAT_PREFIX + 'hits')
+					return HttpResponse(cached, content_type='application/json')
+				_incr(STAT_PREFIX + 'misses')
+				response = await view(request, *args, **kwargs)
+				if response.status_code == 200:
+					_cache().set(key, response.content, _timeout())
+				return response
+			return async_wrapper
+
+		@functools.wraps(view)
+		def wrapper(request, *args, **kwargs):
+			key = _cache_key(endpoint, request.GET, tags)
+			cached = _cache().get(key)
+			if cached is not None:
+				_incr(STAT_PREFIX + 'hits')
+				return Response(cached)
+			_incr(STAT_PREFIX + 'misses')
+			response = view(request, *args, **kwargs)
+			if response.status_code == 200:
+				_cache().set(key, response.data, _timeout())
+			return response
+		return wrapper
+	return decorator
+
+
+def invalidate_tags(*tags):
+	"""Evict every cached response that depends on any of the given model tags."""
+	for tag in tags:
+		_incr(TAG_PREFIX + tag)
+		_incr(STAT_PREFIX + 'evictions')
+
+
+def invalidate_on_commit(*tags):
+	"""Invalidate once the current transaction commits, so a concurrent reader
+	cannot re-cache the pre-commit data under the new tag version."""
+	transaction.on_commit(lambda: invalidate_tags(*tags))
+
+
+def cache_stats():
+	"""Response: { "hits", "misses", "evictions", "hit_ratio" }"""
+	found = _cache().get_many([STAT_PREFIX + name for name in STAT_NAMES])
+	stats = {name: found.get(STAT_PREFIX + name, 0) for name in STAT_NAMES}
+	lookups = stats['hits'] + stats['misses']
+	stats['hit_ratio'] = round(stats['hits'] / lookups, 4) if lookups else 0
+	return stats
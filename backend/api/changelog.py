@@ -0,0 +1,155 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Value
+from django.utils import timezone
+
+from .models import Attendance, ChangeLogEntry, Employee, Leave, Task
+from .serializers import AttendanceSerializer, LeaveSerializer, TaskSerializer
+
+
+# Delta sync: every write to a leave, task or attendance row appends a
+# ChangeLogEntry in the same transaction, and /sync/ returns the entries
+# after a client's cursor. Entry ids come from SQLite's AUTOINCREMENT and
+# writers are serialized, so ids grow in commit order and a cursor never
+# skips a change that commits later. (A database with concurrent writers
+# would need a commit-ordered sequence instead.)
+#
+# prune_changelog() (`manage.py prune_changelog`) deletes entries older than
+# CHANGELOG_RETENTION_DAYS but always keeps the newest one. Ids have no gaps
+# other than pruned ones, so a cursor from before the oldest remaining entry
+# may have missed changes: /sync/ answers it 410 and the client reloads.
+
+# model -> (log key, response key, serializer, select_related)
+SYNC_MODELS = {
+	Task: ('task', 'tasks', TaskSerializer, ('hr', 'employee')),
+	Leave: ('leave', 'leaves', LeaveSerializer, ('employee',)),
+	Attendance: ('attendance', 'attendance', AttendanceSerializer, ('employee',)),
+}
+DEFAULT_SYNC_LIMIT = 500
+MAX_SYNC_LIMIT = 5000
+
+
+def _hr_lookup(model):
+	# tasks belong to the assigning HR; leaves and attendance to the employee's
+	return 'hr_id' if model is Task else 'employee__hr_id'
+
+
+def _log_rows(qs, action, hr_id=None):
+	# one INSERT ... SELECT; hr_id overrides the scope the rows have now
+	key = SYNC_MODELS[qs.model][0]
+	hr = _hr_lookup(qs.model) if hr_id is None else Value(hr_id)
+	rows = qs.order_by().values_list('id', 'employee_id', hr)
+	sql, params = rows.query.get_compiler(connection=connection).as_sql()
+	qn = connection.ops.quote_name
+	columns = ', '.join(qn(c) for c in ('model', 'action', 'created_at', 'object_id', 'employee_id', 'hr_id'))
+	now = connection.ops.adapt_datetimefield_value(timezone.now())
+	with connection.cursor() as cursor:
+		cursor.execute(
+			f'INSERT INTO {qn(ChangeLogEntry._meta.db_table)} ({columns}) '
+			f'SELECT %s, %s, %s, changed.* FROM ({sql}) changed',
+			[key, action, now, *params],
+		)
+
+
+def log_upserts(qs):
+	"""Append an upsert entry for every row of qs, in one INSERT ... SELECT.
+
+	Use for writes that send no post_save (bulk_create, update(), raw SQL);
+	call inside the writing transaction.
+	"""
+	_log_rows(qs, ChangeLogEntry.ACTION_UPSERT)
+
+
+def log_employee_moved(employee_id, old_hr_id):
+	"""An employee now reports to another HR: their leaves and attendance
+	leave the old HR's scope (tombstones) and join the new one (upserts)."""
+	for model in (Leave, Attendance):
+		rows = model.objects.filter(employee_id=employee_id)
+		if old_hr_id is not None:
+			_log_rows(rows, ChangeLogEntry.ACTION_DELETE, hr_id=old_hr_id)
+		_log_rows(rows, ChangeLogEntry.ACTION_UPSERT)
+
+
+def log_moved_out(instance, old_employee):
+	"""A leave or attendance row is moving to another employee: tombstone it
+	in the old employee's scope (and their HR's). Call before the save that
+	logs the upsert, so an HR scope holding both employees ends on it."""
+	ChangeLogEntry.objects.create(
+		model=SYNC_MODELS[type(instance)][0], object_id=instance.pk, employee_id=old_employee.id,
+		hr_id=old_employee.hr_id, action=ChangeLogEntry.ACTION_DELETE,
+	)
+
+
+def log_delete(instance):
+	"""Append a tombstone for a deleted leave, task or attendance row."""
+	model = type(instance)
+	if model is Task:
+		hr_id = instance.hr_id
+	else:
+		# during a cascade the employee row is deleted after its dependents
+		hr_id = Employee.objects.filter(pk=instance.employee_id).values_list('hr_id', flat=True).first()
+	ChangeLogEntry.objects.create(
+		model=SYNC_MODELS[model][0], object_id=instance.pk, employee_id=instance.employee_id,
+		hr_id=hr_id, action=ChangeLogEntry.ACTION_DELETE,
+	)
+
+
+def head_cursor():
+	"""Cursor for 'now': take it before a full load, then sync from it."""
+	return str(ChangeLogEntry.objects.order_by('-id').values_list('id', flat=True).first() or 0)
+
+
+def prune_changelog(now=None):
+	"""Delete entries older than CHANGELOG_RETENTION_DAYS, keeping the newest
+	one so the cursor sequence (and expired-cursor detection) survives.
+	Returns the number of entries deleted."""
+	now = now or timezone.now()
+	cutoff = now - timedelta(days=getattr(settings, 'CHANGELOG_RETENTION_DAYS', 30))
+	latest = ChangeLogEntry.objects.order_by('-id').values_list('id', flat=True).first()
+	return ChangeLogEntry.objects.filter(created_at__lt=cutoff).exclude(id=latest).delete()[0]
+
+
+def cursor_expired(since):
+	"""True when entries after `since` may have been pruned."""
+	oldest = ChangeLogEntry.objects.order_by('id').values_list('id', flat=True).first()
+	return oldest is not None and since < oldest - 1
+
+
+def changes_since(since, employee_id=None, hr_id=None, limit=DEFAULT_SYNC_LIMIT):
+	"""Return the records changed after cursor `since` for one employee or HR.
+
+	Several entries for the same record collapse into its current state, or
+	a tombstone id when it no longer exists. At most `limit` log entries are
+	consumed per call; has_more says whether to ask again from `next`.
+
+	Returns: { "changes": {tasks, leaves, attendance: [...]},
+	"deleted": {tasks, leaves, attendance: [ids]}, "next": str, "has_more": bool }
+	"""
+	entries = ChangeLogEntry.objects.filter(id__gt=since)
+	entries = entries.filter(employee_id=employee_id) if employee_id is not None else entries.filter(hr_id=hr_id)
+	entries = list(entries.order_by('id').values_list('id', 'model', 'object_id', 'action')[:limit + 1])
+	has_more = len(entries) > limit
+	entries = entries[:limit]
+
+	latest = {}
+	for _, key, object_id, action in entries:
+		latest[(key, object_id)] = action
+	changes = {response_key: [] for _, response_key, _, _ in SYNC_MODELS.values()}
+	deleted = {response_key: [] for response_key in changes}
+	for model, (key, response_key, serializer_class, related) in SYNC_MODELS.items():
+		ids = {object_id for (k, object_id), action in latest.items() if k == key and action == ChangeLogEntry.ACTION_UPSERT}
+		gone = {object_id for (k, object_id), action in latest.items() if k == key and action == ChangeLogEntry.ACTION_DELETE}
+		if ids:
+			rows = list(model.objects.filter(id__in=ids).select_related(*related).order_by('id'))
+			changes[response_key] = serializer_class(rows, many=True).data
+			# upserted then deleted by a write after this batch's last entry
+			gone |= ids - {row.id for row in rows}
+		deleted[response_key] = sorted(gone)
+	return {
+		'changes': changes,
+		'deleted': deleted,
+		'next': str(entries[-1][0]) if entries else str(since),
+		'has_more': has_more,
+	}
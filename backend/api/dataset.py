@@ -0,0 +1,187 @@
+import random
+from datetime import time, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .cache import invalidate_tags
+from .models import HR, Attendance, Employee, Leave, Task, seconds_since_midnight
+from .rollups import rebuild_rollups
+from .versions import bump_for_model
+
+
+# Seeded synthetic dataset for benchmarks (see `manage.py generate_dataset`).
+# The same parameters and seed always produce the same rows. Inserts are
+# bulk (bulk_create, and executemany for the attendance volume), so no
+# signals run: collection versions, the response cache and the attendance
+# rollups are refreshed once at the end, and nothing is written to the
+# delta-sync change log, so clients should reload from head_cursor().
+
+EMAIL_DOMAIN = 'synthetic.invalid'
+# every generated employee signs in with this password; HR passwords are
+# stored as given, so they sign in with it too
+SYNTHETIC_PASSWORD = 'synthetic-pass'
+
+DEPARTMENTS = {
+	'Engineering': ('Software Engineer', 'Senior Engineer', 'QA Engineer', 'DevOps Engineer', 'Engineering Manager'),
+	'Sales': ('Account Executive', 'Sales Manager', 'Sales Associate'),
+	'Marketing': ('Marketing Specialist', 'Content Writer', 'Marketing Manager'),
+	'Finance': ('Accountant', 'Financial Analyst', 'Controller'),
+	'Support': ('Support Agent', 'Support Lead'),
+	'Operations': ('Operations Analyst', 'Office Manager', 'Logistics Coordinator'),
+	'People': ('Recruiter', 'HR Generalist'),
+}
+FIRST_NAMES = (
+	'Aarav', 'Aisha', 'Amelia', 'Arjun', 'Carlos', 'Chen', 'Diego', 'Elena', 'Emma', 'Fatima', 'Hana', 'Ivan',
+	'Jamal', 'Kenji', 'Lena', 'Liam', 'Maya', 'Mohammed', 'Nadia', 'Noah', 'Olivia', 'Priya', 'Rahul', 'Sara',
+	'Sofia', 'Tariq', 'Wei', 'Yusuf', 'Zara', 'Zoe',
+)
+LAST_NAMES = (
+	'Ahmed', 'Brown', 'Chen', 'Costa', 'Dubois', 'Garcia', 'Gupta', 'Hansen', 'Ivanova', 'Jones', 'Kim', 'Kowalski',
+	'Lopez', 'Martin', 'Meyer', 'Nguyen', 'Okafor', 'Patel', 'Rossi', 'Sato', 'Schmidt', 'Silva', 'Singh', 'Smith',
+	'Tanaka', 'Wang', 'Williams', 'Yilmaz',
+)
+LEAVE_REASONS = ('Vacation', 'Medical appointment', 'Family event', 'Sick leave', 'Personal errand', 'Conference travel')
+TASK_TITLES = (
+	'Prepare quarterly report', 'Review pull requests', 'Update onboarding docs', 'Customer follow-up',
+	'Plan team offsite', 'Audit expense claims', 'Fix reported bug', 'Draft proposal', 'Inventory check',
+)
+TASK_PRIORITIES = (Task.PRIORITY_LOW, Task.PRIORITY_MEDIUM, Task.PRIORITY_MEDIUM, Task.PRIORITY_HIGH)
+
+
+def _clock(seconds):
+	seconds = max(0, min(int(seconds), 86399))
+	return time(seconds // 3600, seconds % 3600 // 60, seconds % 60)
+
+
+def _leaves(rng, employee_id, first_day, today, per_year):
+	"""Non-overlapping leaves across the window, plus maybe one upcoming request."""
+	rows = []
+	span = (today - first_day).days
+	count = round(per_year * span / 365)
+	if count:
+		stride = span // count
+		for i in range(count):
+			start = first_day + timedelta(days=i * stride + rng.randrange(max(stride - 5, 1)))
+			end = min(start + timedelta(days=rng.choice((0, 0, 1, 2, 4))), today - timedelta(days=1))
+			if end < start:
+				continue
+			status = 'Approved' if rng.random() < 0.85 else 'Rejected'
+			rows.append(Leave(employee_id=employee_id, start_date=start, end_date=end, reason=rng.choice(LEAVE_REASONS), status=status))
+	if rng.random() < 0.3:
+		start = today + timedelta(days=rng.randrange(3, 40))
+		rows.append(Leave(
+			employee_id=employee_id, start_date=start, end_date=start + timedelta(days=rng.randrange(0, 5)),
+			reason=rng.choice(LEAVE_REASONS), status='Pending',
+		))
+	return rows
+
+
+def _attendance(rng, employee_id, workdays, on_leave, adapt_date, adapt_time):
+	# a per-employee habit keeps the punctuality ranking meaningful
+	usual_check_in = rng.gauss(9 * 3600, 15 * 60)
+	for day in workdays:
+		if day in on_leave:
+			yield (employee_id, adapt_date(day), 'Leave', None, None, None, None)
+			continue
+		if rng.random() < 0.04:
+			yield (employee_id, adapt_date(day), 'Absent', None, None, None, None)
+			continue
+		check_in = _clock(rng.gauss(usual_check_in, 10 * 60))
+		check_out = _clock(seconds_since_midnight(check_in) + rng.gauss(8.5 * 3600, 30 * 60))
+		yield (
+			employee_id, adapt_date(day), 'Present', adapt_time(check_in), adapt_time(check_out),
+			seconds_since_midnight(check_in), seconds_since_midnight(check_out),
+		)
+
+
+def _insert_attendance(rows):
+	qn = connection.ops.quote_name
+	columns = ('employee_id', 'date', 'status', 'check_in', 'check_out', 'check_in_seconds', 'check_out_seconds')
+	sql = (
+		f'INSERT INTO {qn(Attendance._meta.db_table)} ({", ".join(qn(c) for c in columns)}) '
+		f'VALUES ({", ".join(["%s"] * len(columns))})'
+	)
+	with connection.cursor() as cursor:
+		cursor.executemany(sql, rows)
+
+
+def generate_dataset(hrs=20, employees=2000, days=365, leaves_per_year=6, tasks_per_employee=10, seed=0,
+		batch_size=500, progress=None):
+	"""Insert a synthetic organisation: `hrs` HRs sharing `employees`
+	employees, weekday attendance for the last `days` days, leaves and tasks.
+
+	Emails embed the seed, so datasets with different seeds can coexist.
+	progress, if given, is called with a message after each batch of employees.
+	Returns: { "hrs", "employees", "attendance", "leaves", "tasks": int }
+	"""
+	rng = random.Random(seed)
+	today = timezone.localdate()
+	first_day = today - timedelta(days=days)
+	workdays = [first_day + timedelta(days=i) for i in range(days) if (first_day + timedelta(days=i)).weekday() < 5]
+	password = make_password(SYNTHETIC_PASSWORD)
+	adapt_date = connection.ops.adapt_datefield_value
+	adapt_time = connection.ops.adapt_timefield_value
+	domain = f's{seed}.{EMAIL_DOMAIN}'
+	counts = {'hrs': 0, 'employees': 0, 'attendance': 0, 'leaves': 0, 'tasks': 0}
+
+	with transaction.atomic():
+		hr_rows = HR.objects.bulk_create([
+			HR(
+				name=f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}', email=f'hr{i}@{domain}',
+				password=SYNTHETIC_PASSWORD, department='People',
+			)
+			for i in range(hrs)
+		])
+	counts['hrs'] = len(hr_rows)
+
+	for offset in range(0, employees, batch_size):
+		with transaction.atomic():
+			staff = []
+			for i in range(offset, min(offset + batch_size, employees)):
+				department = rng.choice(list(DEPARTMENTS))
+				first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+				staff.append(Employee(
+					name=f'{first} {last}', email=f'{first}.{last}.{i}@{domain}'.lower(), password=password,
+					department=department, designation=rng.choice(DEPARTMENTS[department]),
+					salary=rng.randrange(30000, 180000, 500), hr=hr_rows[i % len(hr_rows)],
+				))
+			staff = Employee.objects.bulk_create(staff)
+
+			leaves, tasks, attendance = [], [], []
+			for emp in staff:
+				emp_leaves = _leaves(rng, emp.id, first_day, today, leaves_per_year)
+				leaves.extend(emp_leaves)
+				on_leave = {
+					leave.start_date + timedelta(days=d)
+					for leave in emp_leaves if leave.status == 'Approved'
+					for d in range((leave.end_date - leave.start_date).days + 1)
+				}
+				attendance.extend(_attendance(rng, emp.id, workdays, on_leave, adapt_date, adapt_time))
+				for _ in range(tasks_per_employee):
+					due = first_day + timedelta(days=rng.randrange(days + 30))
+					if due < today:
+						task_status = Task.STATUS_COMPLETED if rng.random() < 0.9 else Task.STATUS_IN_PROGRESS
+					else:
+						task_status = rng.choice((Task.STATUS_PENDING, Task.STATUS_PENDING, Task.STATUS_IN_PROGRESS))
+					tasks.append(Task(
+						hr_id=emp.hr_id, employee_id=emp.id, title=rng.choice(TASK_TITLES),
+						description=f'Synthetic task for {emp.name}', due_date=due,
+						priority=rng.choice(TASK_PRIORITIES), status=task_status,
+					))
+			Leave.objects.bulk_create(leaves, batch_size=1000)
+			Task.objects.bulk_create(tasks, batch_size=1000)
+			_insert_attendance(attendance)
+		counts['employees'] += len(staff)
+		counts['leaves'] += len(leaves)
+		counts['tasks'] += len(tasks)
+		counts['attendance'] += len(attendance)
+		if progress:
+			progress(f'{counts["employees"]}/{employees} employees, {counts["attendance"]} attendance rows')
+
+	for model_name in ('HR', 'Employee', 'Leave', 'Task'):
+		bump_for_model(model_name)
+	invalidate_tags('Employee', 'Leave', 'Attendance')
+	rebuild_rollups()
+	return counts
@@ -0,0 +1,131 @@
+import functools
+import random
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections, router
+
+
+# Reads are only sent to a replica inside views marked @read_replica, and
+# never while the client is pinned to the primary after one of its writes.
+_read_routed = ContextVar('read_routed', default=False)
+_pinned_primary = ContextVar('pinned_primary', default=False)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+# signed cookie holding the time of the client's last write
+STICKY_COOKIE = 'primary_pin'
+STICKY_SALT = 'api.db_router.sticky'
+
+
+def _replicas():
+	return getattr(settings, 'READ_REPLICAS', [])
+
+
+class ReadReplicaRouter:
+
+	def db_for_read(self, model, **hints):
+		replicas = _replicas()
+		if replicas and _read_routed.get() and not _pinned_primary.get():
+			return random.choice(replicas)
+		return 'default'
+
+	def db_for_write(self, model, **hints):
+		return 'default'
+
+	def allow_relation(self, obj1, obj2, **hints):
+		# replicas are copies of the primary, so cross-alias relations are fine
+		return True
+
+	def allow_migrate(self, db, app_label, model_name=None, **hints):
+		return db == 'default'
+
+
+def read_connection(model):
+	"""The connection the router reads `model` from; raw SQL must use this
+	rather than django.db.connection, which is always the primary."""
+	return connections[router.db_for_read(model)]
+
+
+def read_replica(view):
+	"""Let a read-only view's queries go to a read replica (sync or async view)."""
+	if iscoroutinefunction(view):
+		@functools.wraps(view)
+		async def async_wrapper(*args, **kwargs):
+			# sync_to_async copies the context, so the async ORM's worker
+			# thread sees the routing flag too
+			token = _read_routed.set(True)
+			try:
+				return await view(*args, **kwargs)
+			finally:
+				_read_routed.reset(token)
+		return async_wrapper
+
+	@functools.wraps(view)
+	def wrapper(*args, **kwargs):
+		token = _read_routed.set(True)
+		try:
+			return view(*args, **kwargs)
+		finally:
+			_read_routed.reset(token)
+	return wrapper
+
+
+def _sticky_seconds():
+	return getattr(settings, 'REPLICA_STICKY_SECONDS', 5)
+
+
+def _is_pinned(request):
+	# the signature's own timestamp expires the cookie even if a client keeps it
+	return request.get_signed_cookie(STICKY_COOKIE, default=None, salt=STICKY_SALT, max_age=_sticky_seconds()) is not None
+
+
+def _pin(request, response):
+	if request.method not in SAFE_METHODS and response.status_code < 400:
+		response.set_signed_cookie(
+			STICKY_COOKIE, str(int(time.time() * 1000)), salt=STICKY_SALT, max_age=_sticky_seconds(),
+			httponly=True, samesite='Lax',
+		)
+
+
+class ReadYourWritesMiddleware:
+	"""Pin a client to the primary for REPLICA_STICKY_SECONDS after it writes,
+	so it never reads a replica that has not caught up with its own change.
+
+	The pin travels with the client as a signed cookie stamped with the time
+	of the write, so every worker process honours it (and clients sharing an
+	address are not pinned together). Runs natively in both stacks, so async
+	views keep the ASGI event loop."""
+
+	sync_capable = True
+	async_capable = True
+
+	def __init__(self, get_response):
+		self.get_response = get_response
+		if iscoroutinefunction(get_response):
+			markcoroutinefunction(self)
+
+	def __call__(self, request):
+		if iscoroutinefunction(self):
+			return self.__acall__(request)
+		if not _replicas():
+			return self.get_response(request)
+		token = _pinned_primary.set(_is_pinned(request))
+		try:
+			response = self.get_response(request)
+		finally:
+			_pinned_primary.reset(token)
+		_pin(request, response)
+		return response
+
+	async def __acall__(self, request):
+		if not _replicas():
+			return await self.get_response(request)
+		token = _pinned_primary.set(_is_pinned(request))
+		try:
+			response = await self.get_response(request)
+		finally:
+			_pinned_primary.reset(token)
+		_pin(request, response)
+		return response
@@ -0,0 +1,153 @@
+import csv
+
+from django.db import transaction
+from rest_framework import serializers
+from rest_framework.fields import empty
+from rest_framework.validators import UniqueValidator
+
+from . import passwords
+from .cache import invalidate_on_commit
+from .models import HR, Employee, OutboxMessage
+from .serializers import EmployeeSerializer
+from .versions import bump_for_model
+from .write_queue import run_write
+
+
+IMPORT_CHUNK_SIZE = 500
+REQUIRED_COLUMNS = ('name', 'email', 'password', 'department', 'designation', 'salary')
+NOT_UTF8 = 'The file must be a UTF-8 encoded CSV.'
+
+
+def _row_fields():
+	"""EmployeeSerializer's fields for the CSV columns. Email uniqueness and
+	the HR are checked once per chunk instead of once per row."""
+	fields = EmployeeSerializer().fields
+	email = fields['email']
+	email.validators = [v for v in email.validators if not isinstance(v, UniqueValidator)]
+	return {column: fields[column] for column in REQUIRED_COLUMNS}
+
+
+def _validate_row(row, fields, default_hr_id):
+	"""Return (cleaned, errors) for one CSV row; errors mirror serializer.errors."""
+	errors = {}
+	cleaned = {}
+	for column, field in fields.items():
+		value = (row.get(column) or '').strip()
+		try:
+			# an empty cell is a missing value, as an absent JSON key would be
+			cleaned[column] = field.run_validation(value or empty)
+		except serializers.ValidationError as e:
+			errors[column] = list(e.detail)
+	hr_value = (row.get('hr') or '').strip() or default_hr_id
+	try:
+		cleaned['hr_id'] = int(hr_value)
+	except (TypeError, ValueError):
+		errors['hr'] = ['A valid HR id is required.']
+	return cleaned, errors
+
+
+def _import_chunk(chunk, fields, default_hr_id, seen_emails, jobs, report):
+	"""Validate, hash and insert one chunk of (line_number, row) pairs."""
+	valid = []
+	for line, row in chunk:
+		cleaned, errors = _validate_row(row, fields, default_hr_id)
+		if not errors and cleaned['email'].lower() in seen_emails:
+			errors['email'] = ['Duplicate email in file.']
+		if errors:
+			report['errors'].append({'row': line, 'errors': errors})
+			continue
+		seen_emails.add(cleaned['email'].lower())
+		valid.append((line, cleaned))
+
+	# one query each for the chunk's HR ids and already-registered emails
+	hr_ids = set(HR.objects.filter(id__in={c['hr_id'] for _, c in valid}).values_list('id', flat=True))
+	taken = {e.lower() for e in Employee.objects.filter(email__in=[c['email'] for _, c in valid]).values_list('email', flat=True)}
+	rows = []
+	for line, cleaned in valid:
+		errors = {}
+		if cleaned['hr_id'] not in hr_ids:
+			errors['hr'] = ['HR not found.']
+		if cleaned['email'].lower() in taken:
+			errors['email'] = ['employee with this email already exists.']
+		if errors:
+			report['errors'].append({'row': line, 'errors': errors})
+		else:
+			rows.append((line, cleaned))
+	if not rows:
+		return
+
+	hashed = passwords.pool.run_many('make_password', [(cleaned['password'],) for _, cleaned in rows], jobs=jobs)
+
+	employees = [
+		Employee(
+			name=c['name'], email=c['email'], password=password, department=c['department'],
+			designation=c['designation'], salary=c['salary'], hr_id=c['hr_id'],
+		)
+		for (_, c), password in zip(rows, hashed)
+	]
+	messages = [
+		OutboxMessage(kind=OutboxMessage.KIND_WELCOME_EMAIL, payload={'name': c['name'], 'email': c['email'], 'password': c['password']})
+		for _, c in rows
+	]
+	try:
+		run_write(_insert_chunk, employees, messages)
+	except Exception as e:
+		# e.g. an email registered concurrently; report the whole chunk as failed
+		for line, _ in rows:
+			report['errors'].append({'row': line, 'errors': {'non_field_errors': [str(e)]}})
+		return
+	report['created'] += len(employees)
+
+
+def _insert_chunk(employees, messages):
+	with transaction.atomic():
+		Employee.objects.bulk_create(employees, batch_size=IMPORT_CHUNK_SIZE)
+		OutboxMessage.objects.bulk_create(messages, batch_size=IMPORT_CHUNK_SIZE)
+		# bulk_create sends no post_save, so evict dependent responses here
+		invalidate_on_commit('Employee')
+		bump_for_model('Employee')
+
+
+def import_employees_csv(text_stream, default_hr_id=None, chunk_size=IMPORT_CHUNK_SIZE, jobs=None):
+	"""Bulk-create employees from a CSV text stream.
+
+	Columns: name, email, password, department, designation, salary and an
+	optional hr (falls back to default_hr_id), validated with
+	EmployeeSerializer's fields. Rows are read lazily and handled chunk_size
+	at a time; each chunk's passwords are hashed in the shared password pool
+	(api/passwords.py) as up to `jobs` pool jobs (default: one per pool
+	worker), so an import never starts processes of its own, and each chunk
+	is inserted with bulk_create in its own transaction (through the
+	single-writer queue), together with its welcome-email outbox messages.
+
+	A stream that is not UTF-8 ends the import where decoding fails, with a
+	file-level error on row 1 as for missing columns (decoding runs a buffer
+	ahead of the rows, so no exact line is known); chunks inserted before
+	that stay imported.
+
+	Response: { "created": int, "errors": [ { "row": <line>, "errors": {...} }, ... ] }
+	"""
+	report = {'created': 0, 'errors': []}
+	reader = csv.DictReader(text_stream)
+	try:
+		missing = [c for c in REQUIRED_COLUMNS if c not in (reader.fieldnames or [])]
+		if missing:
+			report['errors'].append({'row': 1, 'errors': {'non_field_errors': ['Missing columns: ' + ', '.join(missing)]}})
+			return report
+
+		jobs = passwords.pool.workers if jobs is None else jobs
+		fields = _row_fields()
+		seen_emails = set()
+		chunk = []
+		for row in reader:
+			# line_num is the physical line the row ended on; the header is line 1
+			chunk.append((reader.line_num, row))
+			if len(chunk) >= chunk_size:
+				_import_chunk(chunk, fields, default_hr_id, seen_emails, jobs, report)
+				chunk = []
+		if chunk:
+			_import_chunk(chunk, fields, default_hr_id, seen_emails, jobs, report)
+	except UnicodeDecodeError:
+		report['errors'].append({'row': 1, 'errors': {'non_field_errors': [NOT_UTF8]}})
+	report['errors'].sort(key=lambda e: e['row'])
+	return report
@@ -0,0 +1,109 @@
+from django.db.models import Q
+from rest_framework import status
+
+from .models import Employee
+from .search import DEFAULT_SEARCH_LIMIT, MAX_SEARCH_LIMIT
+from .serializers import EmployeeSerializer, HRSerializer
+from .tokens import issue_token
+
+
+# Parameter parsing and authorization shared by the sync views (views.py) and
+# their async twins (async_views.py). Nothing here touches the database or
+# builds a response: each variant runs the queries its own way and turns an
+# EndpointError into its own response type, so the two cannot drift apart.
+
+TOKEN_FORBIDDEN = 'Your token does not grant access to this resource'
+
+
+class EndpointError(Exception):
+	"""A request the endpoint refuses: message for {'error': ...} and its status."""
+
+	def __init__(self, message, status_code=status.HTTP_400_BAD_REQUEST):
+		super().__init__(message)
+		self.message = message
+		self.status_code = status_code
+
+
+def token_id(identity, role, claimed=None):
+	"""The id a signed token vouches for (no lookup needed), or None when the
+	token has another role or an id was also passed and differs."""
+	if identity.role != role or (claimed and str(claimed) != str(identity.id)):
+		return None
+	return identity.id
+
+
+def my_tasks_employee(params, identity):
+	"""(employee id, vouched) for the my-tasks endpoints. vouched is True when
+	an employee token names the employee; otherwise the caller still has to
+	check that the id from ?employee_id= (or ?employee=) exists."""
+	claimed = params.get('employee_id') or params.get('employee')
+	if identity is not None and identity.is_employee:
+		employee_id = token_id(identity, 'employee', claimed)
+		if employee_id is None:
+			raise EndpointError(TOKEN_FORBIDDEN, status.HTTP_403_FORBIDDEN)
+		return employee_id, True
+	if not claimed:
+		raise EndpointError('employee_id query param required')
+	try:
+		return int(claimed), False
+	except ValueError:
+		raise EndpointError('Employee not found', status.HTTP_404_NOT_FOUND)
+
+
+def employee_list_params(params):
+	"""(department, search, limit) from ?department=, ?search= and ?limit=;
+	limit is only used (and parsed) with a search."""
+	department = params.get('department')
+	search = params.get('search')
+	limit = None
+	if search:
+		try:
+			limit = min(int(params.get('limit') or DEFAULT_SEARCH_LIMIT), MAX_SEARCH_LIMIT)
+		except ValueError:
+			raise EndpointError('limit must be an integer')
+	return department, search, limit
+
+
+def employee_list_queryset(department, search, limit, ids=None):
+	"""The employee list query and the rank to sort its rows by (None keeps
+	the query's order). ids is search_employee_ids()'s answer for a search,
+	None when the index could not serve it."""
+	queryset = Employee.objects.all()
+	if search and ids is not None:
+		return queryset.filter(id__in=ids), {emp_id: i for i, emp_id in enumerate(ids)}
+	if department:
+		queryset = queryset.filter(department__iexact=department)
+	if search:
+		queryset = queryset.filter(Q(name__icontains=search) | Q(email__icontains=search))[:limit]
+	return queryset, None
+
+
+def employee_list_rows(employees, rank=None):
+	if rank is not None:
+		employees = sorted(employees, key=lambda emp: rank[emp.id])
+	return [
+		{
+			'id': emp.id,
+			'name': emp.name,
+			'email': emp.email,
+			'department': emp.department,
+			'designation': emp.designation,
+			'salary': str(emp.salary),
+		}
+		for emp in employees
+	]
+
+
+def hr_password_matches(hr, password):
+	# HR passwords are still stored as entered
+	return hr is not None and password == hr.password
+
+
+def login_payload(role, account):
+	"""The login response body for an HR or employee whose password matched."""
+	if role == 'hr':
+		return {'role': 'hr', 'data': HRSerializer(account).data, 'token': issue_token('hr', account.id, account.id)}
+	return {
+		'role': 'employee', 'data': EmployeeSerializer(account).data,
+		'token': issue_token('employee', account.id, account.hr_id),
+	}
@@ -0,0 +1,170 @@
+import asyncio
+import json
+import threading
+import uuid
+from collections import deque
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+
+# In-process pub/sub behind the /events/ Server-Sent Events stream. Views
+# publish after their transaction commits (from any thread); each open
+# stream holds an asyncio queue on the ASGI event loop and receives the
+# events for its channels ("hr:<id>", "employee:<id>"). Recent events stay
+# in a bounded replay buffer so a reconnecting client resumes from its
+# Last-Event-ID. Only streams served by the same process see an event, so
+# run the ASGI server with a single worker process (threads are fine).
+
+
+def _setting(name, default):
+	return getattr(settings, name, default)
+
+
+def hr_channel(hr_id):
+	return f'hr:{hr_id}'
+
+
+def employee_channel(employee_id):
+	return f'employee:{employee_id}'
+
+
+def leave_channels(leave):
+	return (hr_channel(leave.employee.hr_id), employee_channel(leave.employee_id))
+
+
+def task_channels(task):
+	return (hr_channel(task.hr_id), employee_channel(task.employee_id))
+
+
+class Event:
+	__slots__ = ('seq', 'id', 'channels', 'text')
+
+	def __init__(self, seq, event_id, event_type, data, channels):
+		self.seq = seq
+		self.id = event_id
+		self.channels = channels
+		# encoded once at publish time, however many streams receive it
+		payload = json.dumps(data, cls=DjangoJSONEncoder)
+		self.text = f'id: {event_id}\nevent: {event_type}\ndata: {payload}\n\n'
+
+
+class Subscription:
+
+	def __init__(self, channels, loop, max_queue):
+		self.channels = frozenset(channels)
+		self.loop = loop
+		self.queue = asyncio.Queue(maxsize=max_queue)
+		self.closed = False
+
+	def _deliver(self, event):
+		# runs on the subscriber's event loop
+		if self.closed:
+			return
+		try:
+			self.queue.put_nowait(event)
+		except asyncio.QueueFull:
+			# too slow to keep up: end the stream, the client resumes from its
+			# Last-Event-ID through the replay buffer
+			self.closed = True
+			self.queue.get_nowait()
+			self.queue.put_nowait(None)
+
+
+class EventBroker:
+
+	def __init__(self, replay_size=1000, max_queue=100):
+		# ids are "<epoch>-<seq>"; a new epoch per process tells a client that
+		# resumes across a restart that its position is gone
+		self.epoch = uuid.uuid4().hex[:8]
+		self.max_queue = max_queue
+		self._seq = 0
+		self._buffer = deque(maxlen=replay_size)
+		self._subscribers = set()
+		self._lock = threading.Lock()
+
+	def publish(self, event_type, data, channels):
+		"""Send an event to every stream subscribed to any of `channels`."""
+		with self._lock:
+			self._seq += 1
+			event = Event(self._seq, f'{self.epoch}-{self._seq}', event_type, data, frozenset(channels))
+			self._buffer.append(event)
+			targets = [s for s in self._subscribers if s.channels & event.channels]
+		for subscription in targets:
+			try:
+				subscription.loop.call_soon_threadsafe(subscription._deliver, event)
+			except RuntimeError:
+				# its event loop has shut down
+				self.unsubscribe(subscription)
+		return event
+
+	def publish_on_commit(self, event_type, data, channels):
+		"""Publish once the current transaction commits (at once in autocommit)."""
+		transaction.on_commit(lambda: self.publish(event_type, data, channels))
+
+	def subscribe(self, channels, last_event_id=None):
+		"""Register a stream on the running event loop.
+
+		Returns (subscription, replay), where replay holds the buffered events
+		after last_event_id, or None when that position is no longer in the
+		buffer (other process epoch or evicted) and the client must reload.
+		"""
+		subscription = Subscription(channels, asyncio.get_running_loop(), self.max_queue)
+		with self._lock:
+			replay = self._replay(subscription.channels, last_event_id)
+			self._subscribers.add(subscription)
+		return subscription, replay
+
+	def _replay(self, channels, last_event_id):
+		if not last_event_id:
+			return []
+		epoch, _, seq = last_event_id.partition('-')
+		if epoch != self.epoch or not seq.isdigit():
+			return None
+		seq = int(seq)
+		if seq < self._seq and (not self._buffer or self._buffer[0].seq > seq + 1):
+			return None
+		return [e for e in self._buffer if e.seq > seq and e.channels & channels]
+
+	def unsubscribe(self, subscription):
+		subscription.closed = True
+		with self._lock:
+			self._subscribers.discard(subscription)
+
+	def stats(self):
+		with self._lock:
+			return {'subscribers': len(self._subscribers), 'buffered': len(self._buffer), 'last_event_seq': self._seq}
+
+
+broker = EventBroker(
+	replay_size=_setting('EVENTS_REPLAY_SIZE', 1000),
+	max_queue=_setting('EVENTS_SUBSCRIBER_QUEUE', 100),
+)
+
+
+async def event_stream(channels, last_event_id=None):
+	"""Yield the SSE body for `channels`: replayed events, then live events,
+	with a comment line every EVENTS_HEARTBEAT_SECONDS to keep proxies and
+	the client's connection open. Subscribes on the loop that consumes it.
+	"""
+	heartbeat = _setting('EVENTS_HEARTBEAT_SECONDS', 15)
+	subscription, replay = broker.subscribe(channels, last_event_id)
+	try:
+		yield f'retry: {_setting("EVENTS_RETRY_MS", 3000)}\n\n'
+		if replay is None:
+			yield f'event: reset\ndata: {json.dumps({"reason": "resume position no longer available"})}\n\n'
+			replay = []
+		for event in replay:
+			yield event.text
+		while True:
+			try:
+				event = await asyncio.wait_for(subscription.queue.get(), timeout=heartbeat)
+			except asyncio.TimeoutError:
+				yield ': heartbeat\n\n'
+				continue
+			if event is None:
+				return
+			yield event.text
+	finally:
+		broker.unsubscribe(subscription)
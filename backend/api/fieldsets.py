@@ -0,0 +1,87 @@
+import datetime
+from decimal import Decimal
+
+from django.utils import timezone
+
+
+# Lightweight read-only list rendering: a ListSchema maps each output field
+# to an ORM lookup, reads just the requested columns with values_list() and
+# formats them the way the matching ModelSerializer in serializers.py would,
+# without building model instances or running DRF field processing.
+# ?fields=a,b,c (sparse fieldsets) narrows both the SELECT and the output.
+
+
+class FieldsetError(ValueError):
+	"""Raised for an unknown name in ?fields=."""
+
+
+def _datetime(value):
+	# DRF DateTimeField: current time zone, ISO 8601, "Z" for UTC
+	if timezone.is_aware(value):
+		value = timezone.localtime(value)
+	value = value.isoformat()
+	return value[:-6] + 'Z' if value.endswith('+00:00') else value
+
+
+_CONVERTERS = {
+	datetime.datetime: _datetime,
+	datetime.date: datetime.date.isoformat,
+	datetime.time: datetime.time.isoformat,
+	Decimal: lambda value: format(value, 'f'),  # DRF's COERCE_DECIMAL_TO_STRING
+}
+
+
+class ListSchema:
+
+	def __init__(self, **fields):
+		self.fields = fields
+
+	def parse(self, param):
+		"""Names selected by a ?fields= value, in request order; every field when empty."""
+		if not param:
+			return list(self.fields)
+		names = list(dict.fromkeys(name.strip() for name in param.split(',') if name.strip()))
+		unknown = [name for name in names if name not in self.fields]
+		if unknown or not names:
+			raise FieldsetError(
+				'Unknown fields: ' + ', '.join(unknown) + '. Available: ' + ', '.join(self.fields)
+			)
+		return names
+
+	def queryset(self, qs, names, keys=()):
+		"""Narrow qs to the columns behind `names` (plus raw lookups `keys`,
+		e.g. a pagination key), yielding rows with one attribute per lookup."""
+		lookups = [self.fields[name] for name in names]
+		return qs.values_list(*dict.fromkeys(lookups + list(keys)), named=True)
+
+	def render(self, rows, names):
+		lookups = [self.fields[name] for name in names]
+		converters = _CONVERTERS
+		data = []
+		for row in rows:
+			item = {}
+			for name, lookup in zip(names, lookups):
+				value = getattr(row, lookup)
+				convert = converters.get(type(value))
+				item[name] = convert(value) if convert else value
+			data.append(item)
+		return data
+
+
+EMPLOYEE_LIST = ListSchema(
+	id='id', name='name', email='email', department='department', designation='designation',
+	salary='salary', hr='hr_id',
+)
+LEAVE_LIST = ListSchema(
+	id='id', employee='employee_id', employee_name='employee__name', employee_email='employee__email',
+	start_date='start_date', end_date='end_date', reason='reason', status='status', created_at='created_at',
+)
+ATTENDANCE_LIST = ListSchema(
+	id='id', employee='employee_id', employee_name='employee__name', employee_email='employee__email',
+	date='date', status='status', check_in='check_in', check_out='check_out',
+)
+TASK_LIST = ListSchema(
+	id='id', hr='hr_id', hr_name='hr__name', employee='employee_id', employee_name='employee__name',
+	employee_email='employee__email', title='title', description='description', due_date='due_date',
+	priority='priority', status='status', created_at='created_at',
+)
@@ -0,0 +1,58 @@
+import secrets
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api.models import RevokedToken
+from api.tokens import ROLE_CODES, purge_revocations, revoke_subject, signing_keys
+
+
+class Command(BaseCommand):
+	help = (
+		'Inspect and maintain signed access tokens: list the signing keys and revocations, '
+		'--new-key prints an HR_ACCESS_TOKEN_KEYS value with a fresh key first (rotation), '
+		'--revoke-subject role:id revokes every token issued to an account, --purge deletes '
+		'revocations that can no longer match an unexpired token.'
+	)
+
+	def add_arguments(self, parser):
+		parser.add_argument('--new-key', metavar='KEY_ID', help='Id for a new signing key to rotate in.')
+		parser.add_argument('--revoke-subject', metavar='ROLE:ID', help='e.g. employee:42 or hr:3.')
+		parser.add_argument('--purge', action='store_true', help='Delete expired revocations.')
+
+	def handle(self, *args, **options):
+		if options['new_key']:
+			self._new_key(options['new_key'])
+		elif options['revoke_subject']:
+			role, _, user_id = options['revoke_subject'].partition(':')
+			if role not in ROLE_CODES or not user_id.isdigit():
+				raise CommandError('expected <role>:<id> with role hr or employee')
+			revoke_subject(role, int(user_id))
+			self.stdout.write(f'revoked every token issued to {role}:{user_id} so far')
+		elif options['purge']:
+			self.stdout.write(f'deleted {purge_revocations()} expired revocations')
+		else:
+			self._status()
+
+	def _new_key(self, key_id):
+		if '.' in key_id or ':' in key_id or ',' in key_id:
+			raise CommandError('key ids may not contain ".", ":" or ","')
+		configured = getattr(settings, 'ACCESS_TOKEN_KEYS', None) or []
+		if any(existing == key_id for existing, _ in configured):
+			raise CommandError(f'key id {key_id} is already in use')
+		pairs = [(key_id, secrets.token_urlsafe(32))] + list(configured)
+		self.stdout.write('HR_ACCESS_TOKEN_KEYS=' + ','.join(f'{k}:{secret}' for k, secret in pairs))
+		self.stdout.write(
+			f'Deploy it to every process; new tokens are signed with {key_id}. Remove the old keys after '
+			f'ACCESS_TOKEN_TTL ({settings.ACCESS_TOKEN_TTL} s), when their last tokens have expired.'
+		)
+
+	def _status(self):
+		keys = list(signing_keys())
+		configured = getattr(settings, 'ACCESS_TOKEN_KEYS', None)
+		self.stdout.write(f'signing key: {keys[0]}' + ('' if configured else ' (derived from SECRET_KEY)'))
+		if keys[1:]:
+			self.stdout.write('verify-only keys: ' + ', '.join(keys[1:]))
+		live = RevokedToken.objects.filter(expires_at__gt=timezone.now()).count()
+		self.stdout.write(f'revocations: {live} live, {RevokedToken.objects.count() - live} expired')
@@ -0,0 +1,99 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.benchmark import compare_reports, run_benchmark
+
+
+def _fmt(value):
+	if isinstance(value, float):
+		return f'{value:.2f}'
+	return '-' if value is None else str(value)
+
+
+class Command(BaseCommand):
+	help = (
+		'Benchmark every route in api/urls.py: p50/p95/p99 latency, throughput and query count per '
+		'route, in-process through the test client (writes rolled back) or against --url. Load a '
+		'dataset with generate_dataset first. --report writes the JSON report; --baseline diffs it '
+		'against a saved report and fails on regressions beyond the thresholds. The committed '
+		'benchmarks/baseline.json was recorded on a fresh database after '
+		'`generate_dataset --hrs 5 --employees 500 --days 120 --seed 1` with `bench_api --requests 30 --warmup 3`.'
+	)
+
+	def add_arguments(self, parser):
+		parser.add_argument('--requests', type=int, default=50, help='Timed requests per route.')
+		parser.add_argument('--warmup', type=int, default=5, help='Untimed requests per route first.')
+		parser.add_argument('--routes', help='Comma-separated route names (default: all).')
+		parser.add_argument('--url', help='Base URL of a running server instead of the test client.')
+		parser.add_argument('--include-writes', action='store_true', help='With --url, also run write routes (not rolled back).')
+		parser.add_argument('--report', help='Write the JSON report here.')
+		parser.add_argument('--baseline', help='JSON report to compare against, e.g. benchmarks/baseline.json.')
+		parser.add_argument('--max-latency-increase', type=float, default=0.5, help='Allowed p95 growth (fraction).')
+		parser.add_argument('--max-throughput-drop', type=float, default=0.25, help='Allowed throughput drop (fraction).')
+		parser.add_argument('--max-query-increase', type=int, default=0, help='Allowed extra queries per request.')
+		parser.add_argument('--min-latency-delta-ms', type=float, default=1.0, help='Ignore latency changes smaller than this.')
+
+	def handle(self, *args, **options):
+		if options['requests'] < 1 or options['warmup'] < 0:
+			raise CommandError('--requests must be positive and --warmup non-negative')
+		baseline = None
+		if options['baseline']:
+			try:
+				with open(options['baseline']) as f:
+					baseline = json.load(f)
+			except (OSError, ValueError) as e:
+				raise CommandError(f'could not read the baseline: {e}')
+
+		self.stdout.write(f'{"route":<34} {"status":>6} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} {"req/s":>8} {"queries":>7}')
+
+		def progress(name, row):
+			self.stdout.write(
+				f'{name:<34} {row["status"]:>6} {row["p50_ms"]:>9.2f} {row["p95_ms"]:>9.2f} {row["p99_ms"]:>9.2f} '
+				f'{_fmt(row["throughput_rps"]):>8} {_fmt(row["queries"]):>7}'
+			)
+
+		try:
+			report = run_benchmark(
+				requests=options['requests'], warmup=options['warmup'],
+				routes=[r for r in (options['routes'] or '').split(',') if r] or None,
+				base_url=options['url'], include_writes=options['include_writes'], progress=progress,
+			)
+		except LookupError as e:
+			raise CommandError(str(e))
+		for name, row in report['routes'].items():
+			if 'skipped' in row:
+				self.stdout.write(f'{name:<34} skipped: {row["skipped"]}')
+		if options['report']:
+			with open(options['report'], 'w') as f:
+				json.dump(report, f, indent=2, sort_keys=True)
+				f.write('\n')
+		if baseline is not None:
+			self._compare(report, baseline, options)
+
+	def _compare(self, report, baseline, options):
+		if baseline.get('dataset') != report['dataset']:
+			self.stdout.write(self.style.WARNING(
+				f'baseline dataset {baseline.get("dataset")} differs from this one {report["dataset"]}; '
+				'numbers may not be comparable'
+			))
+		if options['routes']:
+			# a partial run is only compared on the routes it measured
+			baseline = dict(baseline, routes={k: v for k, v in baseline['routes'].items() if k in report['routes']})
+		rows = compare_reports(
+			report, baseline, max_latency_increase=options['max_latency_increase'],
+			max_throughput_drop=options['max_throughput_drop'], max_query_increase=options['max_query_increase'],
+			min_latency_delta_ms=options['min_latency_delta_ms'],
+		)
+		regressions = [row for row in rows if row['regression']]
+		self.stdout.write(f'\n{"route":<34} {"metric":<15} {"baseline":>10} {"current":>10} {"change":>8}')
+		for row in rows:
+			if not (row['regression'] or options['verbosity'] > 1):
+				continue
+			change = row['change']
+			change = f'{change:+.0%}' if row['metric'] in ('p95_ms', 'throughput_rps') and change is not None else _fmt(change)
+			line = f'{row["route"]:<34} {row["metric"]:<15} {_fmt(row["baseline"]):>10} {_fmt(row["current"]):>10} {change:>8}'
+			self.stdout.write(self.style.ERROR(line) if row['regression'] else line)
+		if regressions:
+			raise CommandError(f'{len(regressions)} regression(s) against {options["baseline"]}')
+		self.stdout.write(self.style.SUCCESS('no regressions against the baseline'))
@@ -0,0 +1,85 @@
+import statistics
+import threading
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+
+from api.models import HR, Employee, DepartmentDailyRollup
+
+
+class Command(BaseCommand):
+	help = (
+		'Load-test attendance_mark: N concurrent clients check in a batch of throwaway employees '
+		'against the configured database, then report check-ins/second and latency. '
+		'The generated HR, employees and their attendance are deleted afterwards.'
+	)
+
+	def add_arguments(self, parser):
+		parser.add_argument('--clients', type=int, default=8, help='Concurrent client threads.')
+		parser.add_argument('--employees', type=int, default=1000, help='Employees checking in (one check-in each).')
+		parser.add_argument('--repeat', type=int, default=1, help='Check-ins per employee (repeats hit the already-checked-in path).')
+
+	def handle(self, *args, **options):
+		tag = uuid.uuid4().hex[:8]
+		department = f'bench-{tag}'
+		hr = HR.objects.create(name='Bench HR', email=f'hr-{tag}@bench.invalid', password='-', department=department)
+		try:
+			Employee.objects.bulk_create([
+				Employee(
+					name=f'Bench {i}', email=f'emp{i}-{tag}@bench.invalid', password='!', department=department,
+					designation='Bench', salary=0, hr=hr,
+				)
+				for i in range(options['employees'])
+			], batch_size=500)
+			ids = list(Employee.objects.filter(hr=hr).values_list('id', flat=True))
+			self._run(ids, options['clients'], options['repeat'])
+		finally:
+			hr.delete()
+			DepartmentDailyRollup.objects.filter(department=department).delete()
+
+	def _run(self, ids, clients, repeat):
+		work = [emp_id for emp_id in ids for _ in range(repeat)]
+		shards = [work[i::clients] for i in range(clients)]
+		latencies = []
+		statuses = {}
+		lock = threading.Lock()
+
+		def worker(shard):
+			client = Client()
+			local = []
+			local_statuses = {}
+			try:
+				for emp_id in shard:
+					start = time.perf_counter()
+					response = client.post('/api/attendance/mark/', {'employee': emp_id}, content_type='application/json')
+					local.append(time.perf_counter() - start)
+					local_statuses[response.status_code] = local_statuses.get(response.status_code, 0) + 1
+			finally:
+				connection.close()
+			with lock:
+				latencies.extend(local)
+				for code, count in local_statuses.items():
+					statuses[code] = statuses.get(code, 0) + count
+
+		threads = [threading.Thread(target=worker, args=(shard,)) for shard in shards]
+		started = time.perf_counter()
+		for t in threads:
+			t.start()
+		for t in threads:
+			t.join()
+		elapsed = time.perf_counter() - started
+
+		latencies.sort()
+		def pct(p):
+			return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000 if latencies else 0
+
+		self.stdout.write(f'clients={clients} requests={len(latencies)} elapsed={elapsed:.2f}s')
+		self.stdout.write(f'throughput={len(latencies) / elapsed:.1f} check-ins/s')
+		self.stdout.write(
+			f'latency_ms mean={statistics.mean(latencies) * 1000 if latencies else 0:.2f} '
+			f'p50={pct(0.50):.2f} p99={pct(0.99):.2f} max={pct(1.0):.2f}'
+		)
+		self.stdout.write('statuses=' + ', '.join(f'{code}:{count}' for code, count in sorted(statuses.items())))
@@ -0,0 +1,90 @@
+import importlib
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.search import FTS_TABLE
+
+
+FIRST_NAMES = ['Alice', 'Bob', 'Natalia', 'Omar', 'Priya', 'Chen', 'Fatima', 'Lucas', 'Aisha', 'Mateo', 'Yuki', 'Ivan']
+LAST_NAMES = ['Wong', 'Stone', 'Ruiz', 'Haddad', 'Sharma', 'Li', 'Khan', 'Silva', 'Okafor', 'Garcia', 'Sato', 'Petrov']
+DEPARTMENTS = ['Engineering', 'Sales', 'Finance', 'People', 'Support', 'Marketing', 'Legal', 'Operations']
+DESIGNATIONS = ['Engineer', 'Manager', 'Analyst', 'Associate', 'Director', 'Specialist']
+
+
+class Command(BaseCommand):
+	help = (
+		'Compare LIKE \'%term%\' scans with the FTS5 trigram index on a throwaway SQLite database '
+		'holding N synthetic employees, using the same FTS table and triggers as migration 0010.'
+	)
+
+	def add_arguments(self, parser):
+		parser.add_argument('--employees', type=int, default=500000, help='Synthetic employees to generate.')
+		parser.add_argument('--repeat', type=int, default=5, help='Timed runs per search term.')
+		parser.add_argument('--limit', type=int, default=50, help='LIMIT applied to both queries.')
+		parser.add_argument('terms', nargs='*', default=['ali', 'stone', 'ngineer', 'emp123'])
+
+	def handle(self, *args, **options):
+		fts_sql = importlib.import_module('api.migrations.0010_employee_fts').FTS_SQL
+		fd, path = tempfile.mkstemp(suffix='.sqlite3')
+		os.close(fd)
+		try:
+			db = sqlite3.connect(path)
+			db.execute(
+				'CREATE TABLE api_employee (id INTEGER PRIMARY KEY, name TEXT, email TEXT, '
+				'department TEXT, designation TEXT)'
+			)
+			for statement in fts_sql:
+				db.execute(statement)
+			start = time.perf_counter()
+			self._populate(db, options['employees'])
+			self.stdout.write(f'indexed {options["employees"]} employees in {time.perf_counter() - start:.1f}s')
+
+			like_sql = (
+				'SELECT id FROM api_employee WHERE name LIKE ?1 OR email LIKE ?1 '
+				'OR department LIKE ?1 OR designation LIKE ?1 LIMIT ?2'
+			)
+			match_sql = f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH ?1 LIMIT ?2'
+			ranked_sql = f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH ?1 ORDER BY rank LIMIT ?2'
+			# LIKE stops as soon as it has `limit` rows, so common terms are cheap
+			# for it; rare terms force a full scan. Ranked FTS scores every hit.
+			self.stdout.write(f'{"term":>12}  {"LIKE":>10}  {"FTS":>10}  {"FTS ranked":>10}')
+			for term in options['terms']:
+				like = self._time(db, like_sql, (f'%{term}%', options['limit']), options['repeat'])
+				match = self._time(db, match_sql, (f'"{term}"', options['limit']), options['repeat'])
+				ranked = self._time(db, ranked_sql, (f'"{term}"', options['limit']), options['repeat'])
+				self.stdout.write(
+					f'{term!r:>12}  {like * 1000:7.2f} ms  {match * 1000:7.2f} ms  {ranked * 1000:7.2f} ms'
+				)
+		finally:
+			os.remove(path)
+
+	def _populate(self, db, count):
+		rng = random.Random(0)
+
+		def rows():
+			for i in range(count):
+				first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+				yield (
+					f'{first} {last}', f'{first.lower()}.{last.lower()}.emp{i}@example.com',
+					rng.choice(DEPARTMENTS), rng.choice(DESIGNATIONS),
+				)
+
+		with db:
+			db.executemany(
+				'INSERT INTO api_employee (name, email, department, designation) VALUES (?, ?, ?, ?)', rows(),
+			)
+
+	def _time(self, db, sql, params, repeat):
+		# median of `repeat` runs; the first run also warms the page cache
+		timings = []
+		for _ in range(repeat):
+			start = time.perf_counter()
+			db.execute(sql, params).fetchall()
+			timings.append(time.perf_counter() - start)
+		return statistics.median(timings)
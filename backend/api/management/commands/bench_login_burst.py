@@ -0,0 +1,197 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import time
+import uuid
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import HR, Employee
+
+from .bench_servers import _free_port, _wait_for_port, load_test
+
+
+async def _login(host, port, request, connection):
+	"""One request on connection [reader, writer], (re)opened as needed. Returns (status, Retry-After)."""
+	if connection[1] is None:
+		connection[:] = await asyncio.open_connection(host, port)
+	reader, writer = connection
+	writer.write(request)
+	head = await reader.readuntil(b'\r\n\r\n')
+	status_code = int(head.split(b' ', 2)[1])
+	length = 0
+	retry_after = None
+	for line in head.split(b'\r\n')[1:]:
+		name, _, value = line.partition(b':')
+		name = name.strip().lower()
+		if name == b'content-length':
+			length = int(value)
+		elif name == b'retry-after':
+			retry_after = float(value)
+	await reader.readexactly(length)
+	return status_code, retry_after
+
+
+async def _login_connection(host, port, request, remaining, statuses):
+	connection = [None, None]
+	while remaining:
+		remaining.pop()
+		failures = 0
+		while True:
+			try:
+				status_code, retry_after = await _login(host, port, request, connection)
+			except (OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError, IndexError):
+				# the server closes keep-alive connections that sat idle during a backoff
+				if connection[1] is not None:
+					connection[1].close()
+				connection[:] = [None, None]
+				failures += 1
+				if failures < 3:
+					continue
+				status_code = 'socket_error'
+				break
+			if status_code != 503 or retry_after is None:
+				break
+			# a well-behaved client: back off as told, with jitter, then retry
+			statuses['retried'] = statuses.get('retried', 0) + 1
+			await asyncio.sleep(retry_after * (1 + random.random()))
+		statuses[status_code] = statuses.get(status_code, 0) + 1
+	if connection[1] is not None:
+		connection[1].close()
+
+
+def _burst_process(url, body, total, connections, queue):
+	"""POST `total` logins over `connections` keep-alive connections; a 503
+	with Retry-After is retried after that long."""
+	parts = urlsplit(url)
+	payload = json.dumps(body).encode()
+	request = (
+		f'POST {parts.path} HTTP/1.1\r\nHost: {parts.netloc}\r\nConnection: keep-alive\r\n'
+		f'Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n\r\n'
+	).encode() + payload
+	remaining = list(range(total))
+	statuses = {}
+
+	async def run():
+		await asyncio.gather(*(
+			_login_connection(parts.hostname, parts.port or 80, request, remaining, statuses)
+			for _ in range(connections)
+		))
+
+	start = time.monotonic()
+	asyncio.run(run())
+	queue.put((statuses, time.monotonic() - start))
+
+
+class Command(BaseCommand):
+	help = (
+		'Login storm benchmark: p50/p99 of an unrelated endpoint on its own, then while a burst of '
+		'logins (PBKDF2) hits the same server, once with the password pool (api/passwords.py) and '
+		'once hashing on the request threads (HR_PASSWORD_POOL_WORKERS=0). Starts a gunicorn '
+		'(gthread) server per mode unless --url points at a running one. A throwaway employee with '
+		'a real PBKDF2 hash is created for the burst and deleted afterwards.'
+	)
+
+	def add_arguments(self, parser):
+		parser.add_argument('--logins', type=int, default=1000, help='Logins in the burst.')
+		parser.add_argument('--login-connections', type=int, default=50, help='Concurrent connections sending logins.')
+		parser.add_argument('--probe-path', default='leave/pending/', help='Unrelated endpoint under /api/ to measure.')
+		parser.add_argument('--probe-connections', type=int, default=8, help='Concurrent connections on the probe endpoint.')
+		parser.add_argument('--duration', type=float, default=15, help='Seconds of probing, before and during the burst.')
+		parser.add_argument('--modes', default='pool,inline', help='Comma-separated: pool, inline.')
+		parser.add_argument('--threads', type=int, default=32, help='gunicorn gthread threads.')
+		parser.add_argument('--url', help='Base URL of an already running server (measured as a single mode).')
+		parser.add_argument('--report', help='Also write the results as JSON to this path.')
+
+	def handle(self, *args, **options):
+		modes = [m for m in options['modes'].split(',') if m]
+		if options['url']:
+			modes = ['server']
+		elif set(modes) - {'pool', 'inline'}:
+			raise CommandError('--modes takes pool and/or inline')
+		tag = uuid.uuid4().hex[:8]
+		password = f'burst-{tag}'
+		hr = HR.objects.create(name='Burst HR', email=f'hr-{tag}@bench.invalid', password='-', department='bench')
+		# a real PBKDF2 hash, whatever PASSWORD_HASHERS the test settings use
+		emp = Employee.objects.create(
+			name='Burst', email=f'burst-{tag}@bench.invalid', password=make_password(password, hasher='pbkdf2_sha256'),
+			department='bench', designation='Bench', salary=0, hr=hr,
+		)
+		body = {'email': emp.email, 'password': password}
+		results = {'logins': options['logins'], 'probe_path': options['probe_path'], 'runs': []}
+		self.stdout.write(
+			f'{"mode":>7} {"phase":>7} {"req/s":>8} {"p50 ms":>8} {"p99 ms":>8} {"logins ok":>10} {"retried":>8} '
+			f'{"other":>6} {"burst s":>8}'
+		)
+		try:
+			for mode in modes:
+				servers = []
+				try:
+					base = options['url'] or self._spawn(servers, mode, options['threads'])
+					results['runs'].extend(self._measure(mode, base.rstrip('/'), body, options))
+				finally:
+					for process in servers:
+						process.terminate()
+						process.wait(timeout=10)
+		finally:
+			emp.delete()
+			hr.delete()
+		if options['report']:
+			with open(options['report'], 'w') as f:
+				json.dump(results, f, indent=2)
+
+	def _measure(self, mode, base, body, options):
+		probe = f'{base}/api/{options["probe_path"]}'
+		load_test(probe, 1, 1, 1)  # warm up connections, caches and the ORM
+		quiet = load_test(probe, options['probe_connections'], options['duration'], 1)
+		queue = multiprocessing.Queue()
+		burst = multiprocessing.Process(
+			target=_burst_process,
+			args=(f'{base}/api/login/', body, options['logins'], options['login_connections'], queue),
+		)
+		burst.start()
+		loaded = load_test(probe, options['probe_connections'], options['duration'], 1)
+		statuses, burst_seconds = queue.get()
+		burst.join()
+		loaded['logins'] = {str(code): count for code, count in statuses.items()}
+		loaded['burst_s'] = round(burst_seconds, 2)
+		runs = []
+		for phase, run in (('quiet', quiet), ('burst', loaded)):
+			run.update(mode=mode, phase=phase)
+			runs.append(run)
+			ok = statuses.get(200, 0) if phase == 'burst' else ''
+			retried = statuses.get('retried', 0) if phase == 'burst' else ''
+			other = sum(c for code, c in statuses.items() if code not in (200, 'retried')) if phase == 'burst' else ''
+			burst_s = run.get('burst_s', '')
+			self.stdout.write(
+				f'{mode:>7} {phase:>7} {run["throughput_rps"]:>8} {run["p50_ms"]!s:>8} {run["p99_ms"]!s:>8} '
+				f'{ok!s:>10} {retried!s:>8} {other!s:>6} {burst_s!s:>8}'
+			)
+		return runs
+
+	def _spawn(self, servers, mode, threads):
+		port = _free_port()
+		env = dict(os.environ)
+		if mode == 'inline':
+			env['HR_PASSWORD_POOL_WORKERS'] = '0'
+			# the old behaviour: every request thread hashes and nothing is shed
+			env['HR_PASSWORD_POOL_MAX_PENDING'] = str(threads)
+		command = [
+			sys.executable, '-m', 'gunicorn', 'backend.wsgi:application', '--bind', f'127.0.0.1:{port}',
+			'--worker-class', 'gthread', '--workers', '1', '--threads', str(threads), '--backlog', '8192',
+			'--log-level', 'warning',
+		]
+		try:
+			process = subprocess.Popen(command, cwd=settings.BASE_DIR, env=env)
+		except OSError as e:
+			raise CommandError(f'could not start the server: {e}')
+		servers.append(process)
+		_wait_for_port(port, process)
+		return f'http://127.0.0.1:{port}'
@@ -0,0 +1,68 @@
+import time
+import uuid
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from api.fieldsets import TASK_LIST
+from api.models import HR, Employee, Task
+from api.renderers import ORJSONRenderer
+from api.serializers import TaskSerializer
+
+
+class Command(BaseCommand):
+	help = (
+		'Time the task list response body: ModelSerializer + DRF JSONRenderer (before) against the '
+		'values_list() schema path + orjson renderer (after), with and without a sparse ?fields= set. '
+		'Throwaway rows are created inside a transaction that is rolled back.'
+	)
+
+	def add_arguments(self, parser):
+		parser.add_argument('--rows', type=int, default=10000, help='Tasks in the list.')
+		parser.add_argument('--repeat', type=int, default=5, help='Runs per variant; the best is reported.')
+		parser.add_argument('--fields', default='id,title,status,due_date', help='Sparse fieldset for the last variant.')
+
+	def handle(self, *args, **options):
+		with transaction.atomic():
+			tag = uuid.uuid4().hex[:8]
+			hr = HR.objects.create(name='Bench HR', email=f'hr-{tag}@bench.invalid', password='-', department='bench')
+			emp = Employee.objects.create(
+				name='Bench', email=f'emp-{tag}@bench.invalid', password='!', department='bench',
+				designation='Bench', salary=0, hr=hr,
+			)
+			Task.objects.bulk_create([
+				Task(hr=hr, employee=emp, title=f'Task {i}', description='x' * 80, due_date=date.today())
+				for i in range(options['rows'])
+			], batch_size=1000)
+			qs = Task.objects.filter(hr=hr).order_by('-created_at')
+			sparse = TASK_LIST.parse(options['fields'])
+			everything = TASK_LIST.parse(None)
+
+			variants = (
+				('serializer + json', lambda: TaskSerializer(qs.select_related('hr', 'employee'), many=True).data, JSONRenderer()),
+				('values + orjson', lambda: TASK_LIST.render(TASK_LIST.queryset(qs, everything), everything), ORJSONRenderer()),
+				('values + orjson ?fields', lambda: TASK_LIST.render(TASK_LIST.queryset(qs, sparse), sparse), ORJSONRenderer()),
+			)
+			self.stdout.write(f'rows={options["rows"]} (times scaled to 10k rows, best of {options["repeat"]})')
+			self.stdout.write(f'{"variant":<26} {"query+serialize ms":>19} {"render ms":>10} {"total ms":>9} {"bytes":>10}')
+			for name, serialize, renderer in variants:
+				self._report(name, serialize, renderer, options['rows'], options['repeat'])
+			transaction.set_rollback(True)
+
+	def _report(self, name, serialize, renderer, rows, repeat):
+		best = None
+		for _ in range(repeat):
+			start = time.perf_counter()
+			data = serialize()
+			serialized = time.perf_counter()
+			body = renderer.render(data)
+			rendered = time.perf_counter()
+			timing = (serialized - start, rendered - serialized)
+			if best is None or sum(timing) < sum(best):
+				best = timing
+		scale = 10000 / max(rows, 1) * 1000
+		self.stdout.write(
+			f'{name:<26} {best[0] * scale:>19.1f} {best[1] * scale:>10.1f} {sum(best) * scale:>9.1f} {len(body):>10}'
+		)
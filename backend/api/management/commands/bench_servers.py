@@ -0,0 +1,206 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+def _percentile(sorted_values, fraction):
+	if not sorted_values:
+		return None
+	return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+async def _connection(host, port, request, deadline, latencies, counters):
+	reader = writer = None
+	while time.monotonic() < deadline:
+		try:
+			if writer is None:
+				reader, writer = await asyncio.open_connection(host, port)
+			start = time.perf_counter()
+			writer.write(request)
+			head = await reader.readuntil(b'\r\n\r\n')
+			status_code = int(head.split(b' ', 2)[1])
+			length = None
+			keep_alive = True
+			for line in head.split(b'\r\n')[1:]:
+				name, _, value = line.partition(b':')
+				name = name.strip().lower()
+				if name == b'content-length':
+					length = int(value)
+				elif name == b'connection' and value.strip().lower() == b'close':
+					keep_alive = False
+			if length is None:
+				await reader.read()
+				keep_alive = False
+			else:
+				await reader.readexactly(length)
+			latencies.append(time.perf_counter() - start)
+			counters['ok' if status_code < 400 else 'http_errors'] += 1
+			if not keep_alive:
+				writer.close()
+				writer = None
+		except (OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError, IndexError):
+			counters['socket_errors'] += 1
+			if writer is not None:
+				writer.close()
+			writer = None
+			await asyncio.sleep(0.05)
+	if writer is not None:
+		writer.close()
+
+
+def _client_process(url, connections, duration, queue):
+	parts = urlsplit(url)
+	path = parts.path + ('?' + parts.query if parts.query else '')
+	request = f'GET {path} HTTP/1.1\r\nHost: {parts.netloc}\r\nConnection: keep-alive\r\n\r\n'.encode()
+	latencies = []
+	counters = {'ok': 0, 'http_errors': 0, 'socket_errors': 0}
+
+	async def run():
+		deadline = time.monotonic() + duration
+		await asyncio.gather(*(
+			_connection(parts.hostname, parts.port or 80, request, deadline, latencies, counters)
+			for _ in range(connections)
+		))
+
+	start = time.monotonic()
+	asyncio.run(run())
+	# requests in flight at the deadline still finish, so time the whole run
+	queue.put((latencies, counters, time.monotonic() - start))
+
+
+def load_test(url, connections, duration, processes):
+	"""Hold `connections` keep-alive connections open against url for
+	`duration` seconds, split over `processes` client processes.
+
+	Returns: { "connections", "requests", "elapsed_s", "throughput_rps", "p50_ms",
+	"p99_ms", "http_errors", "socket_errors" }
+	"""
+	processes = max(1, min(processes, connections))
+	queue = multiprocessing.Queue()
+	shares = [connections // processes + (1 if i < connections % processes else 0) for i in range(processes)]
+	workers = [multiprocessing.Process(target=_client_process, args=(url, share, duration, queue)) for share in shares]
+	for worker in workers:
+		worker.start()
+	latencies = []
+	totals = {'ok': 0, 'http_errors': 0, 'socket_errors': 0}
+	elapsed = duration
+	for _ in workers:
+		part, counters, seconds = queue.get()
+		elapsed = max(elapsed, seconds)
+		latencies.extend(part)
+		for name, value in counters.items():
+			totals[name] += value
+	for worker in workers:
+		worker.join()
+	latencies.sort()
+
+	def ms(value):
+		return None if value is None else round(value * 1000, 2)
+
+	return {
+		'connections': connections,
+		'requests': totals['ok'],
+		'elapsed_s': round(elapsed, 2),
+		'throughput_rps': round(totals['ok'] / elapsed, 1),
+		'p50_ms': ms(_percentile(latencies, 0.50)),
+		'p99_ms': ms(_percentile(latencies, 0.99)),
+		'http_errors': totals['http_errors'],
+		'socket_errors': totals['socket_errors'],
+	}
+
+
+def _free_port():
+	with socket.socket() as s:
+		s.bind(('127.0.0.1', 0))
+		return s.getsockname()[1]
+
+
+def _wait_for_port(port, process, timeout=30):
+	deadline = time.monotonic() + timeout
+	while time.monotonic() < deadline:
+		if process.poll() is not None:
+			raise CommandError(f'server exited with status {process.returncode}')
+		try:
+			with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+				return
+		except OSError:
+			time.sleep(0.2)
+	raise CommandError(f'server on port {port} did not start')
+
+
+class Command(BaseCommand):
+	help = (
+		'Side-by-side WSGI vs ASGI benchmark: throughput and p50/p99 latency of a sync endpoint '
+		'under gunicorn (gthread) and its /api/async/ twin under uvicorn, at several connection '
+		'counts. Starts both servers itself unless --wsgi-url/--asgi-url point at running ones. '
+		'Raise the open-file limit (ulimit -n) above the largest connection count.'
+	)
+
+	def add_arguments(self, parser):
+		parser.add_argument('--path', default='leave/mine/?employee=1', help='Endpoint under /api/ (and /api/async/).')
+		parser.add_argument('--connections', default='100,1000,5000', help='Comma-separated concurrent connection counts.')
+		parser.add_argument('--duration', type=float, default=10, help='Seconds per run.')
+		parser.add_argument('--client-processes', type=int, default=min(os.cpu_count() or 1, 4), help='Load generator processes.')
+		parser.add_argument('--threads', type=int, default=32, help='gunicorn gthread threads (the WSGI concurrency limit).')
+		parser.add_argument('--wsgi-url', help='Base URL of an already running WSGI server.')
+		parser.add_argument('--asgi-url', help='Base URL of an already running ASGI server.')
+		parser.add_argument('--report', help='Also write the results as JSON to this path.')
+
+	def handle(self, *args, **options):
+		counts = [int(c) for c in options['connections'].split(',') if c]
+		servers = []
+		try:
+			wsgi = options['wsgi_url'] or self._spawn(servers, 'wsgi', options['threads'])
+			asgi = options['asgi_url'] or self._spawn(servers, 'asgi', options['threads'])
+			targets = {
+				'wsgi': wsgi.rstrip('/') + '/api/' + options['path'],
+				'asgi': asgi.rstrip('/') + '/api/async/' + options['path'],
+			}
+			results = {'path': options['path'], 'duration_s': options['duration'], 'runs': []}
+			self.stdout.write(f'{"server":>6} {"conns":>6} {"req/s":>9} {"p50 ms":>9} {"p99 ms":>9} {"errors":>7}')
+			for count in counts:
+				for name, url in targets.items():
+					run = load_test(url, count, options['duration'], options['client_processes'])
+					run['server'] = name
+					results['runs'].append(run)
+					self.stdout.write(
+						f'{name:>6} {count:>6} {run["throughput_rps"]:>9} {run["p50_ms"]!s:>9} {run["p99_ms"]!s:>9} '
+						f'{run["http_errors"] + run["socket_errors"]:>7}'
+					)
+		finally:
+			for process in servers:
+				process.terminate()
+				process.wait(timeout=10)
+		if options['report']:
+			with open(options['report'], 'w') as f:
+				json.dump(results, f, indent=2)
+
+	def _spawn(self, servers, kind, threads):
+		port = _free_port()
+		if kind == 'wsgi':
+			command = [
+				sys.executable, '-m', 'gunicorn', 'backend.wsgi:application', '--bind', f'127.0.0.1:{port}',
+				'--worker-class', 'gthread', '--workers', '1', '--threads', str(threads), '--backlog', '8192',
+				'--log-level', 'warning',
+			]
+		else:
+			command = [
+				sys.executable, '-m', 'uvicorn', 'backend.asgi:application', '--port', str(port),
+				'--backlog', '8192', '--log-level', 'warning', '--no-access-log',
+			]
+		try:
+			process = subprocess.Popen(command, cwd=settings.BASE_DIR)
+		except OSError as e:
+			raise CommandError(f'could not start the {kind} server: {e}')
+		servers.append(process)
+		_wait_for_port(port, process)
+		return f'http://127.0.0.1:{port}'
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.outbox import drain_outbox
+
+
+class Command(BaseCommand):
+	help = 'Deliver pending outbox messages (welcome emails) with retry and dead-lettering.'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--once', action='store_true', help='Drain due messages and exit instead of polling.')
+		parser.add_argument('--batch-size', type=int, default=None, help='Messages claimed per batch.')
+		parser.add_argument('--interval', type=float, default=2.0, help='Seconds to sleep when the outbox is idle.')
+
+	def handle(self, *args, **options):
+		while True:
+			result = drain_outbox(batch_size=options['batch_size'])
+			if any(result.values()):
+				self.stdout.write(f"sent={result['sent']} retried={result['retried']} dead={result['dead']}")
+				# a full batch may mean more is due; go again without sleeping
+				continue
+			if options['once']:
+				return
+			time.sleep(options['interval'])
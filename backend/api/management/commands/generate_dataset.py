@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from api.dataset import generate_dataset
+
+
+class Command(BaseCommand):
+	help = (
+		'Insert a seeded synthetic dataset for benchmarks: HRs, employees, weekday attendance over '
+		'--days, leaves and tasks, with bulk inserts. The full-scale example is '
+		'--hrs 200 --employees 100000 --days 1095 (about 78 million attendance rows). '
+		'Generated employees and HRs sign in with the password "synthetic-pass".'
+	)
+
+	def add_arguments(self, parser):
+		parser.add_argument('--hrs', type=int, default=20)
+		parser.add_argument('--employees', type=int, default=2000)
+		parser.add_argument('--days', type=int, default=365, help='Days of attendance history, ending yesterday.')
+		parser.add_argument('--leaves-per-year', type=float, default=6, help='Past leaves per employee per year.')
+		parser.add_argument('--tasks-per-employee', type=int, default=10)
+		parser.add_argument('--seed', type=int, default=0, help='Same seed and sizes give the same rows.')
+		parser.add_argument('--batch-size', type=int, default=500, help='Employees per insert transaction.')
+
+	def handle(self, *args, **options):
+		if options['hrs'] < 1 or options['employees'] < 0 or options['days'] < 1:
+			raise CommandError('--hrs and --days must be positive and --employees non-negative')
+		started = time.perf_counter()
+		try:
+			counts = generate_dataset(
+				hrs=options['hrs'], employees=options['employees'], days=options['days'],
+				leaves_per_year=options['leaves_per_year'], tasks_per_employee=options['tasks_per_employee'],
+				seed=options['seed'], batch_size=options['batch_size'],
+				progress=lambda message: self.stdout.write(message) if options['verbosity'] > 1 else None,
+			)
+		except IntegrityError as e:
+			raise CommandError(f'could not insert the dataset ({e}); a dataset with seed {options["seed"]} may already exist')
+		elapsed = time.perf_counter() - started
+		self.stdout.write(', '.join(f'{name}={count}' for name, count in counts.items()) + f' in {elapsed:.1f}s')
@@ -0,0 +1,24 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from api.employee_import import IMPORT_CHUNK_SIZE, import_employees_csv
+
+
+class Command(BaseCommand):
+	help = 'Bulk-import employees from a CSV file (name,email,password,department,designation,salary[,hr]).'
+
+	def add_arguments(self, parser):
+		parser.add_argument('csv_path')
+		parser.add_argument('--hr', type=int, default=None, help='HR id for rows without an hr column.')
+		parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE)
+		parser.add_argument('--jobs', type=int, default=None, help='Password pool jobs per chunk (default: PASSWORD_POOL_WORKERS).')
+		parser.add_argument('--report', default=None, help='Write the per-row error report to this JSON file.')
+
+	def handle(self, *args, **options):
+		with open(options['csv_path'], newline='', encoding='utf-8-sig') as f:
+			report = import_employees_csv(f, default_hr_id=options['hr'], chunk_size=options['chunk_size'], jobs=options['jobs'])
+		if options['report']:
+			with open(options['report'], 'w') as out:
+				json.dump(report, out, indent=2)
+		self.stdout.write(f"created={report['created']} errors={len(report['errors'])}")
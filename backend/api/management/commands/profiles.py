@@ -0,0 +1,90 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.profiling import PROFILE_HEADER, collapsed_stacks, list_profiles, load_profile, make_token, spool_dir
+
+
+def _hot_frames(document, top):
+	"""(self ms, total ms, frame) of the heaviest frames in the sampled stacks."""
+	frames = document['shared']['frames']
+	profile = document['profiles'][0]
+	own = {}
+	total = {}
+	for stack, weight in zip(profile['samples'], profile['weights']):
+		if not stack:
+			continue
+		own[stack[-1]] = own.get(stack[-1], 0) + weight
+		for index in set(stack):
+			total[index] = total.get(index, 0) + weight
+	ranked = sorted(total, key=lambda i: (own.get(i, 0), total[i]), reverse=True)[:top]
+	return [(own.get(i, 0), total[i], frames[i]) for i in ranked]
+
+
+class Command(BaseCommand):
+	help = (
+		'List and summarize the request profiles in PROFILE_SPOOL_DIR. With an id, show its hottest '
+		'frames and slowest queries; --folded prints collapsed stacks for flamegraph.pl. '
+		'--token prints an X-Profile-Token header value that profiles the requests carrying it.'
+	)
+
+	def add_arguments(self, parser):
+		parser.add_argument('profile_id', nargs='?', help='Profile to summarize (default: list recent profiles).')
+		parser.add_argument('--limit', type=int, default=20, help='Profiles to list.')
+		parser.add_argument('--top', type=int, default=15, help='Frames and queries to show for one profile.')
+		parser.add_argument('--folded', action='store_true', help='Print the profile as collapsed stacks.')
+		parser.add_argument('--token', action='store_true', help='Print a signed profiling header value.')
+
+	def handle(self, *args, **options):
+		if options['token']:
+			self.stdout.write(f'{PROFILE_HEADER}: {make_token()}')
+			return
+		if not options['profile_id']:
+			self._list(options['limit'])
+			return
+		try:
+			document = load_profile(options['profile_id'])
+		except FileNotFoundError:
+			raise CommandError(f'no profile {options["profile_id"]} in {spool_dir()}')
+		if options['folded']:
+			for line in collapsed_stacks(document):
+				self.stdout.write(line)
+			return
+		self._summarize(document, options['top'])
+
+	def _list(self, limit):
+		ids = list_profiles()[:limit]
+		if not ids:
+			self.stdout.write(f'no profiles in {spool_dir()}')
+			return
+		self.stdout.write(f'{"id":<29} {"status":>6} {"ms":>9} {"samples":>7} {"queries":>7} {"db ms":>8}  request')
+		for profile_id in ids:
+			try:
+				document = load_profile(profile_id)
+			except (FileNotFoundError, ValueError):
+				continue  # rotated away or still being written
+			request = document['request']
+			db_ms = sum(q['duration_ms'] for q in request['queries'])
+			self.stdout.write(
+				f'{profile_id:<29} {request["status"]!s:>6} {request["duration_ms"]:>9.1f} '
+				f'{len(document["profiles"][0]["samples"]):>7} {len(request["queries"]):>7} {db_ms:>8.1f}  '
+				f'{request["method"]} {request["path"]} ({request["route"]})'
+			)
+
+	def _summarize(self, document, top):
+		request = document['request']
+		started = datetime.datetime.fromtimestamp(request['started_at'], datetime.timezone.utc)
+		queries = request['queries']
+		self.stdout.write(f'{request["method"]} {request["path"]} -> {request["status"]} ({request["route"]})')
+		self.stdout.write(
+			f'started {started:%Y-%m-%d %H:%M:%S} UTC, {request["duration_ms"]:.1f} ms, '
+			f'{len(queries)} queries in {sum(q["duration_ms"] for q in queries):.1f} ms, '
+			f'sampled every {request["interval_ms"]:g} ms'
+		)
+		self.stdout.write('\nhottest frames (self ms, total ms):')
+		for own, total, frame in _hot_frames(document, top):
+			self.stdout.write(f'{own:>9.1f} {total:>9.1f}  {frame["name"]}  {frame.get("file", "")}:{frame.get("line", "")}')
+		self.stdout.write('\nslowest queries (ms, rows):')
+		for query in sorted(queries, key=lambda q: q['duration_ms'], reverse=True)[:top]:
+			sql = ' '.join(query['sql'].split())
+			self.stdout.write(f'{query["duration_ms"]:>9.2f} {query["rows"]:>6}  {sql[:160]}')
@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.changelog import prune_changelog
+
+
+class Command(BaseCommand):
+	help = (
+		'Delete delta-sync log entries older than CHANGELOG_RETENTION_DAYS. Run it daily (cron); '
+		'clients whose cursor predates the kept entries get 410 from /api/sync/ and reload.'
+	)
+
+	def handle(self, *args, **options):
+		deleted = prune_changelog()
+		self.stdout.write(f'deleted {deleted} entries older than {settings.CHANGELOG_RETENTION_DAYS} days')
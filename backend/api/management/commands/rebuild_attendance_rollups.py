@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from api.cache import invalidate_tags
+from api.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+	help = 'Recompute the monthly/department attendance rollups from the Attendance table.'
+
+	def handle(self, *args, **options):
+		result = rebuild_rollups()
+		invalidate_tags('Attendance')
+		self.stdout.write(f"monthly={result['monthly']} daily={result['daily']}")
@@ -0,0 +1,27 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.replication import replica_paths, sync_replicas
+
+
+class Command(BaseCommand):
+	help = 'Keep the READ_REPLICAS SQLite files in sync with the primary (local stand-in for replication).'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--once', action='store_true', help='Copy once and exit.')
+		parser.add_argument('--interval', type=float, default=1.0, help='Seconds between copies.')
+
+	def handle(self, *args, **options):
+		paths = replica_paths()
+		if not paths:
+			raise CommandError('No read replicas configured; set HR_READ_REPLICAS.')
+		source = settings.DATABASES['default']['NAME']
+		while True:
+			started = time.perf_counter()
+			sync_replicas(source, paths)
+			self.stdout.write(f'synced {len(paths)} replica(s) in {(time.perf_counter() - started) * 1000:.1f} ms')
+			if options['once']:
+				return
+			time.sleep(options['interval'])
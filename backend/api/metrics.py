@@ -0,0 +1,342 @@
+import contextvars
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+import weakref
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse
+from django.views.decorators.http import require_GET
+
+
+# Per-endpoint request metrics in Prometheus text format. Every thread that
+# records holds a counter file slot in METRICS_DIR ("<pid>-<slot>.db"),
+# mapped with mmap and written only by that thread, so recording takes no
+# lock. When the thread exits its slot, file still open, goes back to the
+# process's free list and the next new thread carries on counting in it, so
+# a process has as many files as it ever had recording threads at once, not
+# one per thread it started. /metrics sums the files of every worker
+# process. Counters survive their process until the directory is cleared,
+# so empty METRICS_DIR when the server (re)starts, as with
+# prometheus_client's multiprocess mode.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# family -> (type, help)
+METRIC_FAMILIES = {
+	'api_requests_total': ('counter', 'Requests by route, method and status code.'),
+	'api_request_duration_seconds': ('histogram', 'Time until the response is returned, by route.'),
+	'api_db_queries_total': ('counter', 'Database queries run while handling the request, by route.'),
+	'api_db_query_seconds_total': ('counter', 'Time spent in database queries, by route.'),
+	'api_render_seconds_total': ('counter', 'Time spent rendering response bodies (DRF renderers, templates), by route.'),
+	'api_exceptions_total': ('counter', 'Exceptions that escaped the view, by route and exception class.'),
+	'api_password_queue_seconds': ('histogram', 'Time password jobs waited for a pool worker, by job.'),
+	'api_password_run_seconds_total': ('counter', 'Time pool workers spent hashing, by job.'),
+	'api_password_rejected_total': ('counter', 'Password jobs refused because the pool was saturated, by job.'),
+}
+
+_HEADER = struct.Struct('<I4x')  # bytes in use, then padding to 8
+_KEY_LENGTH = struct.Struct('<I')
+_VALUE = struct.Struct('<d')
+_INITIAL_SIZE = 64 * 1024
+
+
+def _metrics_dir():
+	return getattr(settings, 'METRICS_DIR', None) or os.path.join(tempfile.gettempdir(), 'hr-portal-metrics')
+
+
+def _entries(buf, used):
+	"""Yield (key, value, value offset) for each entry of a counter file.
+
+	Entry layout: uint32 key length, utf-8 key padded so the float64 value
+	that follows is 8-byte aligned.
+	"""
+	pos = _HEADER.size
+	used = min(used, len(buf))
+	while pos + _KEY_LENGTH.size <= used:
+		length = _KEY_LENGTH.unpack_from(buf, pos)[0]
+		key_end = pos + _KEY_LENGTH.size + length
+		value_at = key_end + (-key_end % 8)
+		if value_at + _VALUE.size > used:
+			break
+		yield bytes(buf[pos + _KEY_LENGTH.size:key_end]).decode(), _VALUE.unpack_from(buf, value_at)[0], value_at
+		pos = value_at + _VALUE.size
+
+
+class CounterFile:
+	"""Float counters in one mmap'd file; a single thread writes it."""
+
+	def __init__(self, path):
+		self.path = path
+		self._file = open(path, 'a+b')
+		size = os.fstat(self._file.fileno()).st_size
+		if size == 0:
+			size = _INITIAL_SIZE
+			self._file.truncate(size)
+		self._map = mmap.mmap(self._file.fileno(), size)
+		self._used = _HEADER.unpack_from(self._map, 0)[0] or _HEADER.size
+		# an existing file (same pid and slot after a restart) is continued
+		self._offsets = {key: offset for key, _, offset in _entries(self._map, self._used)}
+
+	def inc(self, key, amount=1.0):
+		offset = self._offsets.get(key)
+		if offset is None:
+			offset = self._add(key)
+		_VALUE.pack_into(self._map, offset, _VALUE.unpack_from(self._map, offset)[0] + amount)
+
+	def _add(self, key):
+		encoded = key.encode()
+		key_end = self._used + _KEY_LENGTH.size + len(encoded)
+		value_at = key_end + (-key_end % 8)
+		end = value_at + _VALUE.size
+		if end > len(self._map):
+			size = len(self._map)
+			while size < end:
+				size *= 2
+			self._file.truncate(size)
+			self._map.resize(size)
+		_KEY_LENGTH.pack_into(self._map, self._used, len(encoded))
+		self._map[self._used + _KEY_LENGTH.size:key_end] = encoded
+		_VALUE.pack_into(self._map, value_at, 0.0)
+		# readers only look below the header's length, so publish the entry last
+		self._used = end
+		_HEADER.pack_into(self._map, 0, end)
+		self._offsets[key] = value_at
+		return value_at
+
+
+_local = threading.local()
+_slots_lock = threading.Lock()
+_free_slots = {}  # (pid, directory) -> [CounterFile] left by threads that exited
+_slot_counts = {}  # (pid, directory) -> slots created
+
+
+class _SlotOwner:
+	"""Kept in the thread's locals; finalized when they are dropped."""
+
+
+def _take_slot(key):
+	with _slots_lock:
+		free = _free_slots.get(key)
+		if free:
+			return free.pop()
+		slot = _slot_counts.get(key, 0)
+		_slot_counts[key] = slot + 1
+	pid, directory = key
+	os.makedirs(directory, exist_ok=True)
+	return CounterFile(os.path.join(directory, f'{pid}-{slot}.db'))
+
+
+def _release_slot(key, counters):
+	with _slots_lock:
+		_free_slots.setdefault(key, []).append(counters)
+
+
+def _counters():
+	directory = _metrics_dir()
+	key = (os.getpid(), directory)
+	counters = getattr(_local, 'counters', None)
+	# a forked worker must not write into its parent's files
+	if counters is None or _local.key != key:
+		counters = _take_slot(key)
+		_local.counters = counters
+		_local.key = key
+		# the thread's locals are dropped when it exits (or replaced here),
+		# which hands the slot to the next thread that records
+		_local.owner = _SlotOwner()
+		weakref.finalize(_local.owner, _release_slot, key, counters)
+	return counters
+
+
+def _escape(value):
+	return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _sample(name, **labels):
+	return name + '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + '}'
+
+
+def collect():
+	"""Sum every counter file in METRICS_DIR. Returns {sample key: value}."""
+	directory = _metrics_dir()
+	totals = {}
+	try:
+		names = sorted(os.listdir(directory))
+	except FileNotFoundError:
+		return totals
+	for name in names:
+		if not name.endswith('.db'):
+			continue
+		try:
+			with open(os.path.join(directory, name), 'rb') as f:
+				data = f.read()
+		except OSError:
+			continue
+		if len(data) < _HEADER.size:
+			continue
+		for key, value, _ in _entries(data, _HEADER.unpack_from(data, 0)[0]):
+			totals[key] = totals.get(key, 0.0) + value
+	return totals
+
+
+def _family(key):
+	name = key.partition('{')[0]
+	if name not in METRIC_FAMILIES:
+		for suffix in ('_bucket', '_sum', '_count'):
+			if name.endswith(suffix):
+				return name[:-len(suffix)]
+	return name
+
+
+def render_metrics(totals):
+	"""Prometheus text exposition (format 0.0.4) of collect()'s result."""
+	families = {}
+	# dicts keep first-seen order, which keeps histogram buckets ascending
+	for key, value in totals.items():
+		families.setdefault(_family(key), []).append((key, value))
+	lines = []
+	for family in sorted(families):
+		kind, help_text = METRIC_FAMILIES.get(family, ('untyped', ''))
+		lines.append(f'# HELP {family} {help_text}')
+		lines.append(f'# TYPE {family} {kind}')
+		lines.extend(f'{key} {value!r}' for key, value in families[family])
+	return '\n'.join(lines) + '\n'
+
+
+class _RequestStats:
+	__slots__ = ('queries', 'db_seconds', 'render_started', 'render_seconds')
+
+	def __init__(self):
+		self.queries = 0
+		self.db_seconds = 0.0
+		self.render_started = None
+		self.render_seconds = 0.0
+
+
+_current = contextvars.ContextVar('api_request_stats', default=None)
+
+
+def _time_queries(execute, sql, params, many, context):
+	stats = _current.get()
+	if stats is None:
+		return execute(sql, params, many, context)
+	start = time.perf_counter()
+	try:
+		return execute(sql, params, many, context)
+	finally:
+		stats.queries += 1
+		stats.db_seconds += time.perf_counter() - start
+
+
+def instrument_connection(connection):
+	"""Count queries on a connection for the request running in this context.
+
+	Installed once per connection (from connection_created) rather than per
+	request, because async views run their queries on another thread's
+	connection; the request is found through a context variable that
+	sync_to_async carries over.
+	"""
+	if _time_queries not in connection.execute_wrappers:
+		connection.execute_wrappers.insert(0, _time_queries)
+
+
+def route_name(request):
+	match = getattr(request, 'resolver_match', None)
+	if match is None:
+		return '<unmatched>'
+	return match.view_name or match.route
+
+
+def _observe(counters, family, value, **labels):
+	for bound in LATENCY_BUCKETS:
+		counters.inc(_sample(family + '_bucket', **labels, le=bound), 1 if value <= bound else 0)
+	counters.inc(_sample(family + '_bucket', **labels, le='+Inf'))
+	counters.inc(_sample(family + '_sum', **labels), value)
+	counters.inc(_sample(family + '_count', **labels))
+
+
+def record(request, response, stats, duration, exception=None):
+	counters = _counters()
+	route = route_name(request)
+	status_code = response.status_code if response is not None else 500
+	counters.inc(_sample('api_requests_total', route=route, method=request.method, status=status_code))
+	_observe(counters, 'api_request_duration_seconds', duration, route=route)
+	counters.inc(_sample('api_db_queries_total', route=route), stats.queries)
+	counters.inc(_sample('api_db_query_seconds_total', route=route), stats.db_seconds)
+	counters.inc(_sample('api_render_seconds_total', route=route), stats.render_seconds)
+	if exception is not None:
+		counters.inc(_sample('api_exceptions_total', route=route, exception=type(exception).__name__))
+
+
+def record_password_job(job, queue_seconds, run_seconds):
+	"""Queue wait and hashing time of one api.passwords pool job."""
+	counters = _counters()
+	_observe(counters, 'api_password_queue_seconds', queue_seconds, job=job)
+	counters.inc(_sample('api_password_run_seconds_total', job=job), run_seconds)
+
+
+def record_password_rejected(job):
+	_counters().inc(_sample('api_password_rejected_total', job=job))
+
+
+class RequestMetricsMiddleware:
+	"""Record count, latency, status, query count/time and render time per
+	resolved URL name. Put it first in MIDDLEWARE so the timing covers the
+	rest of the stack. A streamed body is produced after the response is
+	returned, so only its time to first byte is measured."""
+
+	sync_capable = True
+	async_capable = True
+
+	def __init__(self, get_response):
+		self.get_response = get_response
+		if iscoroutinefunction(get_response):
+			markcoroutinefunction(self)
+
+	def __call__(self, request):
+		if iscoroutinefunction(self):
+			return self.__acall__(request)
+		stats = _RequestStats()
+		token = _current.set(stats)
+		start = time.perf_counter()
+		try:
+			response = self.get_response(request)
+		finally:
+			_current.reset(token)
+		record(request, response, stats, time.perf_counter() - start, getattr(request, '_metrics_exception', None))
+		return response
+
+	async def __acall__(self, request):
+		stats = _RequestStats()
+		token = _current.set(stats)
+		start = time.perf_counter()
+		try:
+			response = await self.get_response(request)
+		finally:
+			_current.reset(token)
+		record(request, response, stats, time.perf_counter() - start, getattr(request, '_metrics_exception', None))
+		return response
+
+	def process_exception(self, request, exception):
+		# Django still turns it into a 500 response; just remember the class
+		request._metrics_exception = exception
+
+	def process_template_response(self, request, response):
+		stats = _current.get()
+		if stats is not None:
+			stats.render_started = time.perf_counter()
+
+			def rendered(response):
+				stats.render_seconds += time.perf_counter() - stats.render_started
+
+			response.add_post_render_callback(rendered)
+		return response
+
+
+@require_GET
+def metrics_view(request):
+	return HttpResponse(render_metrics(collect()), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_outbox_message'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DepartmentDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('department', models.CharField(max_length=100)),
+                ('date', models.DateField()),
+                ('present', models.IntegerField(default=0)),
+                ('leave', models.IntegerField(default=0)),
+                ('absent', models.IntegerField(default=0)),
+                ('check_in_count', models.IntegerField(default=0)),
+                ('check_in_seconds', models.BigIntegerField(default=0)),
+                ('check_out_count', models.IntegerField(default=0)),
+                ('check_out_seconds', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('department', 'date')},
+            },
+        ),
+        migrations.CreateModel(
+            name='AttendanceMonthlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('present', models.IntegerField(default=0)),
+                ('leave', models.IntegerField(default=0)),
+                ('absent', models.IntegerField(default=0)),
+                ('check_in_count', models.IntegerField(default=0)),
+                ('check_in_seconds', models.BigIntegerField(default=0)),
+                ('check_out_count', models.IntegerField(default=0)),
+                ('check_out_seconds', models.BigIntegerField(default=0)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_rollups', to='api.employee')),
+            ],
+            options={
+                'unique_together': {('employee', 'month')},
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:22
+
+from django.db import migrations, models
+from django.db.models import ExpressionWrapper, IntegerField
+from django.db.models.functions import ExtractHour, ExtractMinute, ExtractSecond
+
+
+def _seconds(field):
+    return ExpressionWrapper(
+        ExtractHour(field) * 3600 + ExtractMinute(field) * 60 + ExtractSecond(field),
+        output_field=IntegerField(),
+    )
+
+
+def backfill_seconds(apps, schema_editor):
+    Attendance = apps.get_model('api', 'Attendance')
+    Attendance.objects.filter(check_in__isnull=False).update(check_in_seconds=_seconds('check_in'))
+    Attendance.objects.filter(check_out__isnull=False).update(check_out_seconds=_seconds('check_out'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_attendance_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendance',
+            name='check_in_seconds',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='attendance',
+            name='check_out_seconds',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['date', 'employee', 'check_in_seconds'], name='attendance_checkin_window_idx'),
+        ),
+        migrations.RunPython(backfill_seconds, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+from django.db import migrations
+
+
+FTS_SQL = [
+    """
+    CREATE VIRTUAL TABLE api_employee_fts USING fts5(
+        name, email, department, designation,
+        content='api_employee', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER api_employee_fts_ai AFTER INSERT ON api_employee BEGIN
+        INSERT INTO api_employee_fts(rowid, name, email, department, designation)
+        VALUES (new.id, new.name, new.email, new.department, new.designation);
+    END
+    """,
+    """
+    CREATE TRIGGER api_employee_fts_ad AFTER DELETE ON api_employee BEGIN
+        INSERT INTO api_employee_fts(api_employee_fts, rowid, name, email, department, designation)
+        VALUES ('delete', old.id, old.name, old.email, old.department, old.designation);
+    END
+    """,
+    """
+    CREATE TRIGGER api_employee_fts_au AFTER UPDATE OF name, email, department, designation ON api_employee BEGIN
+        INSERT INTO api_employee_fts(api_employee_fts, rowid, name, email, department, designation)
+        VALUES ('delete', old.id, old.name, old.email, old.department, old.designation);
+        INSERT INTO api_employee_fts(rowid, name, email, department, designation)
+        VALUES (new.id, new.name, new.email, new.department, new.designation);
+    END
+    """,
+    "INSERT INTO api_employee_fts(api_employee_fts) VALUES ('rebuild')",
+]
+
+DROP_SQL = [
+    'DROP TRIGGER IF EXISTS api_employee_fts_au',
+    'DROP TRIGGER IF EXISTS api_employee_fts_ad',
+    'DROP TRIGGER IF EXISTS api_employee_fts_ai',
+    'DROP TABLE IF EXISTS api_employee_fts',
+]
+
+
+def _run(statements):
+    def apply(apps, schema_editor):
+        # FTS5 is SQLite-only; other databases keep the icontains fallback
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return apply
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_attendance_seconds'),
+    ]
+
+    operations = [
+        migrations.RunPython(_run(FTS_SQL), _run(DROP_SQL)),
+    ]
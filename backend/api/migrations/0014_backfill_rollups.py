@@ -0,0 +1,19 @@
+from django.db import migrations
+
+
+def backfill_rollups(apps, schema_editor):
+    # 0008 created the rollup tables empty; fill them from the attendance
+    # recorded before incremental maintenance started
+    from api.rollups import rebuild_rollups
+    rebuild_rollups(apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_revoked_token'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,7 @@
 
 from django.db import models
-from django.contrib.auth.hashers import make_password
+from django.utils import timezone
+from .passwords import make_password
 
 
 class HR(models.Model):
@@ -22,6 +23,12 @@ class Employee(models.Model):
 	salary = models.DecimalField(max_digits=10, decimal_places=2)
 	hr = models.ForeignKey(HR, on_delete=models.CASCADE, related_name='employees')
 
+	class Meta:
+		indexes = [
+			# department grouping/filtering in the analytics endpoints
+			models.Index(fields=['department'], name='employee_department_idx'),
+		]
+
 	def __str__(self):
 		return self.name
 
@@ -45,10 +52,25 @@ class Leave(models.Model):
 	status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='Pending')
 	created_at = models.DateTimeField(auto_now_add=True)
 
+	class Meta:
+		indexes = [
+			# approved-leave overlap checks in leave_request / attendance_mark
+			models.Index(fields=['employee', 'status', 'start_date', 'end_date'], name='leave_emp_status_dates_idx'),
+			# leave_pending queue ordered by newest first
+			models.Index(fields=['status', 'created_at'], name='leave_status_created_idx'),
+		]
+
 	def __str__(self):
 		return f"{self.employee.name} - {self.status} ({self.start_date} to {self.end_date})"
 
 
+def seconds_since_midnight(value):
+	"""Encode a time as an integer so SQL can average and rank check-ins."""
+	if value is None:
+		return None
+	return value.hour * 3600 + value.minute * 60 + value.second
+
+
 # Attendance model
 class Attendance(models.Model):
 	STATUS_CHOICES = [
@@ -57,13 +79,36 @@ class Attendance(models.Model):
 		('Leave', 'Leave'),
 	]
 	employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='attendances')
-	date = models.DateField(auto_now_add=True)
+	# defaults to today but, unlike auto_now_add, honours an explicit date (leave backfill)
+	date = models.DateField(default=timezone.localdate, editable=False)
 	status = models.CharField(max_length=20, choices=STATUS_CHOICES)
 	check_in = models.TimeField(null=True, blank=True)
 	check_out = models.TimeField(null=True, blank=True)
+	# integer copies of check_in/check_out, kept in sync by save()
+	check_in_seconds = models.PositiveIntegerField(null=True, blank=True, editable=False)
+	check_out_seconds = models.PositiveIntegerField(null=True, blank=True, editable=False)
 
 	class Meta:
 		unique_together = ('employee', 'date')
+		indexes = [
+			# weekly/monthly/date-range filters and the (date, id) keyset pager
+			models.Index(fields=['date'], name='attendance_date_idx'),
+			# covers the ?days= punctuality window without touching the table
+			models.Index(fields=['date', 'employee', 'check_in_seconds'], name='attendance_checkin_window_idx'),
+		]
+
+	def save(self, *args, **kwargs):
+		self.check_in_seconds = seconds_since_midnight(self.check_in)
+		self.check_out_seconds = seconds_since_midnight(self.check_out)
+		update_fields = kwargs.get('update_fields')
+		if update_fields is not None:
+			update_fields = set(update_fields)
+			if 'check_in' in update_fields:
+				update_fields.add('check_in_seconds')
+			if 'check_out' in update_fields:
+				update_fields.add('check_out_seconds')
+			kwargs['update_fields'] = update_fields
+		super().save(*args, **kwargs)
 
 	def __str__(self):
 		return f"{self.employee.name} - {self.date} - {self.status}"
@@ -97,5 +142,139 @@ class Task(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # per-HR and per-employee task lists, newest first
+            models.Index(fields=['hr', 'created_at'], name='task_hr_created_idx'),
+            models.Index(fields=['employee', 'created_at'], name='task_employee_created_idx'),
+        ]
+
     def __str__(self):
         return f"{self.title} - {self.employee.name}"
+
+
+# Transactional outbox: messages are written alongside the data they describe
+# and delivered later by the drain_outbox management command.
+class OutboxMessage(models.Model):
+	KIND_WELCOME_EMAIL = 'welcome_email'
+	KIND_CHOICES = [
+		(KIND_WELCOME_EMAIL, 'Welcome email'),
+	]
+
+	STATUS_PENDING = 'Pending'
+	STATUS_SENT = 'Sent'
+	STATUS_DEAD = 'Dead'
+	STATUS_CHOICES = [
+		(STATUS_PENDING, 'Pending'),
+		(STATUS_SENT, 'Sent'),
+		(STATUS_DEAD, 'Dead'),
+	]
+
+	kind = models.CharField(max_length=50, choices=KIND_CHOICES)
+	payload = models.JSONField()
+	status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+	attempts = models.PositiveIntegerField(default=0)
+	next_attempt_at = models.DateTimeField(default=timezone.now)
+	last_error = models.TextField(blank=True)
+	created_at = models.DateTimeField(auto_now_add=True)
+	sent_at = models.DateTimeField(null=True, blank=True)
+
+	class Meta:
+		indexes = [
+			# the worker polls for due pending messages
+			models.Index(fields=['status', 'next_attempt_at'], name='outbox_status_due_idx'),
+		]
+
+	def __str__(self):
+		return f"{self.kind} #{self.id} - {self.status}"
+
+
+# Attendance rollups, maintained incrementally by api/rollups.py so analytics
+# read O(months) or O(days) rows instead of scanning Attendance.
+class AttendanceMonthlyRollup(models.Model):
+	employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='attendance_rollups')
+	month = models.DateField()  # first day of the month
+	present = models.IntegerField(default=0)
+	leave = models.IntegerField(default=0)
+	absent = models.IntegerField(default=0)
+	check_in_count = models.IntegerField(default=0)
+	check_in_seconds = models.BigIntegerField(default=0)  # sum of seconds since midnight
+	check_out_count = models.IntegerField(default=0)
+	check_out_seconds = models.BigIntegerField(default=0)
+
+	class Meta:
+		unique_together = ('employee', 'month')
+
+	def __str__(self):
+		return f"{self.employee_id} - {self.month:%Y-%m}"
+
+
+class DepartmentDailyRollup(models.Model):
+	department = models.CharField(max_length=100)
+	date = models.DateField()
+	present = models.IntegerField(default=0)
+	leave = models.IntegerField(default=0)
+	absent = models.IntegerField(default=0)
+	check_in_count = models.IntegerField(default=0)
+	check_in_seconds = models.BigIntegerField(default=0)
+	check_out_count = models.IntegerField(default=0)
+	check_out_seconds = models.BigIntegerField(default=0)
+
+	class Meta:
+		unique_together = ('department', 'date')
+
+	def __str__(self):
+		return f"{self.department} - {self.date}"
+
+
+# Per-collection version stamps for conditional GETs (api/versions.py). Every
+# write bumps the collections it can change, so validating an unchanged list
+# is a single lookup on the unique name index.
+class CollectionVersion(models.Model):
+	name = models.CharField(max_length=50, unique=True)
+	version = models.PositiveBigIntegerField(default=0)
+	updated_at = models.DateTimeField(default=timezone.now)
+
+	def __str__(self):
+		return f"{self.name} v{self.version}"
+
+
+# Append-only change log behind the delta sync endpoint (api/changelog.py).
+# employee_id / hr_id are plain integers rather than foreign keys so that
+# tombstones outlive the rows (and employees) they describe.
+class ChangeLogEntry(models.Model):
+	ACTION_UPSERT = 'upsert'
+	ACTION_DELETE = 'delete'
+	ACTION_CHOICES = [
+		(ACTION_UPSERT, 'Upsert'),
+		(ACTION_DELETE, 'Delete'),
+	]
+
+	model = models.CharField(max_length=20)
+	object_id = models.BigIntegerField()
+	employee_id = models.BigIntegerField()
+	hr_id = models.BigIntegerField(null=True)
+	action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+	created_at = models.DateTimeField(auto_now_add=True)
+
+	class Meta:
+		indexes = [
+			# /sync/ reads one scope's entries after a cursor, in id order
+			models.Index(fields=['employee_id', 'id'], name='changelog_employee_idx'),
+			models.Index(fields=['hr_id', 'id'], name='changelog_hr_idx'),
+		]
+
+	def __str__(self):
+		return f"#{self.id} {self.action} {self.model} {self.object_id}"
+
+
+# Revoked access tokens (api/tokens.py). key is a token id, or "<role>:<id>"
+# to revoke every token issued to that account up to revoked_at. A row can
+# be purged after expires_at: by then every token it matches has expired.
+class RevokedToken(models.Model):
+	key = models.CharField(max_length=64, db_index=True)
+	revoked_at = models.DateTimeField(default=timezone.now)
+	expires_at = models.DateTimeField()
+
+	def __str__(self):
+		return f"{self.key} (until {self.expires_at})"
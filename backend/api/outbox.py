@@ -0,0 +1,114 @@
+import json
+import urllib.error
+import urllib.request
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboxMessage
+
+
+DEFAULT_ENDPOINTS = {
+	OutboxMessage.KIND_WELCOME_EMAIL: 'http://localhost:3001/send-welcome-email',
+}
+
+# payload keys that must not outlive delivery
+SENSITIVE_KEYS = ('password',)
+
+
+def _setting(name, default):
+	return getattr(settings, name, default)
+
+
+def enqueue(kind, payload):
+	"""Record a message for later delivery. Call inside the writer's transaction."""
+	return OutboxMessage.objects.create(kind=kind, payload=payload)
+
+
+def backoff_delay(attempts):
+	"""Exponential backoff after the given number of failed attempts."""
+	base = _setting('OUTBOX_BACKOFF_SECONDS', 30)
+	cap = _setting('OUTBOX_BACKOFF_MAX_SECONDS', 3600)
+	return timedelta(seconds=min(cap, base * (2 ** max(attempts - 1, 0))))
+
+
+class PermanentDeliveryError(Exception):
+	"""The receiver rejected the message; retrying will not help."""
+
+
+def _deliver(message):
+	endpoints = _setting('OUTBOX_ENDPOINTS', DEFAULT_ENDPOINTS)
+	url = endpoints[message.kind]
+	body = json.dumps(message.payload).encode()
+	req = urllib.request.Request(url, data=body, headers={'Content-Type': 'application/json'}, method='POST')
+	try:
+		with urllib.request.urlopen(req, timeout=_setting('OUTBOX_HTTP_TIMEOUT', 5)) as resp:
+			resp.read()
+	except urllib.error.HTTPError as e:
+		# 4xx means the payload itself is bad, so dead-letter straight away
+		if 400 <= e.code < 500:
+			raise PermanentDeliveryError(f'HTTP {e.code}')
+		raise
+
+
+def _scrubbed(payload):
+	return {k: v for k, v in payload.items() if k not in SENSITIVE_KEYS}
+
+
+def _claim_batch(batch_size, now):
+	"""Lease up to batch_size due messages so a concurrent worker skips them.
+
+	The batch is delivered one message at a time, so the lease covers every
+	claimed message timing out in turn, plus one timeout of slack; a shorter
+	lease would let another worker re-send the tail of a slow batch.
+	"""
+	with transaction.atomic():
+		ids = list(
+			OutboxMessage.objects.filter(status=OutboxMessage.STATUS_PENDING, next_attempt_at__lte=now)
+			.order_by('next_attempt_at', 'id')
+			.values_list('id', flat=True)[:batch_size]
+		)
+		lease = timedelta(seconds=_setting('OUTBOX_HTTP_TIMEOUT', 5) * (len(ids) + 1))
+		OutboxMessage.objects.filter(id__in=ids, next_attempt_at__lte=now).update(next_attempt_at=now + lease)
+	return list(OutboxMessage.objects.filter(id__in=ids).order_by('id'))
+
+
+def drain_outbox(batch_size=None, now=None):
+	"""Deliver one batch of due outbox messages.
+
+	Failed deliveries are retried with exponential backoff; messages that
+	exhaust OUTBOX_MAX_ATTEMPTS or are rejected outright are dead-lettered.
+
+	Returns: { "sent": int, "retried": int, "dead": int }
+	"""
+	batch_size = batch_size or _setting('OUTBOX_BATCH_SIZE', 50)
+	max_attempts = _setting('OUTBOX_MAX_ATTEMPTS', 8)
+	now = now or timezone.now()
+	result = {'sent': 0, 'retried': 0, 'dead': 0}
+	for message in _claim_batch(batch_size, now):
+		message.attempts += 1
+		try:
+			_deliver(message)
+		except PermanentDeliveryError as e:
+			message.status = OutboxMessage.STATUS_DEAD
+			message.last_error = str(e)
+		except Exception as e:
+			message.last_error = str(e)
+			if message.attempts >= max_attempts:
+				message.status = OutboxMessage.STATUS_DEAD
+			else:
+				message.next_attempt_at = timezone.now() + backoff_delay(message.attempts)
+		else:
+			message.status = OutboxMessage.STATUS_SENT
+			message.sent_at = timezone.now()
+			message.last_error = ''
+
+		if message.status == OutboxMessage.STATUS_PENDING:
+			result['retried'] += 1
+		else:
+			result['sent' if message.status == OutboxMessage.STATUS_SENT else 'dead'] += 1
+			message.payload = _scrubbed(message.payload)
+		message.save()
+	return result
@@ -0,0 +1,107 @@
+import base64
+import json
+from datetime import date as date_cls
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import router
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_CHUNK_SIZE = 2000
+
+# orderings the keyset pager can seek on; each ends with 'id' so the key is unique
+ATTENDANCE_ORDERINGS = {
+	'date': ('date', 'id'),
+	'-date': ('-date', '-id'),
+}
+
+
+class CursorError(ValueError):
+	"""Raised for malformed cursors, orderings or page sizes."""
+
+
+def encode_cursor(ordering, day, pk):
+	raw = json.dumps([ordering, day.isoformat(), pk]).encode()
+	return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+	try:
+		padded = cursor + '=' * (-len(cursor) % 4)
+		ordering, day, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+		return ordering, date_cls.fromisoformat(day), int(pk)
+	except Exception:
+		raise CursorError('Invalid cursor')
+
+
+def parse_page_size(value):
+	if value in (None, ''):
+		return DEFAULT_PAGE_SIZE
+	try:
+		size = int(value)
+	except (TypeError, ValueError):
+		raise CursorError('page_size must be an integer')
+	if size < 1:
+		raise CursorError('page_size must be positive')
+	return min(size, MAX_PAGE_SIZE)
+
+
+def keyset_page(qs, ordering, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+	"""Return one page of a date-ordered queryset using (date, id) keyset seeking.
+
+	Returns: (rows, next_cursor) where next_cursor is None on the last page.
+	"""
+	if ordering not in ATTENDANCE_ORDERINGS:
+		raise CursorError('ordering must be one of: ' + ', '.join(ATTENDANCE_ORDERINGS))
+	qs = qs.order_by(*ATTENDANCE_ORDERINGS[ordering])
+	if cursor:
+		cursor_ordering, day, pk = decode_cursor(cursor)
+		if cursor_ordering != ordering:
+			raise CursorError('Cursor does not match ordering')
+		if ordering.startswith('-'):
+			qs = qs.filter(Q(date__lt=day) | Q(date=day, id__lt=pk))
+		else:
+			qs = qs.filter(Q(date__gt=day) | Q(date=day, id__gt=pk))
+	# fetch one extra row to learn whether another page exists
+	rows = list(qs[:page_size + 1])
+	next_cursor = None
+	if len(rows) > page_size:
+		rows = rows[:page_size]
+		last = rows[-1]
+		next_cursor = encode_cursor(ordering, last.date, last.id)
+	return rows, next_cursor
+
+
+def stream_json_array(qs, serializer_class, chunk_size=STREAM_CHUNK_SIZE):
+	"""Stream a queryset as a JSON array, serializing it chunk by chunk.
+
+	The queryset is walked with iterator() so only one chunk of model
+	instances is held in memory at a time.
+	"""
+	# the body is produced after the view returns: bind the read database now
+	qs = qs.using(router.db_for_read(qs.model))
+
+	def generate():
+		yield '['
+		first = True
+		chunk = []
+		for obj in qs.iterator(chunk_size=chunk_size):
+			chunk.append(obj)
+			if len(chunk) >= chunk_size:
+				yield _encode_chunk(chunk, serializer_class, first)
+				first = False
+				chunk = []
+		if chunk:
+			yield _encode_chunk(chunk, serializer_class, first)
+		yield ']'
+
+	return StreamingHttpResponse(generate(), content_type='application/json')
+
+
+def _encode_chunk(chunk, serializer_class, first):
+	data = serializer_class(chunk, many=True).data
+	body = ','.join(json.dumps(item, cls=DjangoJSONEncoder) for item in data)
+	return body if first else ',' + body
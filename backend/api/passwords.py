@@ -0,0 +1,285 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import hashers
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from . import metrics
+
+
+# Password hashing and verification off the request workers. PBKDF2 spends
+# hundreds of milliseconds of CPU per call, so a burst of logins run on the
+# request threads starves every other endpoint. Here they run in a small
+# pool of worker processes, niced by PASSWORD_POOL_NICE so the OS schedules
+# request workers first. At most PASSWORD_POOL_MAX_PENDING jobs are queued
+# or running; beyond that a call fails at once with PasswordPoolSaturated
+# (503 with Retry-After) instead of waiting behind the queue. Queue and run
+# times go to /metrics. PASSWORD_POOL_WORKERS = 0 runs the hashes on the
+# calling thread, still under the admission limit. Batch callers (the CSV
+# import) use run_many(), which waits for a slot instead of failing and
+# hashes a whole chunk per slot. A slot is held until the pool job is done,
+# even when the caller gave up (a cancelled async request) earlier. A worker
+# that dies mid-job (OOM killer, ...) fails its callers with
+# PasswordWorkerLost, also a 503 with Retry-After, and the next call starts
+# a fresh pool.
+
+
+class PasswordPoolUnavailable(APIException):
+	"""The pool cannot take the job now; the caller may retry after `wait` seconds."""
+
+	status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+
+	def __init__(self, retry_after=1):
+		super().__init__()
+		# DRF's exception handler sends this as Retry-After
+		self.wait = retry_after
+
+
+class PasswordPoolSaturated(PasswordPoolUnavailable):
+	default_detail = 'Too many sign-ins in progress, retry shortly.'
+	default_code = 'password_pool_saturated'
+
+
+class PasswordWorkerLost(PasswordPoolUnavailable):
+	default_detail = 'Sign-in was interrupted, retry shortly.'
+	default_code = 'password_worker_lost'
+
+
+def _init_worker(nice):
+	import django
+	django.setup()
+	if nice:
+		try:
+			os.nice(nice)
+		except (AttributeError, OSError):
+			pass
+
+
+def _use_hashers(names):
+	# the caller's PASSWORD_HASHERS win (e.g. under override_settings), so a
+	# hash made in a worker always verifies in the web process and back
+	if list(settings.PASSWORD_HASHERS) != names:
+		settings.PASSWORD_HASHERS = names
+		hashers.get_hashers.cache_clear()
+		hashers.get_hashers_by_algorithm.cache_clear()
+
+
+def _run_job(name, hasher_names, args):
+	started = time.monotonic()
+	_use_hashers(hasher_names)
+	result = getattr(hashers, name)(*args)
+	return result, started, time.monotonic()
+
+
+def _run_batch(name, hasher_names, arg_lists):
+	started = time.monotonic()
+	_use_hashers(hasher_names)
+	function = getattr(hashers, name)
+	return [function(*args) for args in arg_lists], started, time.monotonic()
+
+
+def _outcome(future):
+	if future.cancelled() or future.exception() is not None:
+		return None
+	return future.result()
+
+
+class PasswordPool:
+
+	def __init__(self, workers=1, max_pending=4, nice=10):
+		self.workers = workers
+		self.max_pending = max_pending
+		self.nice = nice
+		self._executor = None
+		self._lock = threading.Lock()
+		self._released = threading.Condition(self._lock)
+		self._pending = 0
+		self._stats = {
+			'completed': 0,
+			'failed': 0,
+			'rejected': 0,
+			'queue_seconds_total': 0.0,
+			'queue_seconds_max': 0.0,
+			'run_seconds_total': 0.0,
+		}
+
+	def _get_executor(self):
+		with self._lock:
+			if self._executor is None:
+				# spawn, not fork: the web process has threads (gthread
+				# workers, the writer queue) that a fork would copy mid-flight
+				self._executor = ProcessPoolExecutor(
+					max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'),
+					initializer=_init_worker, initargs=(self.nice,),
+				)
+			return self._executor
+
+	def _admit(self, name):
+		with self._lock:
+			admitted = self._pending < self.max_pending
+			if admitted:
+				self._pending += 1
+			else:
+				self._stats['rejected'] += 1
+		if not admitted:
+			metrics.record_password_rejected(name)
+			raise PasswordPoolSaturated()
+
+	def _admit_batch(self, slots):
+		"""Wait for one admission slot, then take up to slots - 1 more that are free now."""
+		with self._released:
+			self._released.wait_for(lambda: self._pending < self.max_pending)
+			admitted = min(slots, self.max_pending - self._pending)
+			self._pending += admitted
+		return admitted
+
+	def _finish(self, name, submitted, outcome):
+		"""Release the admission slot; outcome is (result, started, finished) or None on failure."""
+		with self._lock:
+			self._pending -= 1
+			self._released.notify()
+			if outcome is None:
+				self._stats['failed'] += 1
+				return
+			_, started, finished = outcome
+			queued = max(started - submitted, 0.0)
+			stats = self._stats
+			stats['completed'] += 1
+			stats['queue_seconds_total'] += queued
+			stats['queue_seconds_max'] = max(stats['queue_seconds_max'], queued)
+			stats['run_seconds_total'] += finished - started
+		metrics.record_password_job(name, queued, finished - started)
+
+	def _discard(self, executor):
+		"""Drop a broken executor so the next call starts a fresh pool."""
+		with self._lock:
+			if self._executor is executor:
+				self._executor = None
+		executor.shutdown(wait=False)
+
+	def _submit(self, job, name, args):
+		"""(executor, future) of job(name, hashers, args) in the pool."""
+		executor = self._get_executor()
+		try:
+			return executor, executor.submit(job, name, list(settings.PASSWORD_HASHERS), args)
+		except BrokenProcessPool:
+			# a worker died since the last job; start a fresh pool for this and later calls
+			self._discard(executor)
+			executor = self._get_executor()
+			return executor, executor.submit(job, name, list(settings.PASSWORD_HASHERS), args)
+
+	def _result(self, executor, future):
+		try:
+			return future.result()
+		except BrokenProcessPool:
+			# the worker died with this job on it
+			self._discard(executor)
+			raise PasswordWorkerLost()
+
+	def run(self, name, *args):
+		"""Call django.contrib.auth.hashers.<name>(*args) in the pool and wait for it."""
+		self._admit(name)
+		submitted = time.monotonic()
+		outcome = None
+		try:
+			if self.workers <= 0:
+				outcome = _run_job(name, list(settings.PASSWORD_HASHERS), args)
+			else:
+				outcome = self._result(*self._submit(_run_job, name, args))
+			return outcome[0]
+		finally:
+			self._finish(name, submitted, outcome)
+
+	def run_many(self, name, arg_lists, jobs=1):
+		"""run() for a batch: [hashers.<name>(*args) for args in arg_lists].
+
+		Blocks until a slot is free rather than raising PasswordPoolSaturated,
+		then splits the batch over up to `jobs` slots (never more than the
+		workers, nor more than are free), one pool job per slot.
+		"""
+		arg_lists = [tuple(args) for args in arg_lists]
+		if not arg_lists:
+			return []
+		slots = self._admit_batch(max(1, min(jobs, len(arg_lists), self.workers or 1)))
+		# contiguous, near-equal parts (slots <= len(arg_lists), so none is empty)
+		size, extra = divmod(len(arg_lists), slots)
+		bounds = [i * size + min(i, extra) for i in range(slots + 1)]
+		parts = [arg_lists[start:end] for start, end in zip(bounds, bounds[1:])]
+		submitted = time.monotonic()
+		outcomes = [None] * len(parts)
+		try:
+			if self.workers <= 0:
+				outcomes[0] = _run_batch(name, list(settings.PASSWORD_HASHERS), parts[0])
+			else:
+				futures = [self._submit(_run_batch, name, part) for part in parts]
+				for i, (executor, future) in enumerate(futures):
+					outcomes[i] = self._result(executor, future)
+			return [result for outcome in outcomes for result in outcome[0]]
+		finally:
+			for outcome in outcomes:
+				self._finish(name, submitted, outcome)
+
+	async def arun(self, name, *args):
+		"""run() for async views: the event loop keeps serving while the pool works."""
+		if self.workers <= 0:
+			return await sync_to_async(self.run, thread_sensitive=False)(name, *args)
+		self._admit(name)
+		submitted = time.monotonic()
+		try:
+			executor, future = self._submit(_run_job, name, args)
+		except BaseException:
+			self._finish(name, submitted, None)
+			raise
+		# the slot is released when the job is done, not when this coroutine
+		# is: a cancelled request leaves its job running in the worker
+		future.add_done_callback(lambda done: self._finish(name, submitted, _outcome(done)))
+		try:
+			outcome = await asyncio.wrap_future(future)
+		except BrokenProcessPool:
+			self._discard(executor)
+			raise PasswordWorkerLost()
+		return outcome[0]
+
+	def shutdown(self):
+		with self._lock:
+			executor, self._executor = self._executor, None
+		if executor is not None:
+			executor.shutdown()
+
+	def stats(self):
+		"""Response: workers, admission limit, jobs in flight, totals and queue/run times (seconds)."""
+		with self._lock:
+			stats = dict(self._stats)
+			stats['pending'] = self._pending
+		stats['workers'] = self.workers
+		stats['max_pending'] = self.max_pending
+		stats['queue_seconds_avg'] = stats['queue_seconds_total'] / stats['completed'] if stats['completed'] else 0.0
+		stats['run_seconds_avg'] = stats['run_seconds_total'] / stats['completed'] if stats['completed'] else 0.0
+		return stats
+
+
+pool = PasswordPool(
+	workers=getattr(settings, 'PASSWORD_POOL_WORKERS', 1),
+	max_pending=getattr(settings, 'PASSWORD_POOL_MAX_PENDING', 4),
+	nice=getattr(settings, 'PASSWORD_POOL_NICE', 10),
+)
+
+
+def make_password(raw_password):
+	return pool.run('make_password', raw_password)
+
+
+def check_password(raw_password, encoded):
+	return pool.run('check_password', raw_password, encoded)
+
+
+async def acheck_password(raw_password, encoded):
+	return await pool.arun('check_password', raw_password, encoded)
@@ -0,0 +1,308 @@
+import contextvars
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core import signing
+
+from .metrics import route_name
+
+
+# Opt-in request profiler. A request is profiled when it carries a valid
+# X-Profile-Token header (see `manage.py profiles --token`) or is picked
+# by PROFILE_SAMPLE_RATE. While it runs, a sampler thread records the call
+# stack of the thread serving it every PROFILE_INTERVAL_MS, and every query
+# lands on a timeline with its SQL, duration and row count. The result is a
+# speedscope file (https://www.speedscope.app) in PROFILE_SPOOL_DIR, which
+# keeps the newest PROFILE_SPOOL_KEEP profiles. Requests that are not
+# profiled pay for one header lookup and one context variable read per query.
+# For async views the event loop thread is sampled; their queries run on
+# another thread and appear on the query timeline only.
+
+PROFILE_HEADER = 'X-Profile-Token'
+TOKEN_SALT = 'api.profiling'
+SPEEDSCOPE_SCHEMA = 'https://www.speedscope.app/file-format-schema.json'
+MAX_SAMPLES = 20000
+
+
+def _setting(name, default):
+	return getattr(settings, name, default)
+
+
+def spool_dir():
+	return _setting('PROFILE_SPOOL_DIR', None) or os.path.join(tempfile.gettempdir(), 'hr-portal-profiles')
+
+
+def make_token():
+	"""Header value that turns profiling on for PROFILE_TOKEN_MAX_AGE seconds."""
+	return signing.TimestampSigner(salt=TOKEN_SALT).sign('profile')
+
+
+def _valid_token(value):
+	try:
+		signing.TimestampSigner(salt=TOKEN_SALT).unsign(value, max_age=_setting('PROFILE_TOKEN_MAX_AGE', 3600))
+	except signing.BadSignature:
+		return False
+	return True
+
+
+def should_profile(request):
+	token = request.headers.get(PROFILE_HEADER)
+	if token:
+		return _valid_token(token)
+	rate = _setting('PROFILE_SAMPLE_RATE', 0.0)
+	return rate > 0 and random.random() < rate
+
+
+class _RowCounter:
+	"""Stands in for a DB-API cursor to count the rows fetched from it."""
+
+	def __init__(self, cursor):
+		self._cursor = cursor
+		self.entry = None
+
+	def _count(self, rows):
+		if self.entry is not None and rows:
+			self.entry['rows'] += len(rows)
+		return rows
+
+	def fetchone(self):
+		row = self._cursor.fetchone()
+		if self.entry is not None and row is not None:
+			self.entry['rows'] += 1
+		return row
+
+	def fetchmany(self, *args):
+		return self._count(self._cursor.fetchmany(*args))
+
+	def fetchall(self):
+		return self._count(self._cursor.fetchall())
+
+	def __iter__(self):
+		for row in self._cursor:
+			if self.entry is not None:
+				self.entry['rows'] += 1
+			yield row
+
+	def __getattr__(self, name):
+		return getattr(self._cursor, name)
+
+
+class Profile:
+
+	def __init__(self, thread_id, interval):
+		self.thread_id = thread_id
+		self.interval = interval
+		self.started = time.perf_counter()
+		self.started_at = time.time()
+		self.frames = []
+		self._frame_index = {}
+		self.samples = []
+		self.queries = []
+		self._stop = threading.Event()
+		self._sampler = threading.Thread(target=self._sample_loop, name='request-profiler', daemon=True)
+
+	def start(self):
+		self._sampler.start()
+
+	def stop(self):
+		self._stop.set()
+		self._sampler.join()
+		self.duration = time.perf_counter() - self.started
+
+	def _sample_loop(self):
+		while not self._stop.wait(self.interval) and len(self.samples) < MAX_SAMPLES:
+			frame = sys._current_frames().get(self.thread_id)
+			stack = []
+			while frame is not None:
+				code = frame.f_code
+				key = (code.co_name, code.co_filename, code.co_firstlineno)
+				index = self._frame_index.get(key)
+				if index is None:
+					index = self._frame_index[key] = len(self.frames)
+					self.frames.append(key)
+				stack.append(index)
+				frame = frame.f_back
+			if stack:
+				stack.reverse()
+				self.samples.append((time.perf_counter() - self.started, stack))
+
+	def query(self, execute, sql, params, many, context):
+		entry = {'start_ms': round((time.perf_counter() - self.started) * 1000, 3), 'sql': sql, 'rows': 0}
+		start = time.perf_counter()
+		try:
+			result = execute(sql, params, many, context)
+		finally:
+			entry['duration_ms'] = round((time.perf_counter() - start) * 1000, 3)
+			self.queries.append(entry)
+		wrapper = context['cursor']
+		rowcount = getattr(wrapper.cursor, 'rowcount', -1)
+		if rowcount and rowcount > 0:
+			entry['rows'] = rowcount  # rows written; SELECT rows are counted as they are fetched
+		if not isinstance(wrapper.cursor, _RowCounter):
+			wrapper.cursor = _RowCounter(wrapper.cursor)
+		wrapper.cursor.entry = entry
+		return result
+
+	def speedscope(self, request, response):
+		"""The profile as a speedscope document: the sampled call stacks, plus
+		the queries as an evented profile, with request details under "request"."""
+		shared = [{'name': name, 'file': filename, 'line': line} for name, filename, line in self.frames]
+		end_ms = self.duration * 1000
+		query_events = []
+		for entry in self.queries:
+			frame = len(shared)
+			shared.append({'name': entry['sql'][:200]})
+			query_events.append({'type': 'O', 'frame': frame, 'at': entry['start_ms']})
+			query_events.append({'type': 'C', 'frame': frame, 'at': entry['start_ms'] + entry['duration_ms']})
+		name = f'{request.method} {request.path}'
+		return {
+			'$schema': SPEEDSCOPE_SCHEMA,
+			'name': name,
+			'exporter': 'hr-portal request profiler',
+			'activeProfileIndex': 0,
+			'shared': {'frames': shared},
+			'profiles': [
+				{
+					'type': 'sampled', 'name': name + ' (stacks)', 'unit': 'milliseconds',
+					'startValue': 0, 'endValue': end_ms,
+					'samples': [stack for _, stack in self.samples],
+					'weights': [self.interval * 1000] * len(self.samples),
+				},
+				{
+					'type': 'evented', 'name': name + ' (queries)', 'unit': 'milliseconds',
+					'startValue': 0, 'endValue': max([end_ms] + [e['at'] for e in query_events]),
+					'events': query_events,
+				},
+			],
+			'request': {
+				'method': request.method,
+				'path': request.get_full_path(),
+				'route': route_name(request),
+				'status': response.status_code if response is not None else None,
+				'started_at': self.started_at,
+				'duration_ms': round(end_ms, 3),
+				'interval_ms': self.interval * 1000,
+				'queries': self.queries,
+			},
+		}
+
+
+_active = contextvars.ContextVar('api_profile', default=None)
+
+
+def _profile_queries(execute, sql, params, many, context):
+	profile = _active.get()
+	if profile is None:
+		return execute(sql, params, many, context)
+	return profile.query(execute, sql, params, many, context)
+
+
+def instrument_connection(connection):
+	"""Put profiled requests' queries on their timeline (see metrics.instrument_connection)."""
+	if _profile_queries not in connection.execute_wrappers:
+		connection.execute_wrappers.append(_profile_queries)
+
+
+def write_profile(document):
+	"""Save a speedscope document to the spool and drop the oldest beyond
+	PROFILE_SPOOL_KEEP. Returns the profile id (the file name stem)."""
+	directory = spool_dir()
+	os.makedirs(directory, exist_ok=True)
+	started_at = document['request']['started_at']
+	# sorts by start time, which is what rotation goes by
+	profile_id = (
+		time.strftime('%Y%m%d-%H%M%S', time.gmtime(started_at))
+		+ f'.{int(started_at * 1e6) % 1000000:06d}-{uuid.uuid4().hex[:6]}'
+	)
+	path = os.path.join(directory, profile_id + '.speedscope.json')
+	with open(path + '.tmp', 'w') as f:
+		json.dump(document, f)
+	os.replace(path + '.tmp', path)
+	for stale in list_profiles()[_setting('PROFILE_SPOOL_KEEP', 50):]:
+		try:
+			os.remove(os.path.join(directory, stale + '.speedscope.json'))
+		except FileNotFoundError:
+			pass
+	return profile_id
+
+
+def list_profiles():
+	"""Profile ids in the spool, newest first."""
+	try:
+		names = os.listdir(spool_dir())
+	except FileNotFoundError:
+		return []
+	return sorted((n[:-len('.speedscope.json')] for n in names if n.endswith('.speedscope.json')), reverse=True)
+
+
+def load_profile(profile_id):
+	with open(os.path.join(spool_dir(), profile_id + '.speedscope.json')) as f:
+		return json.load(f)
+
+
+def collapsed_stacks(document):
+	"""Brendan Gregg's collapsed format ("a;b;c <count>"), for flamegraph.pl."""
+	frames = document['shared']['frames']
+	counts = {}
+	for stack in document['profiles'][0]['samples']:
+		line = ';'.join(frames[i]['name'] for i in stack)
+		counts[line] = counts.get(line, 0) + 1
+	return [f'{line} {count}' for line, count in sorted(counts.items())]
+
+
+class RequestProfilerMiddleware:
+	"""Profile the requests picked by should_profile(); the response names
+	the saved profile in X-Profile-Id."""
+
+	sync_capable = True
+	async_capable = True
+
+	def __init__(self, get_response):
+		self.get_response = get_response
+		if iscoroutinefunction(get_response):
+			markcoroutinefunction(self)
+
+	def __call__(self, request):
+		if iscoroutinefunction(self):
+			return self.__acall__(request)
+		if not should_profile(request):
+			return self.get_response(request)
+		profile, token = self._start()
+		response = None
+		try:
+			response = self.get_response(request)
+		finally:
+			self._finish(profile, token, request, response)
+		return response
+
+	async def __acall__(self, request):
+		if not should_profile(request):
+			return await self.get_response(request)
+		profile, token = self._start()
+		response = None
+		try:
+			response = await self.get_response(request)
+		finally:
+			self._finish(profile, token, request, response)
+		return response
+
+	def _start(self):
+		profile = Profile(threading.get_ident(), _setting('PROFILE_INTERVAL_MS', 5) / 1000)
+		token = _active.set(profile)
+		profile.start()
+		return profile, token
+
+	def _finish(self, profile, token, request, response):
+		_active.reset(token)
+		profile.stop()
+		profile_id = write_profile(profile.speedscope(request, response))
+		if response is not None:
+			response['X-Profile-Id'] = profile_id
@@ -0,0 +1,26 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+	import orjson
+except ImportError:  # optional: without orjson responses use DRF's json encoder
+	orjson = None
+
+
+# orjson encodes dicts, lists, str/int/float and datetimes in C; anything else
+# (Decimal, lazy strings, timedelta, ...) goes through DRF's encoder so the
+# output matches JSONRenderer. OPT_UTC_Z writes UTC datetimes with "Z" as DRF
+# does.
+_drf_encoder = JSONEncoder()
+ORJSON_OPTIONS = (orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+
+class ORJSONRenderer(JSONRenderer):
+	"""JSONRenderer that encodes with orjson when it is installed."""
+
+	def render(self, data, accepted_media_type=None, renderer_context=None):
+		if orjson is None:
+			return super().render(data, accepted_media_type, renderer_context)
+		if data is None:
+			return b''
+		return orjson.dumps(data, default=_drf_encoder.default, option=ORJSON_OPTIONS)
@@ -0,0 +1,26 @@
+import sqlite3
+
+from django.conf import settings
+
+
+def replica_paths():
+	return [settings.DATABASES[alias]['NAME'] for alias in getattr(settings, 'READ_REPLICAS', [])]
+
+
+def sync_replicas(source_path, paths):
+	"""Replication stand-in: copy the primary SQLite file onto each replica.
+
+	Uses SQLite's online backup API, so the copy is consistent even while the
+	primary is being written and replica readers see either the old or the new
+	snapshot.
+	"""
+	source = sqlite3.connect(str(source_path))
+	try:
+		for path in paths:
+			target = sqlite3.connect(str(path))
+			try:
+				source.backup(target)
+			finally:
+				target.close()
+	finally:
+		source.close()
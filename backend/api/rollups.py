@@ -0,0 +1,163 @@
+from collections import Counter, defaultdict
+
+from django.db import connection, transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncMonth
+
+from .models import Attendance, AttendanceMonthlyRollup, DepartmentDailyRollup, seconds_since_midnight
+
+
+COUNTER_FIELDS = (
+	'present', 'leave', 'absent',
+	'check_in_count', 'check_in_seconds',
+	'check_out_count', 'check_out_seconds',
+)
+STATUS_COUNTERS = {'Present': 'present', 'Leave': 'leave', 'Absent': 'absent'}
+UPSERT_BATCH_SIZE = 200
+
+
+def snapshot(attendance):
+	"""The parts of an Attendance row the rollups count, or None for no row."""
+	if attendance is None:
+		return None
+	return (attendance.status, attendance.check_in, attendance.check_out)
+
+
+def _counters(state, sign):
+	counters = Counter()
+	if state is None:
+		return counters
+	status, check_in, check_out = state
+	if status in STATUS_COUNTERS:
+		counters[STATUS_COUNTERS[status]] += sign
+	if check_in is not None:
+		counters['check_in_count'] += sign
+		counters['check_in_seconds'] += sign * seconds_since_midnight(check_in)
+	if check_out is not None:
+		counters['check_out_count'] += sign
+		counters['check_out_seconds'] += sign * seconds_since_midnight(check_out)
+	return counters
+
+
+def _additive_upsert(model, key_fields, deltas):
+	"""INSERT ... ON CONFLICT DO UPDATE SET counter = counter + excluded.counter.
+
+	deltas: { (key values...): Counter }. One statement per batch, however
+	many buckets are touched.
+	"""
+	items = [(key, counters) for key, counters in deltas.items() if any(counters.values())]
+	if not items:
+		return
+	qn = connection.ops.quote_name
+	table = qn(model._meta.db_table)
+	key_columns = [model._meta.get_field(f).column for f in key_fields]
+	columns = key_columns + list(COUNTER_FIELDS)
+	key_prep = [model._meta.get_field(f) for f in key_fields]
+	assignments = ', '.join(f'{qn(c)} = {table}.{qn(c)} + excluded.{qn(c)}' for c in COUNTER_FIELDS)
+	row_sql = '(' + ', '.join(['%s'] * len(columns)) + ')'
+	with connection.cursor() as cursor:
+		for start in range(0, len(items), UPSERT_BATCH_SIZE):
+			batch = items[start:start + UPSERT_BATCH_SIZE]
+			params = []
+			for key, counters in batch:
+				params.extend(field.get_db_prep_value(value, connection) for field, value in zip(key_prep, key))
+				params.extend(counters[name] for name in COUNTER_FIELDS)
+			cursor.execute(
+				f'INSERT INTO {table} ({", ".join(qn(c) for c in columns)}) '
+				f'VALUES {", ".join([row_sql] * len(batch))} '
+				f'ON CONFLICT ({", ".join(qn(c) for c in key_columns)}) DO UPDATE SET {assignments}',
+				params,
+			)
+
+
+def record_attendance_changes(changes):
+	"""Apply attendance writes to the rollups as deltas.
+
+	changes: iterable of (employee_id, department, date, before, after), where
+	before/after are snapshot() tuples (None when the row did not / does not
+	exist). Call inside the transaction that wrote the attendance rows.
+	"""
+	monthly = defaultdict(Counter)
+	daily = defaultdict(Counter)
+	for employee_id, department, day, before, after in changes:
+		# Counter.update adds, keeping negative values
+		delta = _counters(after, 1)
+		delta.update(_counters(before, -1))
+		monthly[(employee_id, day.replace(day=1))].update(delta)
+		daily[(department, day)].update(delta)
+	_additive_upsert(AttendanceMonthlyRollup, ('employee', 'month'), monthly)
+	_additive_upsert(DepartmentDailyRollup, ('department', 'date'), daily)
+
+
+def move_department(employee_id, old_department, new_department):
+	"""Re-attribute all of an employee's attendance in the department rollups,
+	from old_department to new_department (None when the employee is being
+	deleted). One grouped read and one upsert per batch of days.
+	"""
+	rows = Attendance.objects.filter(employee_id=employee_id).order_by().values('date').annotate(**_aggregates())
+	daily = defaultdict(Counter)
+	for row in rows:
+		for name in COUNTER_FIELDS:
+			value = row['r_' + name] or 0
+			daily[(old_department, row['date'])][name] -= value
+			if new_department is not None:
+				daily[(new_department, row['date'])][name] += value
+	_additive_upsert(DepartmentDailyRollup, ('department', 'date'), daily)
+
+
+def _aggregates():
+	# prefixed so the names do not clash with Attendance.check_*_seconds
+	return {
+		'r_present': Count('id', filter=Q(status='Present')),
+		'r_leave': Count('id', filter=Q(status='Leave')),
+		'r_absent': Count('id', filter=Q(status='Absent')),
+		'r_check_in_count': Count('check_in'),
+		'r_check_in_seconds': Sum('check_in_seconds'),
+		'r_check_out_count': Count('check_out'),
+		'r_check_out_seconds': Sum('check_out_seconds'),
+	}
+
+
+def rebuild_rollups(apps=None):
+	"""Recompute both rollup tables from Attendance (backfill / repair).
+
+	Department rollups are attributed to each employee's current department,
+	as the incremental updates do. Pass a migration's apps to run on its
+	historical models.
+	Returns: { "monthly": int, "daily": int } rows written.
+	"""
+	attendance, monthly_rollup, daily_rollup = Attendance, AttendanceMonthlyRollup, DepartmentDailyRollup
+	if apps is not None:
+		attendance, monthly_rollup, daily_rollup = (
+			apps.get_model('api', name) for name in ('Attendance', 'AttendanceMonthlyRollup', 'DepartmentDailyRollup')
+		)
+
+	def counters(row):
+		return {name: row['r_' + name] or 0 for name in COUNTER_FIELDS}
+
+	with transaction.atomic():
+		monthly_rollup.objects.all().delete()
+		daily_rollup.objects.all().delete()
+		monthly = (
+			attendance.objects.order_by()
+			.annotate(bucket=TruncMonth('date'))
+			.values('employee_id', 'bucket')
+			.annotate(**_aggregates())
+		)
+		monthly_rollup.objects.bulk_create(
+			(monthly_rollup(employee_id=r['employee_id'], month=r['bucket'], **counters(r)) for r in monthly.iterator()),
+			batch_size=UPSERT_BATCH_SIZE,
+		)
+		daily = (
+			attendance.objects.order_by()
+			.values('employee__department', 'date')
+			.annotate(**_aggregates())
+		)
+		daily_rollup.objects.bulk_create(
+			(daily_rollup(department=r['employee__department'], date=r['date'], **counters(r)) for r in daily.iterator()),
+			batch_size=UPSERT_BATCH_SIZE,
+		)
+	return {
+		'monthly': monthly_rollup.objects.count(),
+		'daily': daily_rollup.objects.count(),
+	}
@@ -0,0 +1,53 @@
+from .db_router import read_connection
+from .models import Employee
+
+
+# SQLite FTS5 trigram index over the employee directory (created and kept in
+# sync by triggers in migration 0010). Trigrams give indexed substring
+# matching, so "ali" finds "Alice" and "Natalia" without a LIKE '%ali%' scan.
+FTS_TABLE = 'api_employee_fts'
+FTS_COLUMNS = ('name', 'email', 'department', 'designation')
+MIN_TERM_LENGTH = 3  # shorter terms have no trigram to look up
+DEFAULT_SEARCH_LIMIT = 50
+MAX_SEARCH_LIMIT = 500
+
+
+def _connection():
+	# follow the read router so @read_replica views search the replica
+	return read_connection(Employee)
+
+
+def _match_expression(term, columns):
+	phrase = '"' + term.replace('"', '""') + '"'
+	if tuple(columns) == FTS_COLUMNS:
+		return phrase
+	return '{' + ' '.join(columns) + '} : ' + phrase
+
+
+def search_employee_ids(term, columns=FTS_COLUMNS, limit=DEFAULT_SEARCH_LIMIT, department=None):
+	"""Return employee ids whose columns contain `term`, best match first.
+
+	Names that start with the term rank ahead of other substring hits, then
+	FTS5's bm25 rank decides. `department` narrows the hits (case-insensitive)
+	before the limit is applied. Returns None when the index cannot serve the
+	term (non-SQLite database or a term shorter than three characters), in
+	which case callers fall back to icontains.
+	"""
+	term = term.strip()
+	connection = _connection()
+	if connection.vendor != 'sqlite' or len(term) < MIN_TERM_LENGTH:
+		return None
+	escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+	sql = f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s'
+	params = [_match_expression(term, columns)]
+	if department:
+		sql += ' AND lower(department) = lower(%s)'
+		params.append(department)
+	sql += " ORDER BY (name LIKE %s ESCAPE '\\') DESC, rank, rowid"
+	params.append(escaped + '%')
+	if limit is not None:
+		sql += ' LIMIT %s'
+		params.append(limit)
+	with connection.cursor() as cursor:
+		cursor.execute(sql, params)
+		return [row[0] for row in cursor.fetchall()]
@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from .models import HR, Employee, Leave, Attendance, Task
-from django.contrib.auth.hashers import make_password
+from .passwords import make_password
 
 
 class HRSerializer(serializers.ModelSerializer):
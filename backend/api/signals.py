@@ -0,0 +1,99 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import metrics, profiling, tokens
+from .cache import invalidate_on_commit
+from .changelog import log_delete, log_employee_moved, log_upserts
+from .models import HR, Employee, Leave, Attendance, Task
+from .rollups import move_department, record_attendance_changes, snapshot
+from .versions import bump_for_model
+
+
+@receiver([post_save, post_delete], sender=Employee)
+@receiver([post_save, post_delete], sender=Leave)
+@receiver([post_save, post_delete], sender=Attendance)
+def evict_cached_responses(sender, **kwargs):
+	invalidate_on_commit(sender.__name__)
+
+
+@receiver([post_save, post_delete], sender=HR)
+@receiver([post_save, post_delete], sender=Employee)
+@receiver([post_save, post_delete], sender=Leave)
+@receiver([post_save, post_delete], sender=Task)
+def bump_collection_versions(sender, **kwargs):
+	bump_for_model(sender.__name__)
+
+
+@receiver(post_save, sender=Leave)
+@receiver(post_save, sender=Task)
+@receiver(post_save, sender=Attendance)
+def log_saved_change(sender, instance, **kwargs):
+	log_upserts(sender.objects.filter(pk=instance.pk))
+
+
+@receiver(post_delete, sender=Leave)
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=Attendance)
+def log_deleted_change(sender, instance, **kwargs):
+	log_delete(instance)
+
+
+@receiver(post_init, sender=Employee)
+def remember_loaded_fields(sender, instance, **kwargs):
+	# the department the rollups hold this employee's attendance under and
+	# the HR whose sync scope holds their rows; not read when deferred,
+	# which would cost a query per instance
+	instance._rollup_department = instance.__dict__.get('department')
+	instance._changelog_hr_id = instance.__dict__.get('hr_id')
+
+
+@receiver(post_save, sender=Employee)
+def move_rollups_with_department(sender, instance, created, update_fields=None, **kwargs):
+	if update_fields is not None and 'department' not in update_fields:
+		return
+	previous = instance._rollup_department
+	if not created and previous is not None and previous != instance.department:
+		move_department(instance.pk, previous, instance.department)
+	instance._rollup_department = instance.department
+
+
+@receiver(post_save, sender=Employee)
+def move_sync_scope_with_hr(sender, instance, created, update_fields=None, **kwargs):
+	if update_fields is not None and 'hr' not in update_fields and 'hr_id' not in update_fields:
+		return
+	previous = instance._changelog_hr_id
+	if not created and previous is not None and previous != instance.hr_id:
+		log_employee_moved(instance.pk, previous)
+	instance._changelog_hr_id = instance.hr_id
+
+
+@receiver(pre_delete, sender=Employee)
+def remove_employee_from_rollups(sender, instance, **kwargs):
+	# the monthly rollups cascade with the employee; the department totals
+	# lose its whole history here (its attendance rows are skipped below)
+	department = instance._rollup_department
+	if department is None:
+		department = Employee.objects.filter(pk=instance.pk).values_list('department', flat=True).first()
+	move_department(instance.pk, department, None)
+
+
+@receiver(post_delete, sender=Attendance)
+def remove_attendance_from_rollups(sender, instance, origin=None, **kwargs):
+	if isinstance(origin, (HR, Employee)) or getattr(origin, 'model', None) in (HR, Employee):
+		return
+	department = Employee.objects.filter(pk=instance.employee_id).values_list('department', flat=True).first()
+	record_attendance_changes([(instance.employee_id, department, instance.date, snapshot(instance), None)])
+
+
+@receiver(post_delete, sender=HR)
+@receiver(post_delete, sender=Employee)
+def revoke_deleted_accounts_tokens(sender, instance, **kwargs):
+	# tokens are not checked against the account table, so revoke them
+	tokens.revoke_subject('hr' if sender is HR else 'employee', instance.pk)
+
+
+@receiver(connection_created)
+def instrument_new_connection(sender, connection, **kwargs):
+	metrics.instrument_connection(connection)
+	profiling.instrument_connection(connection)
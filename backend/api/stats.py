@@ -0,0 +1,172 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .db_router import read_connection
+from .models import Employee, Leave, Attendance, AttendanceMonthlyRollup
+
+
+def _leave_status_aggregates():
+	return {
+		'pending': Count('id', filter=Q(status='Pending')),
+		'approved': Count('id', filter=Q(status='Approved')),
+		'rejected': Count('id', filter=Q(status='Rejected')),
+	}
+
+
+def leave_status_counts():
+	"""Leave totals by status across all employees, as one conditional aggregate.
+
+	Response: { "pending": int, "approved": int, "rejected": int }
+	"""
+	return Leave.objects.aggregate(**_leave_status_aggregates())
+
+
+async def aleave_status_counts():
+	return await Leave.objects.aaggregate(**_leave_status_aggregates())
+
+
+def _per_employee_count(model, **filters):
+	# correlated COUNT on the (employee, ...) indexes; 0 when the employee has no rows
+	counts = (
+		model.objects.filter(employee_id=OuterRef('pk'), **filters)
+		.order_by()
+		.values('employee_id')
+		.annotate(n=Count('*'))
+		.values('n')
+	)
+	return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def _per_employee_rollup_sum(expression):
+	# sums the employee's monthly rollups: O(months) rather than O(days)
+	sums = (
+		AttendanceMonthlyRollup.objects.filter(employee_id=OuterRef('pk'))
+		.order_by()
+		.values('employee_id')
+		.annotate(n=Sum(expression))
+		.values('n')
+	)
+	return Coalesce(Subquery(sums, output_field=IntegerField()), Value(0))
+
+
+ROLLUP_TOTAL_DAYS = F('present') + F('leave') + F('absent')
+
+
+def attendance_percent(present_days, total_days):
+	return round(present_days / total_days * 100, 2) if total_days > 0 else 0
+
+
+def employee_stats(employee_ids):
+	"""Leave and attendance counters for a batch of employees in a single query.
+
+	employee_ids may be a list of ids or an id-valued queryset (e.g. a team).
+	Returns: { employee_id: { "id", "name", "approved_leaves", "pending_leaves",
+	"total_days", "present_days", "attendance_percent" } } for employees that exist.
+	"""
+	result = {}
+	for row in _employee_stats_rows(employee_ids):
+		row['attendance_percent'] = attendance_percent(row['present_days'], row['total_days'])
+		result[row['id']] = row
+	return result
+
+
+async def aemployee_stats(employee_ids):
+	"""employee_stats() through the async ORM."""
+	result = {}
+	async for row in _employee_stats_rows(employee_ids):
+		row['attendance_percent'] = attendance_percent(row['present_days'], row['total_days'])
+		result[row['id']] = row
+	return result
+
+
+def _employee_stats_rows(employee_ids):
+	return Employee.objects.filter(id__in=employee_ids).order_by('id').values('id', 'name').annotate(
+		approved_leaves=_per_employee_count(Leave, status='Approved'),
+		pending_leaves=_per_employee_count(Leave, status='Pending'),
+		total_days=_per_employee_rollup_sum(ROLLUP_TOTAL_DAYS),
+		present_days=_per_employee_rollup_sum('present'),
+	)
+
+
+EMPTY_EMPLOYEE_STATS = {
+	'approved_leaves': 0,
+	'pending_leaves': 0,
+	'total_days': 0,
+	'present_days': 0,
+	'attendance_percent': 0,
+}
+
+
+def format_seconds(value):
+	if value is None:
+		return None
+	value = int(round(value))
+	return f'{value // 3600:02d}:{value % 3600 // 60:02d}:{value % 60:02d}'
+
+
+def check_in_distribution(group='employee', since=None, limit=None):
+	"""Average, median and p90 check-in per employee or department, in one SQL query.
+
+	Ranks Attendance.check_in_seconds with window functions and picks the
+	nearest-rank percentiles, so no rows are pulled into Python. Results are
+	ordered earliest average first. Without `since` only the last
+	PUNCTUALITY_DEFAULT_DAYS days are ranked, so the sort stays bounded as
+	history grows; the query runs on the read database.
+	Returns: [ { "employee_id", "employee_name" | "department", "samples",
+	"avg_check_in", "median_check_in", "p90_check_in" (HH:MM:SS) and the
+	matching *_seconds values }, ... ]
+	"""
+	if group not in ('employee', 'department'):
+		raise ValueError('group must be employee or department')
+	if since is None:
+		since = timezone.localdate() - timedelta(days=getattr(settings, 'PUNCTUALITY_DEFAULT_DAYS', 90) - 1)
+	connection = read_connection(Attendance)
+	qn = connection.ops.quote_name
+	attendance = qn(Attendance._meta.db_table)
+	employee = qn(Employee._meta.db_table)
+	if group == 'employee':
+		key_sql, label_sql = f'a.{qn("employee_id")}', f'e.{qn("name")}'
+	else:
+		key_sql = label_sql = f'e.{qn("department")}'
+	where = f'a.{qn("check_in_seconds")} IS NOT NULL AND a.{qn("date")} >= %s'
+	params = [Attendance._meta.get_field('date').get_db_prep_value(since, connection)]
+	sql = f'''
+		WITH ranked AS (
+			SELECT {key_sql} AS grp, {label_sql} AS label, a.{qn("check_in_seconds")} AS secs,
+				ROW_NUMBER() OVER (PARTITION BY {key_sql} ORDER BY a.{qn("check_in_seconds")}) AS rn,
+				COUNT(*) OVER (PARTITION BY {key_sql}) AS cnt
+			FROM {attendance} a
+			JOIN {employee} e ON e.{qn("id")} = a.{qn("employee_id")}
+			WHERE {where}
+		)
+		SELECT r.grp, MAX(r.label), COUNT(*), AVG(r.secs),
+			MIN(CASE WHEN r.rn * 2 >= r.cnt THEN r.secs END),
+			MIN(CASE WHEN r.rn * 10 >= r.cnt * 9 THEN r.secs END)
+		FROM ranked r
+		GROUP BY r.grp
+		ORDER BY AVG(r.secs), r.grp
+	'''
+	if limit is not None:
+		sql += ' LIMIT %s'
+		params.append(int(limit))
+	with connection.cursor() as cursor:
+		cursor.execute(sql, params)
+		rows = cursor.fetchall()
+	result = []
+	for key, label, samples, avg, median, p90 in rows:
+		item = {'employee_id': key, 'employee_name': label} if group == 'employee' else {'department': label}
+		item.update({
+			'samples': samples,
+			'avg_check_in': format_seconds(avg),
+			'median_check_in': format_seconds(median),
+			'p90_check_in': format_seconds(p90),
+			'avg_check_in_seconds': round(avg, 1),
+			'median_check_in_seconds': median,
+			'p90_check_in_seconds': p90,
+		})
+		result.append(item)
+	return result
@@ -1,3 +1,1644 @@
-from django.test import TestCase
+import asyncio
+import csv
+import gzip
+import importlib
+import io
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, time, timedelta
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from time import perf_counter
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management import call_command
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from django.db import IntegrityError, connection, transaction
+from django.test import AsyncClient, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .fieldsets import ATTENDANCE_LIST, EMPLOYEE_LIST, LEAVE_LIST, TASK_LIST
+from .metrics import CounterFile, collect
+from .profiling import PROFILE_HEADER, Profile, collapsed_stacks, list_profiles, load_profile, make_token
+from .models import (
+	HR, Employee, Leave, Attendance, Task, OutboxMessage, AttendanceMonthlyRollup, DepartmentDailyRollup, ChangeLogEntry,
+	RevokedToken,
+)
+from .attendance_utils import backfill_leave_attendance
+from .benchmark import ROUTE_SPECS, compare_reports, route_names, run_benchmark
+from .cache import cache_stats
+from .dataset import generate_dataset
+from .db_router import STICKY_COOKIE, ReadReplicaRouter, ReadYourWritesMiddleware, read_replica
+from .employee_import import NOT_UTF8, import_employees_csv
+from .events import EventBroker, broker, employee_channel, event_stream, hr_channel
+from .outbox import _claim_batch, drain_outbox
+from . import metrics, passwords, tokens
+from .passwords import PasswordPool, PasswordPoolSaturated, PasswordWorkerLost
+from .replication import sync_replicas
+from .serializers import AttendanceSerializer, EmployeeSerializer, LeaveSerializer, TaskSerializer
+from .renderers import ORJSONRenderer
+from .tokens import InvalidToken, RevocationFilter, decode_token, issue_token, verify_token
+from .rollups import rebuild_rollups
+from .stats import check_in_distribution
+from .write_queue import WriteQueue
+
+
+def _make_fixture():
+	hr = HR.objects.create(name='Hr', email='hr@example.com', password='secret', department='People')
+	emp = Employee.objects.create(
+		name='Emp', email='emp@example.com', password='secret', department='Engineering',
+		designation='Dev', salary=1000, hr=hr,
+	)
+	today = timezone.localdate()
+	Leave.objects.create(employee=emp, start_date=today + timedelta(days=3), end_date=today + timedelta(days=4), reason='trip')
+	Attendance.objects.create(employee=emp, date=today - timedelta(days=1), status='Present')
+	Task.objects.create(hr=hr, employee=emp, title='t', description='d', due_date=today)
+	return hr, emp
+
+
+class QueryPlanTests(TestCase):
+	"""Every hot endpoint query must be served by an index, never a full table scan."""
+
+	# "SCAN api_leave" is a full scan; "SCAN ... USING [COVERING] INDEX" is an index walk
+	FULL_SCAN = re.compile(r'^SCAN (api_\w+)$')
+
+	def setUp(self):
+		self.hr, self.emp = _make_fixture()
+		self.client = APIClient()
+
+	def _full_scans(self, send):
+		with CaptureQueriesContext(connection) as ctx:
+			response = send()
+		self.assertLess(response.status_code, 500)
+		scans = []
+		with connection.cursor() as cursor:
+			for query in ctx.captured_queries:
+				sql = query['sql']
+				if not sql.lstrip().upper().startswith('SELECT'):
+					continue
+				cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+				for row in cursor.fetchall():
+					match = self.FULL_SCAN.match(row[-1])
+					if match:
+						scans.append((match.group(1), sql))
+		return scans
+
+	def test_endpoints_use_indexes(self):
+		today = timezone.localdate()
+		requests = {
+			'leave_request': lambda: self.client.post('/api/leave/request/', {
+				'employee': self.emp.id, 'start_date': str(today + timedelta(days=10)),
+				'end_date': str(today + timedelta(days=11)), 'reason': 'x',
+			}, format='json'),
+			'leave_mine': lambda: self.client.get('/api/leave/mine/', {'employee': self.emp.id}),
+			'leave_pending': lambda: self.client.get('/api/leave/pending/'),
+			'attendance_mark': lambda: self.client.post('/api/attendance/mark/', {'employee': self.emp.id}, format='json'),
+			'attendance_weekly': lambda: self.client.get('/api/attendance/', {'range': 'weekly'}),
+			'attendance_monthly': lambda: self.client.get('/api/attendance/', {'range': 'monthly'}),
+			'attendance_date': lambda: self.client.get('/api/attendance/', {'date': str(date.today())}),
+			'employee_list_by_hr': lambda: self.client.get('/api/employee/list/', {'hr_id': self.hr.id}),
+			'employees_department_count': lambda: self.client.get('/api/employees/department-count/'),
+			'tasks_hr': lambda: self.client.get('/api/tasks/', {'hr_id': self.hr.id}),
+			'tasks_employee': lambda: self.client.get('/api/tasks/my-tasks/', {'employee_id': self.emp.id}),
+		}
+		for name, send in requests.items():
+			with self.subTest(endpoint=name):
+				self.assertEqual(self._full_scans(send), [])
+
+
+class _StubMailer(BaseHTTPRequestHandler):
+	"""Records every POST body and answers with the server's configured status."""
+
+	def do_POST(self):
+		body = self.rfile.read(int(self.headers['Content-Length']))
+		self.server.received.append(json.loads(body))
+		self.send_response(self.server.reply_status)
+		self.end_headers()
+		self.wfile.write(b'{}')
+
+	def log_message(self, *args):
+		pass
+
+
+class OutboxTests(TestCase):
+
+	def setUp(self):
+		self.server = HTTPServer(('127.0.0.1', 0), _StubMailer)
+		self.server.received = []
+		self.server.reply_status = 200
+		threading.Thread(target=self.server.serve_forever, daemon=True).start()
+		self.addCleanup(self.server.server_close)
+		self.addCleanup(self.server.shutdown)
+		url = f'http://127.0.0.1:{self.server.server_port}/send-welcome-email'
+		self.settings_override = override_settings(OUTBOX_ENDPOINTS={'welcome_email': url}, OUTBOX_MAX_ATTEMPTS=2)
+		self.settings_override.enable()
+		self.addCleanup(self.settings_override.disable)
+		self.hr = HR.objects.create(name='Hr', email='hr@example.com', password='secret', department='People')
+
+	def _create_employee(self):
+		response = APIClient().post('/api/employee/create/', {
+			'name': 'New', 'email': 'new@example.com', 'password': 'pw-123456', 'department': 'Ops',
+			'designation': 'Analyst', 'salary': '100.00', 'hr': self.hr.id,
+		}, format='json')
+		self.assertEqual(response.status_code, 201)
+
+	def test_create_enqueues_without_calling_mailer(self):
+		self._create_employee()
+		self.assertEqual(self.server.received, [])
+		message = OutboxMessage.objects.get()
+		self.assertEqual(message.status, OutboxMessage.STATUS_PENDING)
+		self.assertEqual(message.payload['email'], 'new@example.com')
+
+	def test_drain_delivers_and_scrubs_password(self):
+		self._create_employee()
+		self.assertEqual(drain_outbox(), {'sent': 1, 'retried': 0, 'dead': 0})
+		self.assertEqual(self.server.received[0]['password'], 'pw-123456')
+		message = OutboxMessage.objects.get()
+		self.assertEqual(message.status, OutboxMessage.STATUS_SENT)
+		self.assertNotIn('password', message.payload)
+
+	def test_server_errors_retry_with_backoff_then_dead_letter(self):
+		self.server.reply_status = 500
+		self._create_employee()
+		self.assertEqual(drain_outbox(), {'sent': 0, 'retried': 1, 'dead': 0})
+		message = OutboxMessage.objects.get()
+		self.assertGreater(message.next_attempt_at, timezone.now())
+		# not due yet, so nothing is claimed
+		self.assertEqual(drain_outbox(), {'sent': 0, 'retried': 0, 'dead': 0})
+		self.assertEqual(drain_outbox(now=message.next_attempt_at), {'sent': 0, 'retried': 0, 'dead': 1})
+		self.assertEqual(OutboxMessage.objects.get().status, OutboxMessage.STATUS_DEAD)
+
+	def test_lease_covers_the_whole_batch(self):
+		for i in range(3):
+			OutboxMessage.objects.create(kind=OutboxMessage.KIND_WELCOME_EMAIL, payload={'email': f'{i}@example.com'})
+		now = timezone.now()
+		with override_settings(OUTBOX_HTTP_TIMEOUT=5):
+			claimed = _claim_batch(10, now)
+		self.assertEqual(len(claimed), 3)
+		# three deliveries timing out one after another, plus one of slack
+		self.assertEqual({m.next_attempt_at for m in claimed}, {now + timedelta(seconds=20)})
+		self.assertEqual(drain_outbox(now=now), {'sent': 0, 'retried': 0, 'dead': 0})
+
+	def test_client_errors_dead_letter_immediately(self):
+		self.server.reply_status = 400
+		self._create_employee()
+		self.assertEqual(drain_outbox(), {'sent': 0, 'retried': 0, 'dead': 1})
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class EmployeeImportTests(TestCase):
+
+	def setUp(self):
+		self.hr = HR.objects.create(name='Hr', email='hr@example.com', password='secret', department='People')
+		Employee.objects.create(
+			name='Old', email='old@example.com', password='x', department='Ops',
+			designation='Dev', salary=1, hr=self.hr,
+		)
+
+	def test_import_reports_per_row_errors(self):
+		csv_text = (
+			'name,email,password,department,designation,salary\n'
+			'Ann,ann@example.com,pw1,Ops,Dev,100\n'
+			'Bob,not-an-email,pw2,Ops,Dev,100\n'
+			'Cat,old@example.com,pw3,Ops,Dev,100\n'
+			'Dan,dan@example.com,pw4,Ops,Dev,abc\n'
+			'Eve,ann@example.com,pw5,Ops,Dev,100\n'
+			'Fay,fay@example.com,pw6,Ops,Dev,100\n'
+		)
+		pool = PasswordPool(workers=2, max_pending=4)
+		self.addCleanup(pool.shutdown)
+		with mock.patch.object(passwords, 'pool', pool):
+			report = import_employees_csv(io.StringIO(csv_text), default_hr_id=self.hr.id, chunk_size=2, jobs=2)
+		self.assertEqual(pool.stats()['pending'], 0)
+		self.assertEqual(report['created'], 2)
+		self.assertEqual([e['row'] for e in report['errors']], [3, 4, 5, 6])
+		self.assertIn('email', report['errors'][0]['errors'])
+		self.assertIn('salary', report['errors'][2]['errors'])
+		ann = Employee.objects.get(email='ann@example.com')
+		self.assertTrue(ann.password.startswith('md5$'))
+		self.assertEqual(OutboxMessage.objects.filter(kind=OutboxMessage.KIND_WELCOME_EMAIL).count(), 2)
+
+	def test_missing_columns_rejected(self):
+		report = import_employees_csv(io.StringIO('name,email\nA,a@example.com\n'))
+		self.assertEqual(report['created'], 0)
+		self.assertIn('Missing columns', report['errors'][0]['errors']['non_field_errors'][0])
+
+	def test_non_utf8_upload_is_rejected(self):
+		csv_bytes = (
+			'name,email,password,department,designation,salary\n'
+			'José,jose@example.com,pw1,Ops,Dev,100\n'
+		).encode('latin-1')
+		upload = io.BytesIO(csv_bytes)
+		upload.name = 'employees.csv'
+		response = APIClient().post('/api/employee/import/', {'file': upload, 'hr': self.hr.id}, format='multipart')
+		self.assertEqual(response.status_code, 400)
+		self.assertEqual(response.data['created'], 0)
+		self.assertEqual(response.data['errors'], [{'row': 1, 'errors': {'non_field_errors': [NOT_UTF8]}}])
+		self.assertFalse(Employee.objects.filter(email='jose@example.com').exists())
+
+	def test_rows_get_the_serializers_field_validation(self):
+		csv_text = (
+			'name,email,password,department,designation,salary\n'
+			f'{"x" * 101},long@example.com,pw1,Ops,Dev,100\n'
+			'Gus,gus@example.com,pw2,,Dev,123456789.123\n'
+			'Hal,hal@example.com,pw3,Ops,Dev,100\n'
+		)
+		with mock.patch.object(passwords, 'pool', PasswordPool(workers=0)):
+			report = import_employees_csv(io.StringIO(csv_text), default_hr_id=self.hr.id)
+		self.assertEqual(report['created'], 1)
+		serializer = EmployeeSerializer(data={
+			'name': 'x' * 101, 'email': 'gus@example.com', 'password': 'pw', 'department': '',
+			'designation': 'Dev', 'salary': '123456789.123', 'hr': self.hr.id,
+		})
+		self.assertFalse(serializer.is_valid())
+		self.assertEqual(report['errors'][0], {'row': 2, 'errors': {'name': serializer.errors['name']}})
+		self.assertEqual(report['errors'][1], {'row': 3, 'errors': {
+			'department': ['This field is required.'], 'salary': serializer.errors['salary'],
+		}})
+
+
+class QueryCountTests(TestCase):
+	"""List endpoints must issue a fixed number of queries however many rows they return."""
+
+	def setUp(self):
+		self.hr, self.emp = _make_fixture()
+		self.client = APIClient()
+
+	def _add_rows(self, count):
+		today = timezone.localdate()
+		for i in range(count):
+			emp = Employee.objects.create(
+				name=f'Emp {i}', email=f'emp{i}@example.com', password='secret', department='Engineering',
+				designation='Dev', salary=1000, hr=self.hr,
+			)
+			Leave.objects.create(employee=emp, start_date=today, end_date=today, reason='r')
+			Leave.objects.create(employee=self.emp, start_date=today, end_date=today, reason='r')
+			Attendance.objects.create(employee=emp, date=today, status='Present')
+			Task.objects.create(hr=self.hr, employee=self.emp, title=f't{i}', description='d', due_date=today)
+
+	def test_list_endpoints_have_constant_query_counts(self):
+		# endpoint -> (url, params, expected queries); conditional-GET lists add
+		# one collection version lookup
+		endpoints = {
+			'leave_mine': ('/api/leave/mine/', {'employee': self.emp.id}, 1),
+			'leave_pending': ('/api/leave/pending/', {}, 2),
+			'attendance_list': ('/api/attendance/', {}, 1),
+			'employee_list': ('/api/employees/', {}, 1),
+			'employee_list_by_hr': ('/api/employee/list/', {'hr_id': self.hr.id}, 2),
+			'tasks_list': ('/api/tasks/', {'hr_id': self.hr.id}, 3),
+			'tasks_my_tasks': ('/api/tasks/my-tasks/', {'employee_id': self.emp.id}, 3),
+		}
+		for rows in (0, 5):
+			self._add_rows(rows)
+			for name, (url, params, expected) in endpoints.items():
+				with self.subTest(endpoint=name, extra_rows=rows):
+					with self.assertNumQueries(expected):
+						response = self.client.get(url, params)
+					self.assertEqual(response.status_code, 200)
+
+
+class StatsAggregateTests(TestCase):
+	"""Stats endpoints are answered by one grouped query each."""
+
+	def setUp(self):
+		cache.clear()
+		self.hr, self.emp = _make_fixture()
+		self.other = Employee.objects.create(
+			name='Other', email='other@example.com', password='secret', department='Engineering',
+			designation='Dev', salary=1000, hr=self.hr,
+		)
+		today = timezone.localdate()
+		Leave.objects.create(employee=self.emp, start_date=today, end_date=today, reason='r', status='Approved')
+		Attendance.objects.create(employee=self.emp, date=today - timedelta(days=2), status='Absent')
+		# fixtures bypass the views, so derive the rollups from scratch
+		rebuild_rollups()
+		self.client = APIClient()
+
+	def _get(self, url, params=None):
+		with self.assertNumQueries(1):
+			response = self.client.get(url, params or {})
+		self.assertEqual(response.status_code, 200)
+		return response.data
+
+	def test_single_query_stats(self):
+		self.assertEqual(self._get('/api/leaves/status-summary/'), {'pending': 1, 'approved': 1, 'rejected': 0})
+		self.assertEqual(self._get('/api/leave/summary/', {'employee': self.emp.id}), {'total_taken': 1, 'pending': 1})
+		self.assertEqual(
+			self._get('/api/attendance/stats/employee/', {'employee': self.emp.id}),
+			{'total_leaves': 1, 'pending_leaves': 1, 'attendance_percent': 50.0},
+		)
+		data = self._get(f'/api/attendance-percentage/{self.emp.id}/')
+		self.assertEqual((data['total_days'], data['present_days']), (2, 1))
+
+	def test_team_stats_in_one_query(self):
+		data = self._get('/api/attendance/stats/team/', {'hr_id': self.hr.id})
+		self.assertEqual([row['employee_id'] for row in data], [self.emp.id, self.other.id])
+		self.assertEqual(data[1]['total_days'], 0)
+		data = self._get('/api/attendance/stats/team/', {'employees': f'{self.other.id}'})
+		self.assertEqual(len(data), 1)
+
+	def test_unknown_employee_percentage_is_404(self):
+		self.assertEqual(self.client.get('/api/attendance-percentage/999/').status_code, 404)
+
+
+class ResponseCacheTests(TestCase):
+
+	def setUp(self):
+		cache.clear()
+		self.hr, self.emp = _make_fixture()
+		self.client = APIClient()
+
+	def test_hit_then_evicted_by_dependent_write(self):
+		with self.assertNumQueries(2):
+			self.assertEqual(self.client.get('/api/counts/').data['employees_count'], 1)
+		with self.assertNumQueries(0):
+			self.client.get('/api/counts/')
+		with self.captureOnCommitCallbacks(execute=True):
+			Employee.objects.create(
+				name='New', email='new@example.com', password='x', department='Ops',
+				designation='Dev', salary=1, hr=self.hr,
+			)
+		self.assertEqual(self.client.get('/api/counts/').data['employees_count'], 2)
+		self.assertEqual(cache_stats()['hits'], 1)
+		self.assertEqual(cache_stats()['misses'], 2)
+
+	def test_unrelated_write_keeps_entry(self):
+		self.client.get('/api/employees/department-count/')
+		with self.captureOnCommitCallbacks(execute=True):
+			Leave.objects.create(employee=self.emp, start_date=date.today(), end_date=date.today(), reason='r')
+		with self.assertNumQueries(0):
+			self.client.get('/api/employees/department-count/')
+		# query strings are cached separately
+		with self.assertNumQueries(1):
+			self.client.get('/api/employees/department-count/', {'x': '1'})
+
+
+class AttendanceRollupTests(TestCase):
+	"""Incrementally maintained rollups must match a full rebuild."""
+
+	COLUMNS = ('present', 'leave', 'absent', 'check_in_count', 'check_in_seconds', 'check_out_count', 'check_out_seconds')
+
+	def setUp(self):
+		self.hr, self.emp = _make_fixture()
+		# the fixture row was written directly, so start from a rebuilt baseline
+		rebuild_rollups()
+		self.client = APIClient()
+
+	def _state(self):
+		monthly = sorted(AttendanceMonthlyRollup.objects.values_list('employee_id', 'month', *self.COLUMNS))
+		daily = sorted(DepartmentDailyRollup.objects.values_list('department', 'date', *self.COLUMNS))
+		# buckets whose counters all returned to zero are equivalent to absent rows
+		return [r for r in monthly if any(r[2:])], [r for r in daily if any(r[2:])]
+
+	def test_view_writes_match_rebuild(self):
+		today = timezone.localdate()
+		self.client.post('/api/attendance/mark/', {'employee': self.emp.id}, format='json')
+		self.client.post('/api/attendance/checkout/', {'employee': self.emp.id}, format='json')
+		past = Attendance.objects.get(employee=self.emp, date=today - timedelta(days=1))
+		self.client.put(f'/api/attendance/{past.id}/update/', {'status': 'Absent'}, format='json')
+		leave = Leave.objects.create(employee=self.emp, start_date=today - timedelta(days=1), end_date=today + timedelta(days=40), reason='r')
+		self.client.post(f'/api/leave/action/{leave.id}/', {'action': 'approve'}, format='json')
+
+		incremental = self._state()
+		rebuild_rollups()
+		self.assertEqual(incremental, self._state())
+		self.assertEqual(
+			sum(r.leave for r in AttendanceMonthlyRollup.objects.filter(employee=self.emp)),
+			42,
+		)
+
+
+	def test_deletes_and_department_changes_match_rebuild(self):
+		today = timezone.localdate()
+		self.client.post('/api/attendance/mark/', {'employee': self.emp.id}, format='json')
+		other = Employee.objects.create(
+			name='Other', email='other@example.com', password='secret', department='Engineering',
+			designation='Dev', salary=1000, hr=self.hr,
+		)
+		self.client.post('/api/attendance/mark/', {'employee': other.id}, format='json')
+		response = self.client.put(f'/api/employee/update/{self.emp.id}/', {'department': 'Sales'}, format='json')
+		self.assertEqual(response.status_code, 200)
+		self.assertTrue(DepartmentDailyRollup.objects.filter(department='Sales', date=today, present=1).exists())
+		Attendance.objects.get(employee=self.emp, date=today - timedelta(days=1)).delete()
+		other.delete()  # cascades to its attendance and monthly rollups
+
+		incremental = self._state()
+		rebuild_rollups()
+		self.assertEqual(incremental, self._state())
+		self.assertEqual({(department, day) for department, day, *_ in incremental[1]}, {('Sales', today)})
+
+	def test_migration_backfill_uses_historical_models(self):
+		AttendanceMonthlyRollup.objects.all().delete()
+		migration = importlib.import_module('api.migrations.0014_backfill_rollups')
+		migration.backfill_rollups(django_apps, None)
+		self.assertEqual(AttendanceMonthlyRollup.objects.get(employee=self.emp).present, 1)
+
+
+class LeaveBackfillTests(TestCase):
+	"""Approving leaves writes their days as one batched upsert."""
+
+	def setUp(self):
+		self.hr, self.emp = _make_fixture()
+		self.client = APIClient()
+		self.today = timezone.localdate()
+
+	def _leave(self, start, days):
+		return Leave.objects.create(
+			employee=self.emp, start_date=self.today + timedelta(days=start),
+			end_date=self.today + timedelta(days=start + days - 1), reason='r',
+		)
+
+	def test_inserts_and_overwrites_days(self):
+		# the fixture's Present row for yesterday falls inside this leave
+		leave = self._leave(-2, 4)
+		present = Attendance.objects.get(employee=self.emp, date=self.today - timedelta(days=1))
+		self.assertEqual(backfill_leave_attendance([leave]), {'inserted': 3, 'updated': 1})
+		self.assertEqual(
+			list(Attendance.objects.filter(employee=self.emp).order_by('date').values_list('date', 'status')),
+			[(self.today + timedelta(days=d), 'Leave') for d in range(-2, 2)],
+		)
+		present.refresh_from_db()
+		self.assertEqual(present.status, 'Leave')
+		# approving the same leave again only updates
+		self.assertEqual(backfill_leave_attendance([leave]), {'inserted': 0, 'updated': 4})
+
+	def test_round_trips_do_not_grow_with_leave_length(self):
+		counts = []
+		for start, days in ((10, 2), (20, 30)):
+			leave = self._leave(start, days)
+			with CaptureQueriesContext(connection) as ctx:
+				backfill_leave_attendance([leave])
+			counts.append(len(ctx.captured_queries))
+		self.assertEqual(counts[0], counts[1])
+
+	def test_bulk_endpoint(self):
+		first, second = self._leave(-1, 2), self._leave(10, 3)
+		response = self.client.post(
+			'/api/leave/action/bulk/', {'action': 'approve', 'leave_ids': [first.id, str(second.id)]}, format='json',
+		)
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(response.data, {'updated': 2, 'attendance': {'inserted': 4, 'updated': 1}})
+		self.assertEqual(set(Leave.objects.filter(id__in=[first.id, second.id]).values_list('status', flat=True)), {'Approved'})
+		self.assertEqual(Attendance.objects.filter(employee=self.emp, status='Leave').count(), 5)
+
+	def test_bulk_endpoint_rejects_bad_ids(self):
+		leave = self._leave(10, 1)
+		for leave_ids in (['abc'], [leave.id, None], [1.5], [True], 'abc', []):
+			with self.subTest(leave_ids=leave_ids):
+				response = self.client.post('/api/leave/action/bulk/', {'action': 'approve', 'leave_ids': leave_ids}, format='json')
+				self.assertEqual(response.status_code, 400)
+		leave.refresh_from_db()
+		self.assertEqual(leave.status, 'Pending')
+
+
+class PunctualityTests(TestCase):
+
+	def setUp(self):
+		cache.clear()
+		self.hr, self.emp = _make_fixture()
+		self.late = Employee.objects.create(
+			name='Late', email='late@example.com', password='secret', department='Sales',
+			designation='Rep', salary=1000, hr=self.hr,
+		)
+		today = timezone.localdate()
+		Attendance.objects.filter(employee=self.emp).delete()
+		for i, minute in enumerate([0, 5, 10, 15, 20, 25, 30, 35, 40, 45]):
+			Attendance.objects.create(employee=self.emp, date=today - timedelta(days=i), status='Present', check_in=time(8, minute))
+		Attendance.objects.create(employee=self.late, date=today, status='Present', check_in=time(10, 0))
+		Attendance.objects.create(employee=self.late, date=today - timedelta(days=30), status='Present', check_in=time(7, 0))
+
+	def test_percentiles_and_ranking(self):
+		data = APIClient().get('/api/attendance/stats/punctuality/').data
+		first = data[0]
+		self.assertEqual(first['employee_id'], self.emp.id)
+		self.assertEqual(first['avg_check_in'], '08:22:30')
+		# nearest-rank: 5th and 9th of 10 samples
+		self.assertEqual(first['median_check_in'], '08:20:00')
+		self.assertEqual(first['p90_check_in'], '08:40:00')
+
+	def test_days_window_and_department_grouping(self):
+		client = APIClient()
+		data = client.get('/api/attendance/stats/punctuality/', {'days': 7, 'group': 'department'}).data
+		self.assertEqual([d['department'] for d in data], ['Engineering', 'Sales'])
+		self.assertEqual(data[0]['samples'], 7)
+		self.assertEqual(data[1]['avg_check_in'], '10:00:00')
+		hr_stats = client.get('/api/attendance/stats/hr/').data
+		self.assertEqual(hr_stats['top_punctual'][0]['employee__name'], 'Emp')
+
+	def test_limit_and_days_must_be_positive(self):
+		client = APIClient()
+		self.assertEqual(len(client.get('/api/attendance/stats/punctuality/', {'limit': 1}).data), 1)
+		for params in ({'limit': 0}, {'limit': -1}, {'limit': 'x'}, {'days': 0}):
+			with self.subTest(params=params):
+				response = client.get('/api/attendance/stats/punctuality/', params)
+				self.assertEqual(response.status_code, 400)
+
+	def test_default_window_is_bounded(self):
+		Attendance.objects.create(
+			employee=self.late, date=timezone.localdate() - timedelta(days=200), status='Present', check_in=time(6, 0),
+		)
+		with override_settings(PUNCTUALITY_DEFAULT_DAYS=60):
+			samples = {d['employee_id']: d['samples'] for d in check_in_distribution()}
+		self.assertEqual(samples, {self.emp.id: 10, self.late.id: 2})
+		self.assertEqual({d['employee_id']: d['samples'] for d in check_in_distribution(since=date(2000, 1, 1))}[self.late.id], 3)
+
+	@override_settings(READ_REPLICAS=['replica1'])
+	def test_runs_on_the_read_database(self):
+		with mock.patch('api.db_router.connections') as connections:
+			connections.__getitem__.return_value = connection
+			read_replica(check_in_distribution)()
+		connections.__getitem__.assert_called_once_with('replica1')
+
+
+class AttendanceMarkTests(TestCase):
+
+	def setUp(self):
+		self.hr, self.emp = _make_fixture()
+		self.client = APIClient()
+
+	def _mark(self, emp_id):
+		return self.client.post('/api/attendance/mark/', {'employee': emp_id}, format='json')
+
+	def test_first_check_in_is_one_insert(self):
+		with CaptureQueriesContext(connection) as ctx:
+			response = self._mark(self.emp.id)
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(response.data['employee_name'], 'Emp')
+		statements = [q['sql'] for q in ctx.captured_queries if 'SAVEPOINT' not in q['sql']]
+		# the attendance write itself, one upsert per rollup table, and the
+		# sync change log entry
+		self.assertEqual(len(statements), 4)
+		self.assertTrue(statements[0].lstrip().startswith('INSERT'))
+		self.assertIsNotNone(Attendance.objects.get(employee=self.emp, date=timezone.localdate()).check_in_seconds)
+
+	def test_repeat_check_in_keeps_first_time(self):
+		first = self._mark(self.emp.id).data
+		second = self._mark(self.emp.id).data
+		self.assertEqual(first['id'], second['id'])
+		self.assertEqual(first['check_in'], second['check_in'])
+		self.assertEqual(AttendanceMonthlyRollup.objects.get(employee=self.emp, month=timezone.localdate().replace(day=1)).present, 1)
+
+	def test_guards(self):
+		self.assertEqual(self._mark(9999).status_code, 404)
+		today = timezone.localdate()
+		Leave.objects.create(employee=self.emp, start_date=today, end_date=today, reason='r', status='Approved')
+		self.assertEqual(self._mark(self.emp.id).status_code, 400)
+		self.assertFalse(Attendance.objects.filter(employee=self.emp, date=today).exists())
+
+
+class WriteQueueTests(TransactionTestCase):
+	"""Writes submitted from many threads are group-committed by one writer."""
+
+	def test_group_commit_isolates_failures(self):
+		queue = WriteQueue(max_batch=16, max_delay=0.05)
+
+		def create(i):
+			return HR.objects.create(name=f'Hr {i}', email=f'hr{i}@example.com', password='x', department='D').id
+
+		futures = [queue.submit(create, i) for i in range(10)]
+		# duplicate email: rolled back on its own savepoint, reported to its caller
+		bad = queue.submit(create, 0)
+		ids = [f.result(timeout=5) for f in futures]
+		with self.assertRaises(IntegrityError):
+			bad.result(timeout=5)
+		self.assertEqual(HR.objects.filter(id__in=ids).count(), 10)
+		stats = queue.stats()
+		self.assertEqual((stats['committed'], stats['failed'], stats['queue_depth']), (10, 1, 0))
+		self.assertLess(stats['batches'], 11)
+
+	@override_settings(WRITE_QUEUE_ENABLED=True, PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+	def test_views_write_through_the_queue(self):
+		hr, emp = _make_fixture()
+		queue = WriteQueue(max_batch=16, max_delay=0)
+		client = APIClient()
+		leave = Leave.objects.get()
+		requests = [
+			('/api/attendance/mark/', {'employee': emp.id}),
+			('/api/attendance/checkout/', {'employee': emp.id}),
+			(f'/api/leave/action/{leave.id}/', {'action': 'reject'}),
+			('/api/leave/action/bulk/', {'action': 'approve', 'leave_ids': [leave.id]}),
+			('/api/employee/create/', {
+				'name': 'New', 'email': 'new@example.com', 'password': 'pw-123456', 'department': 'Ops',
+				'designation': 'Analyst', 'salary': '100.00', 'hr': hr.id,
+			}),
+		]
+		with mock.patch('api.write_queue.writer', queue), mock.patch.object(passwords, 'pool', PasswordPool(workers=0)):
+			for url, body in requests:
+				with self.subTest(url=url):
+					self.assertLess(client.post(url, body, format='json').status_code, 300)
+			report = import_employees_csv(io.StringIO(
+				'name,email,password,department,designation,salary\nAnn,ann@example.com,pw1,Ops,Dev,100\n'
+			), default_hr_id=hr.id)
+		self.assertEqual(report['created'], 1)
+		stats = queue.stats()
+		self.assertEqual((stats['committed'], stats['failed']), (len(requests) + 1, 0))
+		self.assertTrue(Employee.objects.get(email='new@example.com').password.startswith('md5$'))
+		self.assertEqual(OutboxMessage.objects.get(payload__email='new@example.com').payload['password'], 'pw-123456')
+
+
+@override_settings(READ_REPLICAS=['replica1'], REPLICA_STICKY_SECONDS=30)
+class ReadReplicaRoutingTests(TestCase):
+
+	def setUp(self):
+		cache.clear()
+		self.router = ReadReplicaRouter()
+
+	def _route_through_middleware(self, method, cookies=None):
+		seen = []
+
+		@read_replica
+		def view(request):
+			seen.append(self.router.db_for_read(Employee))
+			return HttpResponse(status=200)
+
+		request = getattr(RequestFactory(), method)('/api/employees/', REMOTE_ADDR='10.0.0.1')
+		request.COOKIES.update(cookies or {})
+		response = ReadYourWritesMiddleware(view)(request)
+		return seen[0], {name: morsel.value for name, morsel in response.cookies.items()}
+
+	def test_only_marked_views_read_replicas(self):
+		self.assertEqual(self.router.db_for_read(Employee), 'default')
+		self.assertEqual(read_replica(lambda: self.router.db_for_read(Employee))(), 'replica1')
+		self.assertEqual(read_replica(lambda: self.router.db_for_write(Employee))(), 'default')
+
+	def test_client_reads_primary_after_its_write(self):
+		db, cookies = self._route_through_middleware('get')
+		self.assertEqual((db, cookies), ('replica1', {}))
+		_, cookies = self._route_through_middleware('post')
+		self.assertIn(STICKY_COOKIE, cookies)
+		self.assertEqual(self._route_through_middleware('get', cookies)[0], 'default')
+		# another client behind the same address is not pinned
+		self.assertEqual(self._route_through_middleware('get')[0], 'replica1')
+
+	def test_pin_expires_and_must_be_signed(self):
+		_, cookies = self._route_through_middleware('post')
+		self.assertEqual(self._route_through_middleware('get', {STICKY_COOKIE: '1700000000000'})[0], 'replica1')
+		with mock.patch('django.core.signing.time.time', return_value=timezone.now().timestamp() + 31):
+			self.assertEqual(self._route_through_middleware('get', cookies)[0], 'replica1')
+
+	def test_credentials_are_only_shared_with_the_frontend(self):
+		client = APIClient()
+		allowed = client.get('/api/leaves/status-summary/', HTTP_ORIGIN='http://localhost:5173')
+		self.assertEqual(allowed['Access-Control-Allow-Origin'], 'http://localhost:5173')
+		self.assertEqual(allowed['Access-Control-Allow-Credentials'], 'true')
+		other = client.get('/api/leaves/status-summary/', HTTP_ORIGIN='https://evil.example')
+		self.assertNotIn('Access-Control-Allow-Origin', other)
+
+
+class ReplicationStandInTests(TestCase):
+
+	def test_sync_copies_primary_into_replica(self):
+		with tempfile.TemporaryDirectory() as tmp:
+			primary, replica = os.path.join(tmp, 'primary.sqlite3'), os.path.join(tmp, 'replica.sqlite3')
+			db = sqlite3.connect(primary)
+			db.execute('CREATE TABLE t (x INTEGER)')
+			db.execute('INSERT INTO t VALUES (1)')
+			db.commit()
+			reader = sqlite3.connect(replica)
+			sync_replicas(primary, [replica])
+			self.assertEqual(reader.execute('SELECT x FROM t').fetchall(), [(1,)])
+			db.execute('INSERT INTO t VALUES (2)')
+			db.commit()
+			sync_replicas(primary, [replica])
+			# an already-open replica connection sees the refreshed snapshot
+			self.assertEqual(reader.execute('SELECT COUNT(*) FROM t').fetchone(), (2,))
+			reader.close()
+			db.close()
+
+
+class EmployeeSearchTests(TestCase):
+
+	def setUp(self):
+		self.hr = HR.objects.create(name='Hr', email='hr@example.com', password='secret', department='People')
+		for name, department in [('Natalia Ruiz', 'Sales'), ('Alice Wong', 'Engineering'), ('Bob Stone', 'Engineering')]:
+			Employee.objects.create(
+				name=name, email=name.split()[0].lower() + '@example.com', password='x',
+				department=department, designation='Staff', salary=1, hr=self.hr,
+			)
+		self.client = APIClient()
+
+	def _names(self, params):
+		return [e['name'] for e in self.client.get('/api/employees/', params).data]
+
+	def test_substring_search_ranks_prefix_first(self):
+		self.assertEqual(self._names({'search': 'ali'}), ['Alice Wong', 'Natalia Ruiz'])
+		self.assertEqual(self._names({'search': 'ali', 'limit': 1}), ['Alice Wong'])
+		self.assertEqual(self._names({'search': 'ali', 'department': 'sales'}), ['Natalia Ruiz'])
+		self.assertCountEqual(self._names({'search': 'engineer'}), ['Alice Wong', 'Bob Stone'])
+
+	def test_index_follows_updates_and_short_terms_fall_back(self):
+		bob = Employee.objects.get(name='Bob Stone')
+		bob.name = 'Robert Stone'
+		bob.save()
+		self.assertEqual(self._names({'search': 'robert'}), ['Robert Stone'])
+		self.assertEqual(self._names({'search': 'bob s'}), [])
+		bob.delete()
+		self.assertEqual(self._names({'search': 'stone'}), [])
+		self.assertEqual(self._names({'search': 'wo'}), ['Alice Wong'])
+
+	def test_attendance_name_filter_uses_index(self):
+		alice = Employee.objects.get(name='Alice Wong')
+		Attendance.objects.create(employee=alice, date=date.today(), status='Present')
+		data = self.client.get('/api/attendance/', {'q': 'wong'}).data['results']
+		self.assertEqual([r['employee'] for r in data], [alice.id])
+
+
+class ExportTests(TestCase):
+
+	def setUp(self):
+		self.hr, self.emp = _make_fixture()
+		self.client = APIClient()
+
+	def _body(self, response):
+		self.assertEqual(response.status_code, 200)
+		self.assertTrue(response.streaming)
+		return b''.join(response.streaming_content)
+
+	def test_attendance_csv_uses_list_filters(self):
+		yesterday = timezone.localdate() - timedelta(days=1)
+		Attendance.objects.create(employee=self.emp, date=yesterday - timedelta(days=1), status='Absent')
+		response = self.client.get('/api/attendance/export/', {'q': 'emp', 'date': yesterday.isoformat()})
+		self.assertEqual(response['Content-Disposition'], 'attachment; filename="attendance.csv"')
+		rows = list(csv.DictReader(io.StringIO(self._body(response).decode())))
+		self.assertEqual([(r['employee_name'], r['date'], r['status']) for r in rows], [('Emp', yesterday.isoformat(), 'Present')])
+
+	def test_leave_ndjson_and_gzip_tasks(self):
+		leaves = self._body(self.client.get('/api/leave/export/', {'as': 'ndjson', 'status': 'Pending'}))
+		self.assertEqual([json.loads(line)['reason'] for line in leaves.decode().splitlines()], ['trip'])
+		response = self.client.get('/api/tasks/export/', {'hr_id': self.hr.id, 'compress': 'gzip'})
+		self.assertEqual(response['Content-Type'], 'application/gzip')
+		rows = list(csv.DictReader(io.StringIO(gzip.decompress(self._body(response)).decode())))
+		self.assertEqual([r['title'] for r in rows], ['t'])
+		self.assertEqual(self.client.get('/api/tasks/export/', {'as': 'xml'}).status_code, 400)
+
+
+class ConditionalGetTests(TestCase):
+
+	def setUp(self):
+		self.hr, self.emp = _make_fixture()
+		self.client = APIClient()
+
+	def test_unchanged_list_is_304_after_one_lookup(self):
+		url = f'/api/tasks/?hr_id={self.hr.id}'
+		first = self.client.get(url)
+		self.assertEqual(first.status_code, 200)
+		etag = first['ETag']
+		with CaptureQueriesContext(connection) as ctx:
+			again = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+		self.assertEqual(again.status_code, 304)
+		self.assertEqual(again['Cache-Control'], 'no-cache')
+		self.assertIn('Authorization', again['Vary'])
+		# the HR is looked up (authorized) before the version is compared
+		self.assertEqual(len(ctx.captured_queries), 2)
+		self.assertIn('api_hr', ctx.captured_queries[0]['sql'])
+		self.assertIn('api_collectionversion', ctx.captured_queries[1]['sql'])
+		# whole-second dates cannot tell two writes in one second apart, so only the ETag validates
+		self.assertNotIn('Last-Modified', first)
+		self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE='Wed, 01 Jan 2100 00:00:00 GMT').status_code, 200)
+
+		Task.objects.create(hr=self.hr, employee=self.emp, title='t2', description='d', due_date=date.today())
+		changed = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+		self.assertEqual(changed.status_code, 200)
+		self.assertNotEqual(changed['ETag'], etag)
+		self.assertEqual(len(changed.data), 2)
+
+	def test_token_requests_need_only_the_version_lookup(self):
+		with mock.patch.object(tokens, 'revocations', RevocationFilter()):
+			client = APIClient(HTTP_AUTHORIZATION='Bearer ' + issue_token('hr', self.hr.id, self.hr.id))
+			first = client.get('/api/tasks/')
+			with CaptureQueriesContext(connection) as ctx:
+				again = client.get('/api/tasks/', HTTP_IF_NONE_MATCH=first['ETag'])
+			self.assertEqual(again.status_code, 304)
+			self.assertEqual(len(ctx.captured_queries), 1)
+			# the same list without the token is another representation
+			self.assertEqual(self.client.get('/api/tasks/', {'hr_id': self.hr.id}, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 200)
+
+	def test_validators_never_bypass_authorization(self):
+		etag = self.client.get('/api/tasks/', {'hr_id': self.hr.id})['ETag']
+		other_hr = HR.objects.create(name='Other', email='other@example.com', password='secret', department='People')
+		self.assertEqual(self.client.get('/api/tasks/', {'hr_id': 999999}, HTTP_IF_NONE_MATCH=etag).status_code, 404)
+		self.assertEqual(self.client.get('/api/tasks/', HTTP_IF_NONE_MATCH=etag).status_code, 400)
+		self.assertEqual(self.client.get('/api/tasks/', {'hr_id': other_hr.id}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+		with mock.patch.object(tokens, 'revocations', RevocationFilter()):
+			token = issue_token('hr', other_hr.id, other_hr.id)
+			forbidden = self.client.get('/api/tasks/', {'hr_id': self.hr.id}, HTTP_IF_NONE_MATCH=etag, HTTP_AUTHORIZATION=f'Bearer {token}')
+		self.assertEqual(forbidden.status_code, 403)
+
+		# one employee's task list does not revalidate another's
+		other = Employee.objects.create(
+			name='Other', email='other-emp@example.com', password='secret', department='Ops', designation='Dev', salary=1, hr=self.hr,
+		)
+		mine = self.client.get('/api/tasks/my-tasks/', {'employee_id': self.emp.id})['ETag']
+		for url in ('/api/tasks/my-tasks/', '/api/async/tasks/my-tasks/'):
+			with self.subTest(url=url):
+				self.assertEqual(self.client.get(url, {'employee_id': other.id}, HTTP_IF_NONE_MATCH=mine).status_code, 200)
+				self.assertEqual(self.client.get(url, {'employee_id': 999999}, HTTP_IF_NONE_MATCH=mine).status_code, 404)
+		self.assertEqual(self.client.get('/api/tasks/my-tasks/', {'employee_id': self.emp.id}, HTTP_IF_NONE_MATCH=mine).status_code, 304)
+
+	def test_dependent_collections_are_bumped(self):
+		leaves = self.client.get('/api/leave/pending/')
+		employees = self.client.get('/api/employee/list/', {'hr_id': self.hr.id})
+		self.client.post('/api/leave/action/bulk/', {'action': 'reject', 'leave_ids': [Leave.objects.get().id]}, format='json')
+		self.assertEqual(self.client.get('/api/leave/pending/', HTTP_IF_NONE_MATCH=leaves['ETag']).status_code, 200)
+		self.assertEqual(self.client.get('/api/employee/list/', {'hr_id': self.hr.id}, HTTP_IF_NONE_MATCH=employees['ETag']).status_code, 304)
+		# renaming an employee changes the names embedded in task lists
+		tasks = self.client.get('/api/tasks/my-tasks/', {'employee': self.emp.id})
+		self.emp.name = 'Renamed'
+		self.emp.save()
+		self.assertEqual(self.client.get('/api/tasks/my-tasks/', {'employee': self.emp.id}, HTTP_IF_NONE_MATCH=tasks['ETag']).status_code, 200)
+
+
+class SparseFieldsetTests(TestCase):
+
+	def setUp(self):
+		self.hr, self.emp = _make_fixture()
+		Attendance.objects.create(
+			employee=self.emp, date=timezone.localdate(), status='Present', check_in=time(9, 5), check_out=time(17, 30),
+		)
+		self.client = APIClient()
+
+	def test_values_rendering_matches_serializers(self):
+		for schema, serializer_class, qs in (
+			(EMPLOYEE_LIST, EmployeeSerializer, Employee.objects.all()),
+			(LEAVE_LIST, LeaveSerializer, Leave.objects.all()),
+			(ATTENDANCE_LIST, AttendanceSerializer, Attendance.objects.order_by('id')),
+			(TASK_LIST, TaskSerializer, Task.objects.all()),
+		):
+			names = schema.parse(None)
+			expected = json.loads(ORJSONRenderer().render(serializer_class(qs, many=True).data))
+			rendered = json.loads(ORJSONRenderer().render(schema.render(schema.queryset(qs, names), names)))
+			self.assertEqual(rendered, expected)
+
+	def test_fields_narrow_output_and_select(self):
+		with CaptureQueriesContext(connection) as ctx:
+			response = self.client.get('/api/tasks/', {'hr_id': self.hr.id, 'fields': 'id,title,employee_name'})
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(json.loads(response.content), [{'id': Task.objects.get().id, 'title': 't', 'employee_name': 'Emp'}])
+		select = ctx.captured_queries[-1]['sql']
+		self.assertIn('"api_task"."title"', select)
+		self.assertNotIn('"description"', select)
+		self.assertNotIn('"api_hr"', select)
+
+	def test_keyset_pages_with_fields(self):
+		first = self.client.get('/api/attendance/', {'fields': 'status', 'page_size': 1})
+		self.assertEqual(first.data['results'], [{'status': 'Present'}])
+		second = self.client.get('/api/attendance/', {'fields': 'status', 'page_size': 1, 'cursor': first.data['next']})
+		self.assertEqual(second.data['results'], [{'status': 'Present'}])
+		self.assertIsNone(second.data['next'])
+
+	def test_unknown_field_is_rejected(self):
+		response = self.client.get('/api/leave/pending/', {'fields': 'id,password'})
+		self.assertEqual(response.status_code, 400)
+		self.assertIn('password', response.data['error'])
+
+
+class KeysetPaginationTests(TestCase):
+	"""attendance_list pages by (date, id); rows sharing a date must not be skipped or repeated."""
+
+	def setUp(self):
+		self.hr, self.emp = _make_fixture()
+		self.client = APIClient()
+		today = timezone.localdate()
+		for i in range(3):
+			emp = Employee.objects.create(
+				name=f'Emp {i}', email=f'emp{i}@example.com', password='secret', department='Engineering',
+				designation='Dev', salary=1000, hr=self.hr,
+			)
+			for days in (1, 2, 3):
+				Attendance.objects.create(employee=emp, date=today - timedelta(days=days), status='Present')
+
+	def _walk(self, **params):
+		ids, cursor, pages = [], None, 0
+		while True:
+			response = self.client.get('/api/attendance/', dict(params, page_size=2, **({'cursor': cursor} if cursor else {})))
+			self.assertEqual(response.status_code, 200)
+			ids.extend(row['id'] for row in response.data['results'])
+			pages += 1
+			cursor = response.data['next']
+			if cursor is None:
+				return ids, pages
+
+	def test_cursor_round_trip_across_ties(self):
+		for ordering, keys in (('date', ('date', 'id')), ('-date', ('-date', '-id'))):
+			with self.subTest(ordering=ordering):
+				ids, pages = self._walk(ordering=ordering)
+				self.assertEqual(ids, list(Attendance.objects.order_by(*keys).values_list('id', flat=True)))
+				self.assertEqual(pages, 5)  # 10 rows, 2 per page
+
+	def test_last_page_has_null_cursor(self):
+		response = self.client.get('/api/attendance/', {'page_size': 100})
+		self.assertEqual(len(response.data['results']), 10)
+		self.assertIsNone(response.data['next'])
+
+	def test_invalid_cursor_is_rejected(self):
+		cursor = self.client.get('/api/attendance/', {'page_size': 2}).data['next']
+		descending = self.client.get('/api/attendance/', {'page_size': 2, 'ordering': '-date'}).data['next']
+		for params in (
+			{'cursor': 'not-a-cursor'},
+			{'cursor': cursor[:-3]},  # truncated
+			{'cursor': cursor[::-1]},
+			{'cursor': descending},  # issued for the other ordering
+			{'page_size': 'ten'},
+			{'ordering': 'status'},
+		):
+			with self.subTest(params=params):
+				response = self.client.get('/api/attendance/', params)
+				self.assertEqual(response.status_code, 400)
+				self.assertIn('error', response.data)
+
+	def test_stream_returns_every_row(self):
+		response = self.client.get('/api/attendance/', {'stream': '1', 'ordering': '-date'})
+		self.assertEqual(response.status_code, 200)
+		self.assertTrue(response.streaming)
+		rows = json.loads(b''.join(response.streaming_content))
+		self.assertEqual([row['id'] for row in rows], list(Attendance.objects.order_by('-date', '-id').values_list('id', flat=True)))
+		self.assertEqual(rows[0], json.loads(json.dumps(AttendanceSerializer(Attendance.objects.get(id=rows[0]['id'])).data, cls=DjangoJSONEncoder)))
+
+
+class DeltaSyncTests(TestCase):
+
+	def setUp(self):
+		self.hr, self.emp = _make_fixture()
+		self.client = APIClient()
+
+	def _sync(self, **params):
+		response = self.client.get('/api/sync/', params)
+		self.assertEqual(response.status_code, 200)
+		return response.data
+
+	def test_changes_and_tombstones_since_cursor(self):
+		cursor = self._sync(hr_id=self.hr.id)['next']
+		self.assertEqual(self._sync(hr_id=self.hr.id, since=cursor)['changes'], {'tasks': [], 'leaves': [], 'attendance': []})
+
+		task = Task.objects.get()
+		task.status = Task.STATUS_COMPLETED
+		task.save()
+		leave = Leave.objects.get()
+		self.client.post('/api/leave/action/bulk/', {'action': 'approve', 'leave_ids': [leave.id]}, format='json')
+		doomed = Attendance.objects.get(status='Present')
+		doomed_id = doomed.id
+		doomed.delete()
+
+		data = self._sync(hr_id=self.hr.id, since=cursor)
+		self.assertEqual([t['status'] for t in data['changes']['tasks']], ['Completed'])
+		self.assertEqual([l['status'] for l in data['changes']['leaves']], ['Approved'])
+		self.assertEqual(len(data['changes']['attendance']), 2)  # the two backfilled leave days
+		self.assertEqual(data['deleted']['attendance'], [doomed_id])
+		# the employee scope sees the same changes; nothing is repeated after next
+		self.assertEqual(self._sync(employee=self.emp.id, since=cursor)['deleted'], data['deleted'])
+		self.assertEqual(self._sync(hr_id=self.hr.id, since=data['next'])['deleted'], {'tasks': [], 'leaves': [], 'attendance': []})
+
+	def test_batches_follow_has_more_and_cascade_tombstones(self):
+		cursor = self._sync(employee=self.emp.id)['next']
+		for i in range(3):
+			Task.objects.create(hr=self.hr, employee=self.emp, title=f'n{i}', description='d', due_date=date.today())
+		first = self._sync(employee=self.emp.id, since=cursor, limit=2)
+		self.assertTrue(first['has_more'])
+		second = self._sync(employee=self.emp.id, since=first['next'], limit=2)
+		self.assertFalse(second['has_more'])
+		self.assertEqual(len(first['changes']['tasks']) + len(second['changes']['tasks']), 3)
+
+		with CaptureQueriesContext(connection) as ctx:
+			self._sync(employee=self.emp.id, since=second['next'])
+		# the retention check (oldest entry) and the scope's entries
+		self.assertEqual(len(ctx.captured_queries), 2)
+
+		self.emp.delete()
+		data = self._sync(hr_id=self.hr.id, since=second['next'])
+		self.assertEqual(len(data['deleted']['tasks']), 4)
+		self.assertEqual(len(data['deleted']['leaves']), 1)
+		self.assertEqual(ChangeLogEntry.objects.filter(action=ChangeLogEntry.ACTION_DELETE, hr_id=self.hr.id).count(), 6)
+		self.assertEqual(self.client.get('/api/sync/', {'since': 0}).status_code, 400)
+
+	def test_pruned_cursor_must_resync(self):
+		cursor = self._sync(hr_id=self.hr.id, since=0)['next']
+		self.assertGreater(int(cursor), 0)
+		for i in range(2):
+			Task.objects.create(hr=self.hr, employee=self.emp, title=f'n{i}', description='d', due_date=date.today())
+		ChangeLogEntry.objects.update(created_at=timezone.now() - timedelta(days=60))
+		with override_settings(CHANGELOG_RETENTION_DAYS=30):
+			call_command('prune_changelog', stdout=io.StringIO())
+		# the newest entry is kept so cursors stay comparable
+		self.assertEqual(ChangeLogEntry.objects.count(), 1)
+		response = self.client.get('/api/sync/', {'hr_id': self.hr.id, 'since': cursor})
+		self.assertEqual(response.status_code, 410)
+		self.assertTrue(response.data['resync'])
+		self.assertEqual(self._sync(hr_id=self.hr.id, since=response.data['next'])['next'], response.data['next'])
+		# a cursor just before the oldest kept entry has missed nothing
+		oldest = ChangeLogEntry.objects.get().id
+		self.assertEqual(len(self._sync(hr_id=self.hr.id, since=oldest - 1)['changes']['tasks']), 1)
+
+	def test_moving_an_employee_to_another_hr_moves_their_rows(self):
+		new_hr = HR.objects.create(name='New', email='new-hr@example.com', password='secret', department='People')
+		Attendance.objects.create(employee=self.emp, date=timezone.localdate(), status='Present')
+		old_cursor = self._sync(hr_id=self.hr.id)['next']
+		response = self.client.put(f'/api/employee/update/{self.emp.id}/', {'hr': new_hr.id}, format='json')
+		self.assertEqual(response.status_code, 200)
+		leave_id = Leave.objects.get().id
+		attendance_ids = sorted(Attendance.objects.filter(employee=self.emp).values_list('id', flat=True))
+
+		old = self._sync(hr_id=self.hr.id, since=old_cursor)
+		self.assertEqual((old['deleted']['leaves'], old['deleted']['attendance']), ([leave_id], attendance_ids))
+		new = self._sync(hr_id=new_hr.id, since=old_cursor)
+		self.assertEqual([row['id'] for row in new['changes']['leaves']], [leave_id])
+		self.assertEqual([row['id'] for row in new['changes']['attendance']], attendance_ids)
+		# the employee's own scope ends with the rows present
+		mine = self._sync(employee=self.emp.id, since=old_cursor)
+		self.assertEqual(mine['deleted']['leaves'], [])
+		self.assertEqual(len(mine['changes']['leaves']), 1)
+
+	def test_moving_an_attendance_row_to_another_employee(self):
+		other_hr = HR.objects.create(name='Other', email='other-hr@example.com', password='secret', department='People')
+		other = Employee.objects.create(
+			name='Other', email='other@example.com', password='x', department='Sales', designation='Rep', salary=1,
+			hr=other_hr,
+		)
+		row = Attendance.objects.get(employee=self.emp)
+		cursor = self._sync(employee=self.emp.id)['next']
+		response = self.client.put(f'/api/attendance/{row.id}/update/', {'employee': other.id}, format='json')
+		self.assertEqual(response.status_code, 200)
+
+		old = self._sync(employee=self.emp.id, since=cursor)
+		self.assertEqual((old['changes']['attendance'], old['deleted']['attendance']), ([], [row.id]))
+		self.assertEqual(self._sync(hr_id=self.hr.id, since=cursor)['deleted']['attendance'], [row.id])
+		for scope in ({'employee': other.id}, {'hr_id': other_hr.id}):
+			new = self._sync(since=cursor, **scope)
+			self.assertEqual(([r['id'] for r in new['changes']['attendance']], new['deleted']['attendance']), ([row.id], []))
+		# between two employees of one HR the HR scope keeps the row
+		third = Employee.objects.create(
+			name='Third', email='third@example.com', password='x', department='Sales', designation='Rep', salary=1,
+			hr=other_hr,
+		)
+		cursor = self._sync(hr_id=other_hr.id)['next']
+		self.client.put(f'/api/attendance/{row.id}/update/', {'employee': third.id}, format='json')
+		shared = self._sync(hr_id=other_hr.id, since=cursor)
+		self.assertEqual(([r['id'] for r in shared['changes']['attendance']], shared['deleted']['attendance']), ([row.id], []))
+
+
+class EventStreamTests(TestCase):
+
+	def test_broker_scopes_replays_and_resets(self):
+		events = EventBroker(replay_size=3)
+
+		async def scenario():
+			sub, replay = events.subscribe([hr_channel(1)])
+			self.assertEqual(replay, [])
+			first = events.publish('leave.created', {'id': 1}, [hr_channel(1), employee_channel(7)])
+			events.publish('task.created', {'id': 2}, [hr_channel(2)])
+			received = await asyncio.wait_for(sub.queue.get(), 1)
+			self.assertEqual(received.id, first.id)
+			self.assertTrue(sub.queue.empty())  # hr:2 is not ours
+			events.unsubscribe(sub)
+
+			_, replay = events.subscribe([employee_channel(7)], last_event_id=f'{events.epoch}-0')
+			self.assertEqual([e.id for e in replay], [first.id])
+			for i in range(3):
+				events.publish('task.updated', {'id': i}, [employee_channel(7)])
+			# seqs 1-2 fell out of the 3-event buffer; other epochs never resume
+			self.assertIsNone(events.subscribe([employee_channel(7)], last_event_id=f'{events.epoch}-1')[1])
+			self.assertEqual(len(events.subscribe([employee_channel(7)], last_event_id=f'{events.epoch}-2')[1]), 3)
+			self.assertIsNone(events.subscribe([employee_channel(7)], last_event_id='other-1')[1])
+
+		asyncio.run(scenario())
+
+	def test_writes_publish_after_commit(self):
+		hr, emp = _make_fixture()
+		client = APIClient()
+		start = broker.stats()['last_event_seq']
+		with self.captureOnCommitCallbacks(execute=True) as callbacks:
+			response = client.patch(f'/api/tasks/{Task.objects.get().id}/', {'employee': emp.id, 'status': 'Completed'}, format='json')
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(len(callbacks), 1)
+		self.assertEqual(broker.stats()['last_event_seq'], start + 1)
+		event = broker._buffer[-1]
+		self.assertEqual(event.channels, {hr_channel(hr.id), employee_channel(emp.id)})
+		self.assertIn('event: task.updated', event.text)
+		# WSGI cannot hold the stream open
+		self.assertEqual(client.get('/api/events/', {'hr_id': hr.id}).status_code, 501)
+
+	async def test_stream_resumes_from_last_event_id(self):
+		mark = broker.publish('leave.created', {'id': 0}, [hr_channel(99)])
+		wanted = broker.publish('leave.updated', {'id': 5}, [hr_channel(99)])
+		response = await AsyncClient().get('/api/events/', {'hr_id': 99}, headers={'Last-Event-ID': mark.id})
+		self.assertEqual(response['Content-Type'], 'text/event-stream')
+		stream = response.streaming_content
+		self.assertTrue((await anext(stream)).startswith(b'retry:'))
+		self.assertEqual((await anext(stream)).decode(), wanted.text)
+		live = broker.publish('task.created', {'id': 6}, [hr_channel(99)])
+		self.assertEqual((await asyncio.wait_for(anext(stream), 1)).decode(), live.text)
+		await stream.aclose()
+
+		# closing the stream (client disconnect) drops the subscription
+		subscribers = broker.stats()['subscribers']
+		body = event_stream([hr_channel(98)])
+		await anext(body)
+		self.assertEqual(broker.stats()['subscribers'], subscribers + 1)
+		await body.aclose()
+		self.assertEqual(broker.stats()['subscribers'], subscribers)
+
+
+class AsyncEndpointTests(TestCase):
+	"""The /api/async/ twins answer exactly like the sync endpoints."""
+
+	def setUp(self):
+		self.hr, self.emp = _make_fixture()
+		Leave.objects.create(employee=self.emp, start_date=date.today(), end_date=date.today(), reason='r', status='Approved')
+		rebuild_rollups()
+		cache.clear()
+
+	def test_bodies_match_sync_endpoints(self):
+		client = APIClient()
+		paths = [
+			('counts/', {}),
+			('employees/', {'search': 'emp'}),
+			('employees/department-count/', {}),
+			('leave/pending/', {}),
+			('leave/mine/', {'employee': self.emp.id}),
+			('leaves/status-summary/', {}),
+			('attendance/stats/employee/', {'employee': self.emp.id}),
+			(f'attendance-percentage/{self.emp.id}/', {}),
+			('tasks/my-tasks/', {'employee': self.emp.id}),
+			('tasks/my-tasks/', {'employee': 999}),
+			# the error answers come from the same helpers too
+			('employees/', {'search': 'emp', 'limit': 'many'}),
+			('tasks/my-tasks/', {}),
+			('tasks/my-tasks/', {'employee': 'abc'}),
+		]
+		for path, params in paths:
+			with self.subTest(path=path, params=params):
+				expected = client.get('/api/' + path, params)
+				actual = async_to_sync(AsyncClient().get)('/api/async/' + path, params)
+				self.assertEqual(actual.status_code, expected.status_code)
+				self.assertEqual(json.loads(actual.content), json.loads(expected.content))
+
+	def test_conditional_get_and_method_guard(self):
+		client = AsyncClient()
+		first = async_to_sync(client.get)('/api/async/leave/pending/')
+		again = async_to_sync(client.get)('/api/async/leave/pending/', headers={'If-None-Match': first['ETag']})
+		self.assertEqual(again.status_code, 304)
+		self.assertEqual(async_to_sync(client.post)('/api/async/counts/').status_code, 405)
+
+
+def _scrape(client):
+	response = client.get('/metrics')
+	samples = {}
+	for line in response.content.decode().splitlines():
+		if line and not line.startswith('#'):
+			key, _, value = line.rpartition(' ')
+			samples[key] = float(value)
+	return response, samples
+
+
+class RequestMetricsTests(TestCase):
+
+	def setUp(self):
+		_make_fixture()
+		self.tmp = tempfile.TemporaryDirectory()
+		self.addCleanup(self.tmp.cleanup)
+		overridden = override_settings(METRICS_DIR=self.tmp.name)
+		overridden.enable()
+		self.addCleanup(overridden.disable)
+
+	def test_records_per_route(self):
+		client = APIClient()
+		client.get('/api/leave/pending/')
+		client.get('/api/leave/pending/', {'fields': 'nope'})
+		response, samples = _scrape(client)
+		self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+		self.assertEqual(samples['api_requests_total{route="leave-pending",method="GET",status="200"}'], 1)
+		self.assertEqual(samples['api_requests_total{route="leave-pending",method="GET",status="400"}'], 1)
+		self.assertEqual(samples['api_request_duration_seconds_count{route="leave-pending"}'], 2)
+		self.assertEqual(samples['api_request_duration_seconds_bucket{route="leave-pending",le="+Inf"}'], 2)
+		self.assertGreaterEqual(samples['api_db_queries_total{route="leave-pending"}'], 2)
+		self.assertGreater(samples['api_render_seconds_total{route="leave-pending"}'], 0)
+
+	def test_async_view_queries_are_counted(self):
+		async_to_sync(AsyncClient().get)('/api/async/leave/pending/')
+		_, samples = _scrape(APIClient())
+		self.assertEqual(samples['api_requests_total{route="async-leave-pending",method="GET",status="200"}'], 1)
+		self.assertGreaterEqual(samples['api_db_queries_total{route="async-leave-pending"}'], 1)
+
+	def test_counter_files_are_summed(self):
+		key = 'api_requests_total{route="x",method="GET",status="200"}'
+		for name, amount in (('101-1.db', 2), ('202-1.db', 3)):
+			counters = CounterFile(os.path.join(self.tmp.name, name))
+			counters.inc(key, amount)
+		# enough keys to grow the file past its first mapping
+		for i in range(3000):
+			counters.inc(f'api_db_queries_total{{route="r{i}"}}')
+		reopened = CounterFile(counters.path)
+		reopened.inc(key)
+		totals = collect()
+		self.assertEqual(totals[key], 6)
+		self.assertEqual(totals['api_db_queries_total{route="r2999"}'], 1)
+
+	def test_exited_threads_hand_their_file_on(self):
+		key = 'api_requests_total{route="x",method="GET",status="200"}'
+		for _ in range(20):
+			thread = threading.Thread(target=lambda: metrics._counters().inc(key))
+			thread.start()
+			thread.join()
+		# two at once need two files
+		started, finish = threading.Barrier(3), threading.Event()
+
+		def hold():
+			metrics._counters().inc(key)
+			started.wait()
+			finish.wait()
+
+		threads = [threading.Thread(target=hold) for _ in range(2)]
+		for thread in threads:
+			thread.start()
+		started.wait()
+		finish.set()
+		for thread in threads:
+			thread.join()
+		self.assertEqual(sorted(os.listdir(self.tmp.name)), [f'{os.getpid()}-0.db', f'{os.getpid()}-1.db'])
+		self.assertEqual(collect()[key], 22)
+
+
+def _busy(seconds):
+	end = perf_counter() + seconds
+	while perf_counter() < end:
+		pass
+
+
+class RequestProfilerTests(TestCase):
+
+	def setUp(self):
+		_make_fixture()
+		self.tmp = tempfile.TemporaryDirectory()
+		self.addCleanup(self.tmp.cleanup)
+		overridden = override_settings(PROFILE_SPOOL_DIR=self.tmp.name, PROFILE_SAMPLE_RATE=0, PROFILE_SPOOL_KEEP=2)
+		overridden.enable()
+		self.addCleanup(overridden.disable)
+		self.client = APIClient()
+
+	def test_only_signed_requests_are_profiled(self):
+		self.assertNotIn('X-Profile-Id', self.client.get('/api/leave/pending/'))
+		self.assertNotIn('X-Profile-Id', self.client.get('/api/leave/pending/', headers={PROFILE_HEADER: 'profile:forged'}))
+		self.assertEqual(list_profiles(), [])
+
+		response = self.client.get('/api/leave/pending/', headers={PROFILE_HEADER: make_token()})
+		document = load_profile(response['X-Profile-Id'])
+		self.assertEqual(document['request']['route'], 'leave-pending')
+		self.assertEqual(document['request']['status'], 200)
+		leave_query = [q for q in document['request']['queries'] if '"api_leave"' in q['sql']]
+		self.assertEqual(leave_query[0]['rows'], 1)
+		self.assertEqual(document['profiles'][1]['type'], 'evented')
+
+	def test_spool_keeps_newest(self):
+		ids = [self.client.get('/api/leave/pending/', headers={PROFILE_HEADER: make_token()})['X-Profile-Id'] for _ in range(3)]
+		self.assertCountEqual(list_profiles(), ids[1:])
+		out = io.StringIO()
+		call_command('profiles', stdout=out)
+		self.assertIn(ids[2], out.getvalue())
+		self.assertNotIn(ids[0], out.getvalue())
+
+	def test_sampler_collects_stacks(self):
+		profile = Profile(threading.get_ident(), 0.001)
+		profile.start()
+		_busy(0.05)
+		profile.stop()
+		self.assertTrue(profile.samples)
+		names = {profile.frames[i][0] for _, stack in profile.samples for i in stack}
+		self.assertIn('_busy', names)
+		document = profile.speedscope(RequestFactory().get('/x'), HttpResponse())
+		self.assertTrue(any(line.split(' ')[0].endswith(';_busy') for line in collapsed_stacks(document)))
+
+
+# the suite logs in and creates employees; hashing cost is not under test
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class PasswordPoolTests(TestCase):
+
+	def setUp(self):
+		self.tmp = tempfile.TemporaryDirectory()
+		self.addCleanup(self.tmp.cleanup)
+		overridden = override_settings(METRICS_DIR=self.tmp.name)
+		overridden.enable()
+		self.addCleanup(overridden.disable)
+
+	def test_worker_processes_use_the_callers_hashers(self):
+		pool = PasswordPool(workers=1, max_pending=4)
+		self.addCleanup(pool.shutdown)
+		encoded = pool.run('make_password', 'hunter2')
+		self.assertTrue(encoded.startswith('md5$'))
+		self.assertTrue(pool.run('check_password', 'hunter2', encoded))
+		self.assertFalse(async_to_sync(pool.arun)('check_password', 'wrong', encoded))
+		stats = pool.stats()
+		self.assertEqual((stats['completed'], stats['pending'], stats['rejected']), (3, 0, 0))
+		_, samples = _scrape(APIClient())
+		self.assertEqual(samples['api_password_queue_seconds_count{job="check_password"}'], 2)
+
+	def test_saturated_pool_sheds_logins_with_retry_after(self):
+		_, emp = _make_fixture()
+		emp.set_password('hunter2')
+		emp.save()
+		with mock.patch.object(passwords, 'pool', PasswordPool(workers=0, max_pending=0)):
+			sync = APIClient().post('/api/login/', {'email': emp.email, 'password': 'hunter2'}, format='json')
+			asynchronous = async_to_sync(AsyncClient().post)(
+				'/api/async/login/', {'email': emp.email, 'password': 'hunter2'}, content_type='application/json',
+			)
+			with self.assertRaises(PasswordPoolSaturated):
+				passwords.make_password('x')
+		for response in (sync, asynchronous):
+			self.assertEqual(response.status_code, 503)
+			self.assertEqual(response['Retry-After'], '1')
+		self.assertEqual(json.loads(sync.content), json.loads(asynchronous.content))
+		_, samples = _scrape(APIClient())
+		self.assertEqual(samples['api_password_rejected_total{job="check_password"}'], 2)
+
+	def _stub_executor(self, pool, future):
+		executor = mock.Mock()
+		executor.submit.return_value = future
+		pool._executor = executor
+		return executor
+
+	def test_worker_lost_mid_job_is_retryable(self):
+		_, emp = _make_fixture()
+		emp.set_password('hunter2')
+		emp.save()
+		pool = PasswordPool(workers=1)
+		body = {'email': emp.email, 'password': 'hunter2'}
+		with mock.patch.object(passwords, 'pool', pool):
+			for send in (
+				lambda: APIClient().post('/api/login/', body, format='json'),
+				lambda: async_to_sync(AsyncClient().post)('/api/async/login/', body, content_type='application/json'),
+			):
+				broken = Future()
+				broken.set_exception(BrokenProcessPool('a worker died'))
+				executor = self._stub_executor(pool, broken)
+				response = send()
+				self.assertEqual(response.status_code, 503)
+				self.assertEqual(response['Retry-After'], '1')
+				self.assertEqual(json.loads(response.content)['detail'], PasswordWorkerLost.default_detail)
+				# the next call starts a fresh pool
+				self.assertIsNone(pool._executor)
+				executor.shutdown.assert_called_once_with(wait=False)
+		self.assertEqual((pool.stats()['pending'], pool.stats()['failed']), (0, 2))
+
+	def test_cancelled_async_call_holds_its_slot_until_the_job_ends(self):
+		pool = PasswordPool(workers=1, max_pending=1)
+		running = Future()
+		running.set_running_or_notify_cancel()
+		self._stub_executor(pool, running)
+
+		async def cancel_midway():
+			task = asyncio.ensure_future(pool.arun('check_password', 'x', 'md5$y'))
+			await asyncio.sleep(0)
+			task.cancel()
+			with self.assertRaises(asyncio.CancelledError):
+				await task
+
+		async_to_sync(cancel_midway)()
+		# the worker is still hashing, so the slot is still taken
+		self.assertEqual(pool.stats()['pending'], 1)
+		with self.assertRaises(PasswordPoolSaturated):
+			pool.run('check_password', 'x', 'md5$y')
+		running.set_result((False, 0.0, 0.0))
+		self.assertEqual((pool.stats()['pending'], pool.stats()['completed']), (0, 1))
+
+	def test_async_login_matches_sync_login(self):
+		hr, emp = _make_fixture()
+		emp.set_password('hunter2')
+		emp.save()
+		with mock.patch.object(passwords, 'pool', PasswordPool(workers=0)):
+			for body in (
+				{'email': emp.email, 'password': 'hunter2'},
+				{'email': emp.email, 'password': 'wrong'},
+				{'email': hr.email, 'password': 'secret'},
+				{'email': 'nobody@example.com', 'password': 'x'},
+			):
+				with self.subTest(email=body['email'], password=body['password']):
+					expected = APIClient().post('/api/login/', body, format='json')
+					actual = async_to_sync(AsyncClient().post)('/api/async/login/', body, content_type='application/json')
+					self.assertEqual(actual.status_code, expected.status_code)
+					actual_body, expected_body = json.loads(actual.content), json.loads(expected.content)
+					# tokens differ (issue time, token id) but name the same account
+					tokens = [b.pop('token', None) for b in (actual_body, expected_body)]
+					self.assertEqual(actual_body, expected_body)
+					if tokens[0]:
+						self.assertEqual(decode_token(tokens[0]).subject, decode_token(tokens[1]).subject)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class AccessTokenTests(TestCase):
+
+	def setUp(self):
+		# ids are reused after each test's rollback; start from an empty filter
+		patcher = mock.patch.object(tokens, 'revocations', RevocationFilter())
+		patcher.start()
+		self.addCleanup(patcher.stop)
+		self.hr, self.emp = _make_fixture()
+		self.emp.set_password('hunter2')
+		self.emp.save()
+		with mock.patch.object(passwords, 'pool', PasswordPool(workers=0)):
+			response = APIClient().post('/api/login/', {'email': self.emp.email, 'password': 'hunter2'}, format='json')
+		self.token = response.data['token']
+		self.client = APIClient()
+		self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+
+	def _queries(self, client, path, params=None):
+		with CaptureQueriesContext(connection) as ctx:
+			response = client.get(path, params or {})
+		self.assertEqual(response.status_code, 200)
+		return len(ctx.captured_queries)
+
+	def test_token_skips_identity_lookups(self):
+		user = decode_token(self.token)
+		self.assertEqual((user.role, user.id, user.hr_id), ('employee', self.emp.id, self.hr.id))
+		verify_token(self.token)  # first use loads the revocation filter
+		with self.assertNumQueries(0):
+			verify_token(self.token)
+		by_param = self._queries(APIClient(), '/api/tasks/my-tasks/', {'employee_id': self.emp.id})
+		self.assertEqual(self._queries(self.client, '/api/tasks/my-tasks/'), by_param - 1)
+		hr_client = APIClient()
+		hr_client.credentials(HTTP_AUTHORIZATION='Bearer ' + issue_token('hr', self.hr.id, self.hr.id))
+		by_param = self._queries(APIClient(), '/api/tasks/', {'hr_id': self.hr.id})
+		self.assertEqual(self._queries(hr_client, '/api/tasks/'), by_param - 1)
+		response = async_to_sync(AsyncClient().get)('/api/async/tasks/my-tasks/', headers={'Authorization': f'Bearer {self.token}'})
+		self.assertEqual(json.loads(response.content), self.client.get('/api/tasks/my-tasks/').json())
+
+	def test_authorization_is_checked_against_the_token(self):
+		other = Employee.objects.create(
+			name='Other', email='other@example.com', password='x', department='Engineering', designation='Dev',
+			salary=1, hr=self.hr,
+		)
+		task = Task.objects.create(hr=self.hr, employee=other, title='t', description='d', due_date=date.today())
+		self.assertEqual(self.client.get('/api/tasks/my-tasks/', {'employee_id': other.id}).status_code, 403)
+		self.assertEqual(self.client.get('/api/tasks/', {'hr_id': self.hr.id}).status_code, 403)
+		with self.assertNumQueries(1):  # the task only
+			response = self.client.patch(f'/api/tasks/{task.id}/', {'status': 'Completed'}, format='json')
+		self.assertEqual(response.status_code, 403)
+		tampered = self.token.replace(f'e:{self.emp.id}:', f'e:{other.id}:')
+		for token in (tampered, 'k9' + self.token[2:], 'garbage'):
+			with self.subTest(token=token):
+				client = APIClient()
+				client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+				response = client.get('/api/tasks/my-tasks/')
+				self.assertEqual(response.status_code, 401)
+				self.assertEqual(response['WWW-Authenticate'], 'Bearer')
+
+	def test_key_rotation_and_expiry(self):
+		with override_settings(ACCESS_TOKEN_KEYS=[('k1', 'old-secret')]):
+			old = issue_token('employee', self.emp.id, self.hr.id)
+		with override_settings(ACCESS_TOKEN_KEYS=[('k2', 'new-secret'), ('k1', 'old-secret')]):
+			self.assertTrue(issue_token('employee', self.emp.id, self.hr.id).startswith('k2.'))
+			self.assertEqual(verify_token(old).id, self.emp.id)
+		with override_settings(ACCESS_TOKEN_KEYS=[('k2', 'new-secret')]):
+			with self.assertRaisesMessage(InvalidToken, 'Unknown signing key'):
+				verify_token(old)
+		with override_settings(ACCESS_TOKEN_TTL=-1):
+			expired = issue_token('employee', self.emp.id, self.hr.id)
+		with self.assertRaisesMessage(InvalidToken, 'Token expired'):
+			verify_token(expired)
+
+	def test_revocation(self):
+		bystander = issue_token('employee', self.emp.id, self.hr.id)
+		self.assertEqual(self.client.post('/api/auth/logout/').status_code, 200)
+		self.assertEqual(self.client.get('/api/tasks/my-tasks/').status_code, 401)
+		self.assertEqual(verify_token(bystander).id, self.emp.id)
+
+		with mock.patch.object(passwords, 'pool', PasswordPool(workers=0)):
+			response = APIClient().post('/api/employees/change-password/', {
+				'email': self.emp.email, 'old_password': 'hunter2', 'new_password': 'hunter3', 'confirm_password': 'hunter3',
+			}, format='json')
+		self.assertEqual(response.status_code, 200)
+		with self.assertRaisesMessage(InvalidToken, 'Token revoked'):
+			verify_token(bystander)
+		fresh = response.data['token']
+		self.assertEqual(verify_token(fresh).id, self.emp.id)
+		self.emp.delete()
+		with self.assertRaisesMessage(InvalidToken, 'Token revoked'):
+			verify_token(fresh)
+
+	def test_stale_token_does_not_block_login_or_logout(self):
+		with override_settings(ACCESS_TOKEN_TTL=-1):
+			expired = issue_token('employee', self.emp.id, self.hr.id)
+		revoked = issue_token('employee', self.emp.id, self.hr.id)
+		tokens.revoke_token(decode_token(revoked))
+		body = {'email': self.emp.email, 'password': 'hunter2'}
+		for token in (expired, revoked, 'k9.garbage.sig'):
+			with self.subTest(token=token):
+				client = APIClient()
+				client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+				with mock.patch.object(passwords, 'pool', PasswordPool(workers=0)):
+					response = client.post('/api/login/', body, format='json')
+				self.assertEqual(response.status_code, 200)
+				self.assertEqual(verify_token(response.data['token']).id, self.emp.id)
+				response = client.post('/api/auth/logout/')
+				self.assertEqual(response.status_code, 401)
+				self.assertIn('error', response.data)
+		# a valid token in the body still signs out
+		self.assertEqual(APIClient().post('/api/auth/logout/', {'token': self.token}, format='json').status_code, 200)
+		with self.assertRaisesMessage(InvalidToken, 'Token revoked'):
+			verify_token(self.token)
+
+	def test_revocations_reach_other_processes(self):
+		announcements = caches[settings.ACCESS_TOKEN_CACHE]
+		self.assertNotIsInstance(announcements, LocMemCache)
+		other = RevocationFilter()  # another process's filter
+		other.refresh()
+		self.assertTrue(other.is_fresh())
+		with self.captureOnCommitCallbacks(execute=True):
+			tokens.revoke_subject('employee', self.emp.id)
+		self.assertFalse(other.is_fresh())
+		other.refresh()
+		self.assertTrue(other.might_contain(f'employee:{self.emp.id}'))
+
+	def test_purge_rebuilds_the_filter(self):
+		now = timezone.now()
+		RevokedToken.objects.create(key='lapsing', revoked_at=now, expires_at=now + timedelta(hours=1))
+		RevokedToken.objects.create(key='live', revoked_at=now, expires_at=now + timedelta(hours=2))
+		tokens.revocations.refresh()
+		self.assertTrue(tokens.revocations.might_contain('lapsing'))
+		RevokedToken.objects.filter(key='lapsing').update(expires_at=now - timedelta(seconds=1))
+		self.assertEqual(tokens.purge_revocations(), 1)
+		self.assertFalse(tokens.revocations.might_contain('lapsing'))
+		self.assertTrue(tokens.revocations.might_contain('live'))
+		# other processes drop it on their rebuild timer
+		other = RevocationFilter()
+		other.add('lapsing')
+		other.refresh()
+		self.assertFalse(other.might_contain('lapsing'))
+		other.add('stale')
+		with override_settings(ACCESS_TOKEN_BLOOM_REBUILD=-1):
+			other.refresh()
+		self.assertFalse(other.might_contain('stale'))
+
+	def test_bloom_filter(self):
+		bloom = RevocationFilter(bits=1 << 12)
+		keys = [f'token-{i}' for i in range(100)]
+		for key in keys:
+			bloom.add(key)
+		self.assertTrue(all(bloom.might_contain(key) for key in keys))
+		false_positives = sum(bloom.might_contain(f'other-{i}') for i in range(1000))
+		self.assertLess(false_positives, 50)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class BenchmarkSuiteTests(TestCase):
+
+	def test_generated_dataset_is_seeded_and_consistent(self):
+		def generate():
+			with transaction.atomic():
+				counts = generate_dataset(hrs=2, employees=6, days=28, seed=3)
+				rows = list(Attendance.objects.order_by('employee__email', 'date').values_list('employee__email', 'date', 'status', 'check_in'))
+				leaves = list(Leave.objects.filter(status='Approved').values_list('employee_id', 'start_date', 'end_date'))
+				on_leave = Attendance.objects.filter(status='Leave').count()
+				transaction.set_rollback(True)
+			return counts, rows, leaves, on_leave
+
+		counts, rows, leaves, on_leave = generate()
+		self.assertEqual((counts['hrs'], counts['employees'], counts['attendance']), (2, 6, len(rows)))
+		self.assertEqual(counts['tasks'], 60)
+		self.assertEqual(on_leave, sum(
+			1 for emp_id, start, end in leaves for d in range((end - start).days + 1)
+			if (start + timedelta(days=d)).weekday() < 5
+		))
+		self.assertEqual(generate()[1], rows)
+
+	def test_every_route_runs_and_writes_roll_back(self):
+		self.assertEqual(set(route_names()), set(ROUTE_SPECS))
+		generate_dataset(hrs=2, employees=6, days=14, seed=4)
+		before = [model.objects.count() for model in (Employee, Leave, Attendance, Task)]
+		routes = [name for name in route_names() if name != 'employee_import']  # covered by EmployeeImportTests
+		report = run_benchmark(requests=1, warmup=0, routes=routes)
+		self.assertEqual([model.objects.count() for model in (Employee, Leave, Attendance, Task)], before)
+		for name, row in report['routes'].items():
+			with self.subTest(route=name):
+				if 'skipped' not in row:
+					self.assertLess(row['status'], 400)
+					self.assertIsNotNone(row['queries'])
+
+	def test_compare_reports_applies_thresholds(self):
+		def report(p95, rps, queries):
+			return {'routes': {
+				'a': {'status': 200, 'p95_ms': p95, 'throughput_rps': rps, 'queries': queries},
+				'b': {'status': 200, 'p95_ms': 1.0, 'throughput_rps': 1000, 'queries': 1},
+			}}
+
+		baseline = report(10.0, 100, 2)
+		self.assertFalse(any(r['regression'] for r in compare_reports(report(11.0, 95, 2), baseline)))
+		flagged = {r['metric'] for r in compare_reports(report(20.0, 50, 3), baseline) if r['regression']}
+		self.assertEqual(flagged, {'p95_ms', 'throughput_rps', 'queries'})
+		# sub-millisecond noise on a fast route is not a regression
+		current = report(10.0, 100, 2)
+		current['routes']['b'] = {'status': 200, 'p95_ms': 1.6, 'throughput_rps': 600, 'queries': 1}
+		self.assertFalse(any(r['regression'] for r in compare_reports(current, baseline)))
+		del current['routes']['b']
+		self.assertEqual([r['metric'] for r in compare_reports(current, baseline) if r['regression']], ['coverage'])
 
-# Create your tests here.
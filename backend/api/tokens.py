@@ -0,0 +1,333 @@
+import base64
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import authentication, exceptions
+
+from .models import RevokedToken
+
+
+# Stateless access tokens. login issues
+#   <key id>.<role>:<id>:<hr id>:<issued ms>:<expires ms>:<token id>.<hmac>
+# signed with the first of ACCESS_TOKEN_KEYS; any listed key verifies, so a
+# key is rotated by putting a new one first and dropping the old one once
+# ACCESS_TOKEN_TTL has passed. Verifying is an HMAC and an in-memory
+# revocation check: revoked token ids and accounts ("<role>:<id>", which
+# revokes every token issued to it so far) go to the RevokedToken table and
+# into a per-process bloom filter. Only a filter hit is confirmed against the
+# table. Other processes load new rows when the "access-tokens:revoked"
+# counter in the ACCESS_TOKEN_CACHE cache moves, which only reaches them if
+# that cache is shared between processes (not LocMem), and in any case every
+# ACCESS_TOKEN_REVOCATION_REFRESH seconds. The filter is rebuilt from the
+# live rows every ACCESS_TOKEN_BLOOM_REBUILD seconds and after
+# purge_revocations(), so expired keys stop costing confirmation queries.
+#
+# This is a transitional mode. A token is authoritative only where a view
+# reads it: the task endpoints check the ids they are given against it (403
+# on a mismatch) and use its ids instead of looking the account up, and
+# change_password and logout act on the account it names. Every other
+# endpoint, and any request without a token, still identifies the caller by
+# the employee/HR ids in its parameters.
+
+ROLE_CODES = {'hr': 'h', 'employee': 'e'}
+ROLES = {code: role for role, code in ROLE_CODES.items()}
+REVOCATIONS_CACHE_KEY = 'access-tokens:revoked'
+SIGNATURE_BYTES = 16
+
+# issue times stay after this process's last revocation, so a token issued
+# in the same millisecond as revoke_subject() (change_password) still verifies
+_last_revocation_ms = 0
+
+
+class InvalidToken(Exception):
+	pass
+
+
+def _setting(name, default):
+	return getattr(settings, name, default)
+
+
+def _announcements():
+	return caches[_setting('ACCESS_TOKEN_CACHE', 'default')]
+
+
+def signing_keys():
+	"""{key id: secret}, in ACCESS_TOKEN_KEYS order; the first one signs."""
+	keys = _setting('ACCESS_TOKEN_KEYS', None)
+	if not keys:
+		# a fresh checkout works unconfigured, with a key tied to SECRET_KEY
+		return {'k0': hashlib.sha256(b'api.tokens:' + settings.SECRET_KEY.encode()).digest()}
+	return {key_id: secret.encode() for key_id, secret in keys}
+
+
+def _sign(secret, payload):
+	digest = hmac.new(secret, payload.encode(), hashlib.sha256).digest()[:SIGNATURE_BYTES]
+	return base64.urlsafe_b64encode(digest).rstrip(b'=').decode()
+
+
+def _now_ms():
+	return int(time.time() * 1000)
+
+
+def _datetime(ms):
+	return datetime.fromtimestamp(ms // 1000, tz=dt_timezone.utc) + timedelta(milliseconds=ms % 1000)
+
+
+class TokenUser:
+	"""request.user for a verified token: the identity it carries, with no
+	database row behind it."""
+
+	is_authenticated = True
+	is_anonymous = False
+
+	def __init__(self, role, id, hr_id, issued, expires, token_id):
+		self.role = role
+		self.id = id
+		self.hr_id = hr_id
+		self.issued = issued
+		self.expires = expires
+		self.token_id = token_id
+
+	@property
+	def pk(self):
+		return self.id
+
+	@property
+	def subject(self):
+		return f'{self.role}:{self.id}'
+
+	@property
+	def is_hr(self):
+		return self.role == 'hr'
+
+	@property
+	def is_employee(self):
+		return self.role == 'employee'
+
+	def __str__(self):
+		return self.subject
+
+
+def issue_token(role, user_id, hr_id):
+	"""A signed token for an HR (hr_id is their own id) or an employee."""
+	key_id, secret = next(iter(signing_keys().items()))
+	issued = max(_now_ms(), _last_revocation_ms + 1)
+	expires = issued + _setting('ACCESS_TOKEN_TTL', 12 * 3600) * 1000
+	token_id = base64.urlsafe_b64encode(secrets.token_bytes(9)).decode()
+	payload = f'{ROLE_CODES[role]}:{user_id}:{hr_id if hr_id is not None else ""}:{issued}:{expires}:{token_id}'
+	return f'{key_id}.{payload}.{_sign(secret, payload)}'
+
+
+def decode_token(token):
+	"""Check signature and expiry; returns a TokenUser. Revocation is not checked."""
+	try:
+		key_id, payload, signature = token.split('.')
+	except ValueError:
+		raise InvalidToken('Malformed token')
+	secret = signing_keys().get(key_id)
+	if secret is None:
+		raise InvalidToken('Unknown signing key')
+	if not hmac.compare_digest(signature, _sign(secret, payload)):
+		raise InvalidToken('Bad token signature')
+	try:
+		code, user_id, hr_id, issued, expires, token_id = payload.split(':')
+		user = TokenUser(ROLES[code], int(user_id), int(hr_id) if hr_id else None, int(issued), int(expires), token_id)
+	except (KeyError, ValueError):
+		raise InvalidToken('Malformed token')
+	if user.expires <= _now_ms():
+		raise InvalidToken('Token expired')
+	return user
+
+
+class RevocationFilter:
+	"""Bloom filter over revoked keys; a hit is confirmed against RevokedToken."""
+
+	def __init__(self, bits=1 << 16, hashes=4):
+		self.size = bits
+		self.hashes = hashes
+		self._bits = bytearray(bits // 8)
+		self._lock = threading.Lock()
+		self._refresh_lock = threading.Lock()
+		self._loaded_through = None  # highest RevokedToken id loaded; None before the first load
+		self._generation = None
+		self._checked_at = 0.0
+		self._built_at = 0.0
+		self._rebuild_keys = None  # keys add()ed while a rebuild reads the table
+
+	def _positions(self, key):
+		digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+		# k indexes from two hashes (Kirsch-Mitzenmacher)
+		first = int.from_bytes(digest[:8], 'little')
+		step = int.from_bytes(digest[8:], 'little') | 1
+		return [(first + i * step) % self.size for i in range(self.hashes)]
+
+	def _set(self, bits, key):
+		for position in self._positions(key):
+			bits[position >> 3] |= 1 << (position & 7)
+
+	def add(self, key):
+		with self._lock:
+			self._set(self._bits, key)
+			if self._rebuild_keys is not None:
+				self._rebuild_keys.append(key)
+
+	def might_contain(self, key):
+		bits = self._bits
+		return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+	def is_fresh(self):
+		"""False when rows may have been added since the last load."""
+		if self._loaded_through is None:
+			return False
+		if time.monotonic() - self._checked_at > _setting('ACCESS_TOKEN_REVOCATION_REFRESH', 30):
+			return False
+		return _announcements().get(REVOCATIONS_CACHE_KEY) == self._generation
+
+	def refresh(self, rebuild=False):
+		"""Load the revocations recorded since the last load. The first load,
+		rebuild=True and one every ACCESS_TOKEN_BLOOM_REBUILD seconds start
+		over from the live rows, dropping the bits of expired ones."""
+		with self._refresh_lock:
+			generation = _announcements().get(REVOCATIONS_CACHE_KEY)
+			now = time.monotonic()
+			rebuild = (
+				rebuild or self._loaded_through is None
+				or now - self._built_at > _setting('ACCESS_TOKEN_BLOOM_REBUILD', 3600)
+			)
+			rows = RevokedToken.objects.filter(expires_at__gt=timezone.now())
+			if rebuild:
+				with self._lock:
+					self._rebuild_keys = []
+			else:
+				rows = rows.filter(id__gt=self._loaded_through)
+			loaded = list(rows.values_list('id', 'key'))
+			bits = bytearray(self.size // 8) if rebuild else None
+			for _, key in loaded:
+				if rebuild:
+					self._set(bits, key)
+				else:
+					self.add(key)
+			with self._lock:
+				if rebuild:
+					# revoked by this process meanwhile, maybe not committed yet
+					for key in self._rebuild_keys:
+						self._set(bits, key)
+					self._bits = bits
+					self._rebuild_keys = None
+					self._built_at = now
+				self._loaded_through = max([self._loaded_through or 0] + [row_id for row_id, _ in loaded])
+				self._generation = generation
+				self._checked_at = now
+
+	def might_be_revoked(self, user):
+		return self.might_contain(user.token_id) or self.might_contain(user.subject)
+
+	def is_revoked(self, user):
+		if not self.is_fresh():
+			self.refresh()
+		if not self.might_be_revoked(user):
+			return False
+		return RevokedToken.objects.filter(
+			Q(key=user.token_id) | Q(key=user.subject, revoked_at__gte=_datetime(user.issued)),
+		).exists()
+
+
+revocations = RevocationFilter(bits=_setting('ACCESS_TOKEN_BLOOM_BITS', 1 << 16))
+
+
+def verify_token(token):
+	"""decode_token() plus the revocation check; raises InvalidToken."""
+	user = decode_token(token)
+	if revocations.is_revoked(user):
+		raise InvalidToken('Token revoked')
+	return user
+
+
+async def averify_token(token):
+	user = decode_token(token)
+	# the common case needs no database access, so skip the thread hop for it
+	if revocations.is_fresh() and not revocations.might_be_revoked(user):
+		return user
+	if await sync_to_async(revocations.is_revoked)(user):
+		raise InvalidToken('Token revoked')
+	return user
+
+
+def _revoke(key, expires_at):
+	global _last_revocation_ms
+	# whole milliseconds, like the issue time it is compared with
+	_last_revocation_ms = _now_ms()
+	revoked_at = _datetime(_last_revocation_ms)
+	RevokedToken.objects.create(key=key, revoked_at=revoked_at, expires_at=expires_at)
+	revocations.add(key)
+
+	def announce():
+		announcements = _announcements()
+		announcements.add(REVOCATIONS_CACHE_KEY, 0, None)
+		announcements.incr(REVOCATIONS_CACHE_KEY)
+
+	transaction.on_commit(announce)
+
+
+def revoke_token(user):
+	"""Revoke one token (a TokenUser from verify_token)."""
+	_revoke(user.token_id, _datetime(user.expires))
+
+
+def revoke_subject(role, user_id):
+	"""Revoke every token issued to an account so far; later logins get valid ones."""
+	_revoke(f'{role}:{user_id}', timezone.now() + timedelta(seconds=_setting('ACCESS_TOKEN_TTL', 12 * 3600)))
+
+
+def purge_revocations():
+	"""Delete rows that can no longer match an unexpired token and rebuild
+	this process's filter without them (other processes rebuild on their
+	ACCESS_TOKEN_BLOOM_REBUILD timer). The newest row is kept so its id is
+	not reused (processes load rows by id)."""
+	latest = RevokedToken.objects.order_by('-id').values_list('id', flat=True).first()
+	deleted = RevokedToken.objects.filter(expires_at__lte=timezone.now()).exclude(id=latest).delete()[0]
+	revocations.refresh(rebuild=True)
+	return deleted
+
+
+def bearer_token(request):
+	header = request.headers.get('Authorization', '')
+	scheme, _, token = header.partition(' ')
+	if scheme.lower() != 'bearer' or not token.strip():
+		return None
+	return token.strip()
+
+
+def token_user(request):
+	"""The TokenUser DRF authenticated the request with, or None."""
+	user = getattr(request, 'user', None)
+	return user if isinstance(user, TokenUser) else None
+
+
+class SignedTokenAuthentication(authentication.BaseAuthentication):
+	"""`Authorization: Bearer <token>` from login, verified without a query.
+	Requests without the header fall through to the next authenticator."""
+
+	keyword = 'Bearer'
+
+	def authenticate(self, request):
+		token = bearer_token(request)
+		if token is None:
+			return None
+		try:
+			return verify_token(token), token
+		except InvalidToken as e:
+			raise exceptions.AuthenticationFailed(str(e))
+
+	def authenticate_header(self, request):
+		return self.keyword
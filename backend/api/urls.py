@@ -1,15 +1,20 @@
 from django.urls import path
-from . import views
+from . import async_views, views
 from .views import StatsView, leave_request, leave_mine, leave_pending, leave_action
 
 urlpatterns = [
 	path('login/', views.login, name='login'),
+	path('auth/logout/', views.logout, name='logout'),
 	path('employee/list/', views.employee_list_by_hr, name='employee_list_by_hr'),
 	path('employee/create/', views.employee_create, name='employee_create'),
+	path('employee/import/', views.employee_import, name='employee_import'),
 	path('employee/<int:pk>/', views.employee_detail, name='employee_detail'),
 	path('employee/update/<int:pk>/', views.employee_update, name='employee_update'),
 	path('employee/delete/<int:pk>/', views.employee_delete, name='employee_delete'),
 	path('counts/', views.StatsView.as_view(), name='stats-counts'),
+	path('cache/stats/', views.response_cache_stats, name='response-cache-stats'),
+	path('db/write-queue/', views.write_queue_stats, name='write-queue-stats'),
+	path('auth/password-pool/', views.password_pool_stats, name='password-pool-stats'),
 	path('employees/', views.employee_list, name='employee-list'),
 	# Leave endpoints
 	path('leave/request/', views.leave_request, name='leave-request'),
@@ -18,6 +23,8 @@ urlpatterns = [
 	path('leave/summary/', views.leave_summary, name='leave-summary'),
 	path('leaves/status-summary/', views.leaves_status_summary, name='leaves-status-summary'),
 	path('leave/action/<int:leave_id>/', views.leave_action, name='leave-action'),
+	path('leave/export/', views.leave_export, name='leave-export'),
+	path('leave/action/bulk/', views.leave_action_bulk, name='leave-action-bulk'),
 	
 	# Employee analytics
 	path('employees/department-count/', views.employees_department_count, name='employees-department-count'),
@@ -26,14 +33,37 @@ urlpatterns = [
 	path('attendance/mark/', views.attendance_mark, name='attendance-mark'),
 	path('attendance/checkout/', views.attendance_checkout, name='attendance-checkout'),
 	path('attendance/', views.attendance_list, name='attendance-list'),
+	path('attendance/export/', views.attendance_export, name='attendance-export'),
 	path('attendance/<int:pk>/update/', views.attendance_update, name='attendance-update'),
 	path('attendance/stats/employee/', views.attendance_stats_employee, name='attendance-stats-employee'),
+	path('attendance/stats/team/', views.attendance_stats_team, name='attendance-stats-team'),
+	path('attendance/stats/punctuality/', views.attendance_punctuality, name='attendance-stats-punctuality'),
 	path('attendance/stats/hr/', views.attendance_stats_hr, name='attendance-stats-hr'),
 	path('attendance-percentage/<int:employee_id>/', views.AttendancePercentageView.as_view(), name='attendance-percentage'),
 
+	# Push events (SSE, ASGI only)
+	path('events/', views.events_stream, name='events-stream'),
+	path('events/stats/', views.events_stats, name='events-stats'),
+
+	# Delta sync
+	path('sync/', views.sync_changes, name='sync-changes'),
+
 	# Tasks endpoints
 	path('tasks/', views.tasks_list_create, name='tasks-list-create'),
+	path('tasks/export/', views.tasks_export, name='tasks-export'),
 	path('tasks/my-tasks/', views.tasks_my_tasks, name='tasks-my-tasks'),
 	path('tasks/<int:pk>/', views.tasks_update_status, name='tasks-update-status'),
 	path('employees/change-password/', views.change_password, name='employee-change-password'),
+
+	# Async (ASGI) twins of the read-heavy endpoints, same parameters and bodies
+	path('async/counts/', async_views.stats_counts, name='async-stats-counts'),
+	path('async/employees/', async_views.employee_list, name='async-employee-list'),
+	path('async/employees/department-count/', async_views.employees_department_count, name='async-employees-department-count'),
+	path('async/leave/pending/', async_views.leave_pending, name='async-leave-pending'),
+	path('async/leave/mine/', async_views.leave_mine, name='async-leave-mine'),
+	path('async/leaves/status-summary/', async_views.leaves_status_summary, name='async-leaves-status-summary'),
+	path('async/attendance/stats/employee/', async_views.attendance_stats_employee, name='async-attendance-stats-employee'),
+	path('async/attendance-percentage/<int:employee_id>/', async_views.attendance_percentage, name='async-attendance-percentage'),
+	path('async/tasks/my-tasks/', async_views.tasks_my_tasks, name='async-tasks-my-tasks'),
+	path('async/login/', async_views.login, name='async-login'),
 ]
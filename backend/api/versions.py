@@ -0,0 +1,155 @@
+import functools
+import hashlib
+
+from asgiref.sync import iscoroutinefunction
+from django.db import connection
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import quote_etag
+
+from .models import CollectionVersion
+from .tokens import InvalidToken, bearer_token, decode_token
+
+
+# Conditional GET for polled list endpoints. Each collection has a version
+# row that writes bump in their own transaction; a list response carries the
+# version as its ETag, so a poll whose ETag still matches is answered 304
+# without reading the list itself. There is no Last-Modified: HTTP dates have
+# whole seconds, so two writes in one second would share it and an
+# If-Modified-Since poll between them would get a wrong 304.
+# The ETag also covers the request's scope (path, the parameters that pick
+# the rows, the token's subject), and the check only runs once the view has
+# validated and authorized the request: it calls precondition() right
+# before reading the list, so a 304 is never a way around a 400/403/404.
+
+# query parameters that select which rows (and columns) a list holds
+SCOPE_PARAMS = ('hr_id', 'employee_id', 'employee', 'fields', 'cursor', 'page_size')
+
+# collections whose serialized lists include fields of each model
+COLLECTION_DEPENDENCIES = {
+	'Employee': ('employees', 'leaves', 'tasks'),  # leaves/tasks embed employee name and email
+	'Leave': ('leaves',),
+	'Task': ('tasks',),
+	'HR': ('tasks',),  # tasks embed hr_name
+}
+
+
+def bump_collections(*names):
+	"""Advance the version of each named collection (one statement).
+
+	Call inside the transaction that changes the data, so the bump commits
+	or rolls back with it.
+	"""
+	if not names:
+		return
+	qn = connection.ops.quote_name
+	table = qn(CollectionVersion._meta.db_table)
+	now = connection.ops.adapt_datetimefield_value(timezone.now())
+	rows = ', '.join(['(%s, 1, %s)'] * len(names))
+	params = []
+	for name in names:
+		params.extend([name, now])
+	with connection.cursor() as cursor:
+		cursor.execute(
+			f'INSERT INTO {table} ({qn("name")}, {qn("version")}, {qn("updated_at")}) VALUES {rows} '
+			f'ON CONFLICT ({qn("name")}) DO UPDATE SET {qn("version")} = {table}.{qn("version")} + 1, '
+			f'{qn("updated_at")} = excluded.{qn("updated_at")}',
+			params,
+		)
+
+
+def bump_for_model(model_name):
+	bump_collections(*COLLECTION_DEPENDENCIES.get(model_name, ()))
+
+
+def collection_version(name):
+	"""Return (version, updated_at) for a collection; (0, None) before its first write."""
+	row = CollectionVersion.objects.filter(name=name).values_list('version', 'updated_at').first()
+	return row or (0, None)
+
+
+async def acollection_version(name):
+	row = await CollectionVersion.objects.filter(name=name).values_list('version', 'updated_at').afirst()
+	return row or (0, None)
+
+
+def _scope(request):
+	"""Path, row-selecting parameters and token subject: what else the ETag covers."""
+	parts = [request.path]
+	parts.extend(f'{name}={request.GET[name]}' for name in SCOPE_PARAMS if name in request.GET)
+	token = bearer_token(request)
+	if token is not None:
+		# the view has verified the token by the time precondition() runs
+		try:
+			parts.append(decode_token(token).subject)
+		except InvalidToken:
+			pass
+	return hashlib.blake2b('\n'.join(parts).encode(), digest_size=8).hexdigest()
+
+
+def _etag(name, version, scope):
+	return quote_etag(f'{name}-{version}-{scope}')
+
+
+def _finish(request, response):
+	etag = getattr(request, '_collection_etag', None)
+	if etag is None:
+		# the view answered before reaching its list (an error)
+		return response
+	# 304s from get_conditional_response already carry the ETag
+	if response.status_code == 200:
+		response['ETag'] = etag
+	if response.status_code in (200, 304):
+		# browsers may keep the list but must revalidate it on every poll,
+		# and a list fetched with one token is not another token's list
+		patch_cache_control(response, no_cache=True)
+		patch_vary_headers(response, ('Authorization',))
+	return response
+
+
+def precondition(request):
+	"""For a view under @conditional_collection, once the request is validated
+	and authorized: a 304 response when the client's ETag still matches,
+	else None (read and return the list). Elsewhere always None."""
+	name = getattr(request, '_conditional_collection', None)
+	if name is None:
+		return None
+	version, _ = collection_version(name)
+	request._collection_etag = etag = _etag(name, version, _scope(request))
+	return get_conditional_response(request, etag=etag)
+
+
+async def aprecondition(request):
+	name = getattr(request, '_conditional_collection', None)
+	if name is None:
+		return None
+	version, _ = await acollection_version(name)
+	request._collection_etag = etag = _etag(name, version, _scope(request))
+	return get_conditional_response(request, etag=etag)
+
+
+def conditional_collection(name):
+	"""Conditional GET for a list view: the view calls precondition() (or
+	aprecondition()) after validating and authorizing the request and returns
+	its 304 when there is one; a 200 list gets the ETag. Apply
+	beneath @api_view (and beneath @read_replica, so the version is read
+	where the rows are).
+	"""
+	def decorator(view):
+		if iscoroutinefunction(view):
+			@functools.wraps(view)
+			async def async_wrapper(request, *args, **kwargs):
+				if request.method not in ('GET', 'HEAD'):
+					return await view(request, *args, **kwargs)
+				request._conditional_collection = name
+				return _finish(request, await view(request, *args, **kwargs))
+			return async_wrapper
+
+		@functools.wraps(view)
+		def wrapper(request, *args, **kwargs):
+			if request.method not in ('GET', 'HEAD'):
+				return view(request, *args, **kwargs)
+			request._conditional_collection = name
+			return _finish(request, view(request, *args, **kwargs))
+		return wrapper
+	return decorator
@@ -4,42 +4,64 @@ from rest_framework import status
 from django.db.models import Q
 from .models import Employee, HR, Leave
 from .serializers import HRSerializer, EmployeeSerializer, LeaveSerializer
-from django.contrib.auth.hashers import check_password
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, authentication_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from django.db.models import Q, Count
-from .models import Employee, HR, Leave, Attendance, Task
+from django.db import transaction
+from django.db.models import Q, Count, F, Sum
+from django.db.models.functions import Coalesce
+from .models import Employee, HR, Leave, Attendance, Task, OutboxMessage, DepartmentDailyRollup
+from . import outbox
+from .changelog import DEFAULT_SYNC_LIMIT, MAX_SYNC_LIMIT, changes_since, cursor_expired, head_cursor, log_moved_out, log_upserts
+from .attendance_utils import backfill_leave_attendance, insert_check_in
+from .events import broker, employee_channel, event_stream, hr_channel, leave_channels, task_channels
+from .employee_import import import_employees_csv
+from .cache import cache_stats, cached_response, invalidate_on_commit
+from .stats import EMPTY_EMPLOYEE_STATS, ROLLUP_TOTAL_DAYS, check_in_distribution, employee_stats, leave_status_counts
+from .db_router import read_replica
+from .search import search_employee_ids
+from .endpoints import (
+	TOKEN_FORBIDDEN, EndpointError, employee_list_params, employee_list_queryset, employee_list_rows,
+	hr_password_matches, login_payload, my_tasks_employee, token_id,
+)
+from .versions import bump_for_model, conditional_collection, precondition
+from .write_queue import run_write, writer
+from .rollups import record_attendance_changes, snapshot
+from .export import ExportError, stream_export
+from .fieldsets import ATTENDANCE_LIST, EMPLOYEE_LIST, LEAVE_LIST, TASK_LIST, FieldsetError
+from .pagination import ATTENDANCE_ORDERINGS, CursorError, keyset_page, parse_page_size, stream_json_array
 from .serializers import HRSerializer, EmployeeSerializer, LeaveSerializer, AttendanceSerializer, TaskSerializer
-from django.contrib.auth.hashers import check_password
+from .passwords import check_password, make_password, pool as password_pool
+from .tokens import InvalidToken, bearer_token, issue_token, revoke_subject, revoke_token, token_user, verify_token
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.views import APIView
 from django.shortcuts import get_object_or_404
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.decorators import method_decorator
 from django.utils import timezone
 from datetime import datetime, timedelta
+import io
 
 
 @api_view(['GET'])
+@cached_response('leaves-status-summary', tags=('Leave',))
+@read_replica
 def leaves_status_summary(request):
 	"""Return total counts grouped by leave status across all employees.
 
 	Response: { "pending": int, "approved": int, "rejected": int }
 	"""
 	try:
-		pending = Leave.objects.filter(status='Pending').count()
-		approved = Leave.objects.filter(status='Approved').count()
-		rejected = Leave.objects.filter(status='Rejected').count()
-		return Response({
-			'pending': pending,
-			'approved': approved,
-			'rejected': rejected
-		})
+		return Response(leave_status_counts())
 	except Exception as e:
 		return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
 @api_view(['GET'])
+@cached_response('employees-department-count', tags=('Employee',))
+@read_replica
 def employees_department_count(request):
 	"""Return employee count per department.
 
@@ -53,6 +75,7 @@ def employees_department_count(request):
 		return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@method_decorator(read_replica, name='get')
 class AttendancePercentageView(APIView):
 	"""Return attendance percentage for a specific employee.
 
@@ -68,49 +91,42 @@ class AttendancePercentageView(APIView):
 	permission_classes = [AllowAny]
 
 	def get(self, request, employee_id):
-		# ensure employee exists
-		employee = get_object_or_404(Employee, id=employee_id)
 		try:
-			total_days = Attendance.objects.filter(employee_id=employee_id).count()
-			present_days = Attendance.objects.filter(employee_id=employee_id, status='Present').count()
-			attendance_percentage = round((present_days / total_days * 100), 2) if total_days > 0 else 0
-
+			stats = employee_stats([employee_id]).get(employee_id)
+			# ensure employee exists
+			if stats is None:
+				return Response({'detail': 'No Employee matches the given query.'}, status=status.HTTP_404_NOT_FOUND)
 			return Response({
-				'employee_id': employee.id,
-				'employee_name': employee.name,
-				'total_days': total_days,
-				'present_days': present_days,
-				'attendance_percentage': attendance_percentage
+				'employee_id': stats['id'],
+				'employee_name': stats['name'],
+				'total_days': stats['total_days'],
+				'present_days': stats['present_days'],
+				'attendance_percentage': stats['attendance_percent']
 			})
 		except Exception as e:
 			return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
 @api_view(['GET'])
+@read_replica
 def employee_list(request):
-	queryset = Employee.objects.all()
-	department = request.GET.get('department')
-	search = request.GET.get('search')
-
-	if department:
-		queryset = queryset.filter(department__iexact=department)
-	if search:
-		queryset = queryset.filter(Q(name__icontains=search) | Q(email__icontains=search))
+	"""List employees, optionally filtered by ?department= and ?search=.
 
-	data = [
-		{
-			"id": emp.id,
-			"name": emp.name,
-			"email": emp.email,
-			"department": emp.department,
-			"designation": emp.designation,
-			"salary": str(emp.salary)
-		}
-		for emp in queryset
-	]
+	?search= matches name, email, department and designation through the
+	FTS5 trigram index, best match first, capped by ?limit= (default 50).
+	"""
+	try:
+		department, search, limit = employee_list_params(request.GET)
+	except EndpointError as e:
+		return Response({'error': e.message}, status=e.status_code)
+	ids = search_employee_ids(search, limit=limit, department=department) if search else None
+	queryset, rank = employee_list_queryset(department, search, limit, ids)
+	data = employee_list_rows(queryset, rank)
 	return Response(data, status=status.HTTP_200_OK)
 
 
+@method_decorator(read_replica, name='get')
+@method_decorator(cached_response('stats-counts', tags=('Employee',)), name='get')
 class StatsView(APIView):
 	def get(self, request):
 		employees_count = Employee.objects.count()
@@ -121,37 +137,84 @@ class StatsView(APIView):
 		})
 
 
+@api_view(['GET'])
+def write_queue_stats(request):
+	"""Return single-writer queue metrics (queue depth, group-commit latency)."""
+	return Response(writer.stats())
+
+
+@api_view(['GET'])
+def response_cache_stats(request):
+	"""Return dashboard response-cache counters.
+
+	Response: { "hits": int, "misses": int, "evictions": int, "hit_ratio": float }
+	"""
+	return Response(cache_stats())
+
+
+@api_view(['GET'])
+def password_pool_stats(request):
+	"""Return password pool metrics (jobs in flight, rejections, queue/run time)."""
+	return Response(password_pool.stats())
+
+
 # Unified Login View
 @api_view(['POST'])
+# credentials, not a token: a stale Authorization header must not block a fresh login
+@authentication_classes([])
 def login(request):
 	email = request.data.get('email')
 	password = request.data.get('password')
 	# Try HR first
-	try:
-		hr = HR.objects.get(email=email)
-		if password == hr.password:
-			data = HRSerializer(hr).data
-			return Response({'role': 'hr', 'data': data})
-	except HR.DoesNotExist:
-		pass
+	hr = HR.objects.filter(email=email).first()
+	if hr_password_matches(hr, password):
+		return Response(login_payload('hr', hr))
 	# Try Employee next
-	try:
-		emp = Employee.objects.get(email=email)
-		if check_password(password, emp.password):
-			data = EmployeeSerializer(emp).data
-			return Response({'role': 'employee', 'data': data})
-	except Employee.DoesNotExist:
-		pass
+	emp = Employee.objects.filter(email=email).first()
+	if emp is not None and check_password(password, emp.password):
+		return Response(login_payload('employee', emp))
 	return Response({'error': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
 
 
+@api_view(['POST'])
+# the token to revoke is checked here, so an already revoked one gets this view's answer
+@authentication_classes([])
+def logout(request):
+	"""Revoke the caller's token (Authorization: Bearer, or 'token' in the body)."""
+	token = bearer_token(request) or request.data.get('token')
+	if not token:
+		return Response({'error': 'token required'}, status=status.HTTP_400_BAD_REQUEST)
+	try:
+		identity = verify_token(token)
+	except InvalidToken as e:
+		return Response({'error': str(e)}, status=status.HTTP_401_UNAUTHORIZED)
+	revoke_token(identity)
+	return Response({'message': 'Signed out'})
+
+
+def _list_response(request, qs, schema):
+	"""Render a read-only list through `schema`, honouring ?fields=a,b,...
+
+	Only the selected columns are read, straight into plain dicts. Under
+	@conditional_collection an unchanged list is answered 304 here, after
+	the view has checked the request.
+	"""
+	try:
+		names = schema.parse(request.query_params.get('fields'))
+	except FieldsetError as e:
+		return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+	not_modified = precondition(request)
+	if not_modified is not None:
+		return not_modified
+	return Response(schema.render(schema.queryset(qs, names), names))
+
+
 # List all employees for logged-in HR
 @api_view(['GET'])
+@conditional_collection('employees')
 def employee_list_by_hr(request):
 	hr_id = request.query_params.get('hr_id')
-	employees = Employee.objects.filter(hr_id=hr_id)
-	serializer = EmployeeSerializer(employees, many=True)
-	return Response(serializer.data)
+	return _list_response(request, Employee.objects.filter(hr_id=hr_id), EMPLOYEE_LIST)
 
 
 # Create employee (by HR)
@@ -159,21 +222,39 @@ def employee_list_by_hr(request):
 def employee_create(request):
 	serializer = EmployeeSerializer(data=request.data)
 	if serializer.is_valid():
-		new_emp = serializer.save()
-		# Try to notify via Node mailer service (non-blocking). If mailer isn't available, log and continue.
-		try:
-			import requests
-			mailer_url = 'http://localhost:3001/send-welcome-email'
-			payload = { 'name': new_emp.name, 'email': new_emp.email, 'password': request.data.get('password') }
-			# best-effort POST; timeout short so it doesn't block API
-			requests.post(mailer_url, json=payload, timeout=2)
-		except Exception as e:
-			# keep API success even if mailing fails
-			print('Mailer call failed:', str(e))
+		# hash here: the writer thread must never wait on the password pool
+		hashed = make_password(serializer.validated_data['password'])
+		run_write(_create_employee, serializer, hashed)
 		return Response(serializer.data, status=status.HTTP_201_CREATED)
 	return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+def _create_employee(serializer, hashed):
+	# The welcome email is queued in the same transaction and delivered by
+	# `manage.py drain_outbox`, so creation never waits on the Node mailer.
+	data = serializer.validated_data
+	with transaction.atomic():
+		serializer.instance = Employee.objects.create(**dict(data, password=hashed))
+		payload = { 'name': data['name'], 'email': data['email'], 'password': data['password'] }
+		outbox.enqueue(OutboxMessage.KIND_WELCOME_EMAIL, payload)
+	return serializer.instance
+
+
+# Bulk import employees from an uploaded CSV (by HR)
+@api_view(['POST'])
+def employee_import(request):
+	"""Multipart upload: file=<csv>, optional hr=<id> for rows without an hr column.
+
+	Response: { "created": int, "errors": [ { "row": int, "errors": {...} }, ... ] }
+	"""
+	upload = request.FILES.get('file')
+	if not upload:
+		return Response({'error': 'CSV file required'}, status=status.HTTP_400_BAD_REQUEST)
+	text = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+	report = import_employees_csv(text, default_hr_id=request.data.get('hr'))
+	return Response(report, status=status.HTTP_201_CREATED if report['created'] else status.HTTP_400_BAD_REQUEST)
+
+
 # Update employee (by HR)
 @api_view(['PUT'])
 def employee_update(request, pk):
@@ -245,7 +326,8 @@ def leave_request(request):
 
 	serializer = LeaveSerializer(data=request.data)
 	if serializer.is_valid():
-		serializer.save()
+		leave = run_write(serializer.save)
+		broker.publish_on_commit('leave.created', serializer.data, leave_channels(leave))
 		return Response(serializer.data, status=status.HTTP_201_CREATED)
 	return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -255,19 +337,17 @@ def leave_mine(request):
 	emp_id = request.query_params.get('employee')
 	if not emp_id:
 		return Response({'error': 'Employee ID required'}, status=status.HTTP_400_BAD_REQUEST)
-	leaves = Leave.objects.filter(employee_id=emp_id).order_by('-created_at')
-	serializer = LeaveSerializer(leaves, many=True)
-	return Response(serializer.data)
+	return _list_response(request, Leave.objects.filter(employee_id=emp_id).order_by('-created_at'), LEAVE_LIST)
 
 
 @api_view(['GET'])
+@conditional_collection('leaves')
 def leave_pending(request):
-	leaves = Leave.objects.filter(status='Pending').order_by('-created_at')
-	serializer = LeaveSerializer(leaves, many=True)
-	return Response(serializer.data)
+	return _list_response(request, Leave.objects.filter(status='Pending').order_by('-created_at'), LEAVE_LIST)
 
 
 @api_view(['GET'])
+@read_replica
 def leave_summary(request):
 	"""Return total approved leaves and pending leaves for an employee.
 	Query params: ?employee=<id>
@@ -277,9 +357,10 @@ def leave_summary(request):
 	if not emp_id:
 		return Response({'error': 'Employee ID required'}, status=status.HTTP_400_BAD_REQUEST)
 	try:
-		total_taken = Leave.objects.filter(employee_id=emp_id, status='Approved').count()
-		pending = Leave.objects.filter(employee_id=emp_id, status='Pending').count()
-		return Response({ 'total_taken': total_taken, 'pending': pending })
+		stats = employee_stats([int(emp_id)]).get(int(emp_id), EMPTY_EMPLOYEE_STATS)
+		return Response({ 'total_taken': stats['approved_leaves'], 'pending': stats['pending_leaves'] })
+	except ValueError:
+		return Response({'error': 'Employee ID must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
 	except Exception as e:
 		return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -287,23 +368,148 @@ def leave_summary(request):
 @api_view(['POST'])
 def leave_action(request, leave_id):
 	action = request.data.get('action')
-	leave = get_object_or_404(Leave, id=leave_id)
+	leave = get_object_or_404(Leave.objects.select_related('employee'), id=leave_id)
 	if action not in ['approve', 'reject']:
 		return Response({'error': 'Invalid action'}, status=status.HTTP_400_BAD_REQUEST)
 	leave.status = 'Approved' if action == 'approve' else 'Rejected'
-	leave.save()
-	# If approved, create or update attendance for the date range
-	if leave.status == 'Approved':
-		current = leave.start_date
-		while current <= leave.end_date:
-			Attendance.objects.update_or_create(
-				employee=leave.employee,
-				date=current,
-				defaults={'status': 'Leave', 'check_in': None, 'check_out': None}
-			)
-			current = current + timedelta(days=1)
+	backfill = run_write(_decide_leave, leave)
 	serializer = LeaveSerializer(leave)
-	return Response(serializer.data)
+	broker.publish_on_commit('leave.updated', serializer.data, leave_channels(leave))
+	data = dict(serializer.data)
+	data['attendance'] = backfill
+	return Response(data)
+
+
+def _decide_leave(leave):
+	backfill = {'inserted': 0, 'updated': 0}
+	with transaction.atomic():
+		leave.save()
+		# If approved, create or update attendance for the date range
+		if leave.status == 'Approved':
+			backfill = backfill_leave_attendance([leave])
+	return backfill
+
+
+def _int_list(values):
+	"""values as ints (JSON numbers or digit strings), or None if any is not an id."""
+	ids = []
+	for value in values:
+		if isinstance(value, bool) or not isinstance(value, (int, str)):
+			return None
+		try:
+			ids.append(int(value))
+		except ValueError:
+			return None
+	return ids
+
+
+@api_view(['POST'])
+def leave_action_bulk(request):
+	"""Approve or reject many leaves at once.
+
+	Expects JSON body: { "action": "approve" | "reject", "leave_ids": [int, ...] }
+	Response: { "updated": int, "attendance": { "inserted": int, "updated": int } }
+	"""
+	action = request.data.get('action')
+	leave_ids = request.data.get('leave_ids')
+	if action not in ['approve', 'reject']:
+		return Response({'error': 'Invalid action'}, status=status.HTTP_400_BAD_REQUEST)
+	if not isinstance(leave_ids, list) or not leave_ids:
+		return Response({'error': 'leave_ids must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+	leave_ids = _int_list(leave_ids)
+	if leave_ids is None:
+		return Response({'error': 'leave_ids must be a list of integers'}, status=status.HTTP_400_BAD_REQUEST)
+	new_status = 'Approved' if action == 'approve' else 'Rejected'
+	updated, backfill = run_write(_decide_leaves, leave_ids, new_status)
+	for leave in Leave.objects.filter(id__in=leave_ids).select_related('employee'):
+		broker.publish_on_commit('leave.updated', LeaveSerializer(leave).data, leave_channels(leave))
+	return Response({'updated': updated, 'attendance': backfill})
+
+
+def _decide_leaves(leave_ids, new_status):
+	backfill = {'inserted': 0, 'updated': 0}
+	with transaction.atomic():
+		updated = Leave.objects.filter(id__in=leave_ids).update(status=new_status)
+		# queryset.update() sends no post_save, so evict dependent responses here
+		invalidate_on_commit('Leave')
+		bump_for_model('Leave')
+		log_upserts(Leave.objects.filter(id__in=leave_ids))
+		if new_status == 'Approved':
+			leaves = Leave.objects.filter(id__in=leave_ids).only('employee_id', 'start_date', 'end_date')
+			backfill = backfill_leave_attendance(leaves)
+	return updated, backfill
+
+
+# --- Push events ---
+
+async def events_stream(request):
+	"""Server-Sent Events for ?hr_id=<id> (new and decided leaves, tasks
+	assigned by that HR) and/or ?employee=<id> (their leaves and tasks).
+
+	Resumes after the Last-Event-ID header (or ?last_event_id=) from the
+	replay buffer; sends a `reset` event when that position has expired.
+	Served only through the ASGI application (backend/asgi.py).
+	"""
+	if not isinstance(request, ASGIRequest):
+		return JsonResponse({'error': 'The event stream requires the ASGI server (backend.asgi)'}, status=status.HTTP_501_NOT_IMPLEMENTED)
+	channels = []
+	try:
+		if request.GET.get('hr_id'):
+			channels.append(hr_channel(int(request.GET['hr_id'])))
+		if request.GET.get('employee'):
+			channels.append(employee_channel(int(request.GET['employee'])))
+	except ValueError:
+		return JsonResponse({'error': 'hr_id and employee must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+	if not channels:
+		return JsonResponse({'error': 'hr_id or employee required'}, status=status.HTTP_400_BAD_REQUEST)
+	last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+	response = StreamingHttpResponse(event_stream(channels, last_event_id), content_type='text/event-stream')
+	response['Cache-Control'] = 'no-cache'
+	response['X-Accel-Buffering'] = 'no'  # keep nginx from buffering the stream
+	return response
+
+
+@api_view(['GET'])
+def events_stats(request):
+	return Response(broker.stats())
+
+
+# --- Delta sync ---
+
+@api_view(['GET'])
+@read_replica
+def sync_changes(request):
+	"""Tasks, leaves and attendance changed since a cursor, for one scope.
+
+	Query params: ?employee=<id> or ?hr_id=<id>, ?since=<cursor>, ?limit=<n>
+	Without ?since= only the current cursor is returned: take it, load the
+	full lists, then poll with ?since= to receive changes and tombstones.
+	Response: { "changes": {...}, "deleted": {...}, "next": <cursor>, "has_more": bool }
+	A cursor older than the log's retention gets 410 { "resync": true,
+	"next": <cursor> }: reload the full lists, then sync from that cursor.
+	"""
+	employee_id = request.query_params.get('employee')
+	hr_id = request.query_params.get('hr_id')
+	since = request.query_params.get('since')
+	if bool(employee_id) == bool(hr_id):
+		return Response({'error': 'Provide exactly one of employee or hr_id'}, status=status.HTTP_400_BAD_REQUEST)
+	try:
+		scope = {'employee_id': int(employee_id)} if employee_id else {'hr_id': int(hr_id)}
+		limit = min(int(request.query_params.get('limit') or DEFAULT_SYNC_LIMIT), MAX_SYNC_LIMIT)
+		since = int(since) if since else None
+	except ValueError:
+		return Response({'error': 'employee, hr_id, since and limit must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+	if since is None:
+		return Response({'changes': {}, 'deleted': {}, 'next': head_cursor(), 'has_more': False})
+	if since < 0 or limit < 1:
+		return Response({'error': 'since must be >= 0 and limit positive'}, status=status.HTTP_400_BAD_REQUEST)
+	if cursor_expired(since):
+		# the entries after this cursor were pruned: start over from a full load
+		return Response(
+			{'error': 'Cursor expired; reload the full lists and sync from next', 'resync': True, 'next': head_cursor()},
+			status=status.HTTP_410_GONE,
+		)
+	return Response(changes_since(since, limit=limit, **scope))
 
 
 # --- Attendance Endpoints ---
@@ -314,24 +520,57 @@ def attendance_mark(request):
 	emp_id = request.data.get('employee')
 	if not emp_id:
 		return Response({'error': 'Employee ID required'}, status=status.HTTP_400_BAD_REQUEST)
-	employee = get_object_or_404(Employee, id=emp_id)
+	try:
+		emp_id = int(emp_id)
+	except (TypeError, ValueError):
+		return Response({'error': 'Employee ID must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
 	today = timezone.localdate()
+	now = timezone.localtime().time()
+	# fast path: the first check-in of the day is a single guarded insert
+	attendance = run_write(_check_in_new, emp_id, today, now)
+	if attendance is not None:
+		serializer = AttendanceSerializer(attendance)
+		return Response(serializer.data, status=status.HTTP_200_OK)
+
+	# slow path: unknown employee, approved leave, or a row already exists
+	employee = get_object_or_404(Employee, id=emp_id)
 	# Prevent marking Present on approved leave
 	if Leave.objects.filter(employee=employee, start_date__lte=today, end_date__gte=today, status='Approved').exists():
 		return Response({'error': 'Leave approved for today; cannot mark Present.'}, status=status.HTTP_400_BAD_REQUEST)
 	# create or update attendance
-	now = timezone.localtime().time()
-	attendance, created = Attendance.objects.get_or_create(employee=employee, date=today, defaults={'status': 'Present', 'check_in': now})
-	if not created:
-		# if existing, update check_in if missing
-		if not attendance.check_in:
-			attendance.check_in = now
-			attendance.status = 'Present'
-			attendance.save()
+	attendance = run_write(_check_in_existing, employee, today, now)
 	serializer = AttendanceSerializer(attendance)
 	return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+def _check_in_new(emp_id, today, now):
+	with transaction.atomic():
+		attendance = insert_check_in(emp_id, today, now)
+		if attendance is not None:
+			employee = attendance.employee
+			record_attendance_changes([(employee.id, employee.department, today, None, snapshot(attendance))])
+			# raw SQL sends no post_save, so evict dependent responses here
+			invalidate_on_commit('Attendance')
+			log_upserts(Attendance.objects.filter(pk=attendance.id))
+	return attendance
+
+
+def _check_in_existing(employee, today, now):
+	with transaction.atomic():
+		attendance, created = Attendance.objects.get_or_create(employee=employee, date=today, defaults={'status': 'Present', 'check_in': now})
+		if not created:
+			# if existing, update check_in if missing
+			if not attendance.check_in:
+				before = snapshot(attendance)
+				attendance.check_in = now
+				attendance.status = 'Present'
+				attendance.save()
+				record_attendance_changes([(employee.id, employee.department, today, before, snapshot(attendance))])
+		else:
+			record_attendance_changes([(employee.id, employee.department, today, None, snapshot(attendance))])
+	return attendance
+
+
 @api_view(['POST'])
 def attendance_checkout(request):
 	"""Employee updates check_out for the day."""
@@ -343,35 +582,84 @@ def attendance_checkout(request):
 	try:
 		attendance = Attendance.objects.get(employee=employee, date=today)
 		now = timezone.localtime().time()
+		before = snapshot(attendance)
 		attendance.check_out = now
-		attendance.save()
+		run_write(_check_out, attendance, employee, before)
 		serializer = AttendanceSerializer(attendance)
 		return Response(serializer.data)
 	except Attendance.DoesNotExist:
 		return Response({'error': 'No attendance record for today'}, status=status.HTTP_404_NOT_FOUND)
 
 
+def _check_out(attendance, employee, before):
+	with transaction.atomic():
+		attendance.save()
+		record_attendance_changes([(employee.id, employee.department, attendance.date, before, snapshot(attendance))])
+
+
 @api_view(['GET'])
+@read_replica
 def attendance_list(request):
-	"""HR: list attendance with filters: date, range (weekly/monthly), employee, department"""
-	qs = Attendance.objects.select_related('employee')
-	date = request.query_params.get('date')
-	range_param = request.query_params.get('range')
-	employee_id = request.query_params.get('employee')
-	employee_query = request.query_params.get('q')
-	department = request.query_params.get('department')
-	start_date = request.query_params.get('start_date')
-	end_date = request.query_params.get('end_date')
+	"""HR: list attendance with filters: date, range (weekly/monthly), employee, department
+
+	Paginated by (date, id) keyset: ?page_size=<n>&cursor=<next>&ordering=date|-date
+	Response: { "results": [...], "next": <cursor or null> }
+	With ?stream=1 the full filtered list is streamed as a JSON array instead.
+	?fields=a,b,... limits each page row to those fields.
+	"""
+	qs = _filter_records(Attendance.objects.select_related('employee'), request.query_params, 'date')
+
+	# ordering is limited to the (date, id) keysets the pager can seek on
+	ordering = request.query_params.get('ordering') or 'date'
+	if ordering not in ATTENDANCE_ORDERINGS:
+		return Response({'error': 'ordering must be one of: ' + ', '.join(ATTENDANCE_ORDERINGS)}, status=status.HTTP_400_BAD_REQUEST)
+
+	# ?stream=1 walks the whole result set as a chunked JSON array
+	if request.query_params.get('stream') in ('1', 'true'):
+		return stream_json_array(qs.order_by(*ATTENDANCE_ORDERINGS[ordering]), AttendanceSerializer)
+
+	try:
+		names = ATTENDANCE_LIST.parse(request.query_params.get('fields'))
+		page_size = parse_page_size(request.query_params.get('page_size'))
+		# the pager reads date and id off each row for the next cursor
+		rows = ATTENDANCE_LIST.queryset(qs, names, keys=('date', 'id'))
+		rows, next_cursor = keyset_page(rows, ordering, request.query_params.get('cursor'), page_size)
+	except (CursorError, FieldsetError) as e:
+		return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+	return Response({'results': ATTENDANCE_LIST.render(rows, names), 'next': next_cursor})
+
+
+def _filter_records(qs, params, date_field, end_field=None):
+	"""Apply the attendance_list filters to any employee-owned queryset.
+
+	date / range (weekly|monthly) / start_date+end_date filter on date_field;
+	with end_field the record is a span (a leave) and matches when it overlaps
+	the window. employee (id), q (id or name) and department filter on the
+	owning employee.
+	"""
+	end_field = end_field or date_field
+	date = params.get('date')
+	range_param = params.get('range')
+	employee_id = params.get('employee')
+	employee_query = params.get('q')
+	department = params.get('department')
+	start_date = params.get('start_date')
+	end_date = params.get('end_date')
+
+	def window(start, end):
+		return {f'{date_field}__lte': end, f'{end_field}__gte': start}
 
 	if date:
-		qs = qs.filter(date=date)
+		qs = qs.filter(**window(date, date))
 	if range_param == 'weekly':
 		today = timezone.localdate()
 		start = today - timedelta(days=today.weekday())
-		qs = qs.filter(date__gte=start)
+		qs = qs.filter(**{f'{end_field}__gte': start})
 	if range_param == 'monthly':
 		today = timezone.localdate()
-		qs = qs.filter(date__year=today.year, date__month=today.month)
+		start = today.replace(day=1)
+		end = (start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+		qs = qs.filter(**window(start, end))
 	# support employee id or name search via 'employee' (id) or 'q' (name or id)
 	if employee_id:
 		qs = qs.filter(employee_id=employee_id)
@@ -380,31 +668,104 @@ def attendance_list(request):
 		if employee_query.isdigit():
 			qs = qs.filter(employee_id=int(employee_query))
 		else:
-			qs = qs.filter(employee__name__icontains=employee_query)
+			ids = search_employee_ids(employee_query, columns=('name',), limit=None)
+			if ids is not None:
+				qs = qs.filter(employee_id__in=ids)
+			else:
+				qs = qs.filter(employee__name__icontains=employee_query)
 	if department:
 		qs = qs.filter(employee__department__iexact=department)
 	if start_date and end_date:
-		qs = qs.filter(date__range=[start_date, end_date])
+		qs = qs.filter(**window(start_date, end_date))
+	return qs
+
+
+ATTENDANCE_EXPORT_COLUMNS = (
+	('id', 'id'), ('employee_id', 'employee_id'), ('employee_name', 'employee__name'),
+	('department', 'employee__department'), ('date', 'date'), ('status', 'status'),
+	('check_in', 'check_in'), ('check_out', 'check_out'),
+)
+LEAVE_EXPORT_COLUMNS = (
+	('id', 'id'), ('employee_id', 'employee_id'), ('employee_name', 'employee__name'),
+	('department', 'employee__department'), ('start_date', 'start_date'), ('end_date', 'end_date'),
+	('status', 'status'), ('reason', 'reason'), ('created_at', 'created_at'),
+)
+TASK_EXPORT_COLUMNS = (
+	('id', 'id'), ('hr_id', 'hr_id'), ('employee_id', 'employee_id'), ('employee_name', 'employee__name'),
+	('department', 'employee__department'), ('title', 'title'), ('priority', 'priority'),
+	('status', 'status'), ('due_date', 'due_date'), ('created_at', 'created_at'),
+)
+
+
+def _export(request, qs, columns, filename):
+	try:
+		return stream_export(
+			qs.order_by('id'), columns,
+			fmt=request.query_params.get('as') or 'csv',
+			compress=request.query_params.get('compress'),
+			filename=filename,
+		)
+	except ExportError as e:
+		return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['GET'])
+@read_replica
+def attendance_export(request):
+	"""HR: stream attendance as a file. Takes the attendance_list filters plus
+	?as=csv|ndjson (default csv) and ?compress=gzip.
+	"""
+	qs = _filter_records(Attendance.objects.all(), request.query_params, 'date')
+	return _export(request, qs, ATTENDANCE_EXPORT_COLUMNS, 'attendance')
+
+
+@api_view(['GET'])
+@read_replica
+def leave_export(request):
+	"""HR: stream leaves as a file. Takes the attendance_list filters (dates
+	match leaves overlapping the window) plus ?status=, ?as= and ?compress=.
+	"""
+	qs = _filter_records(Leave.objects.all(), request.query_params, 'start_date', 'end_date')
+	if request.query_params.get('status'):
+		qs = qs.filter(status=request.query_params['status'])
+	return _export(request, qs, LEAVE_EXPORT_COLUMNS, 'leaves')
 
-	# ordering
-	ordering = request.query_params.get('ordering')
-	if ordering:
-		qs = qs.order_by(ordering)
 
-	serializer = AttendanceSerializer(qs, many=True)
-	return Response(serializer.data)
+@api_view(['GET'])
+@read_replica
+def tasks_export(request):
+	"""HR: stream tasks as a file. Takes the attendance_list filters (dates
+	apply to due_date) plus ?hr_id=, ?status=, ?as= and ?compress=.
+	"""
+	qs = _filter_records(Task.objects.all(), request.query_params, 'due_date')
+	if request.query_params.get('hr_id'):
+		qs = qs.filter(hr_id=request.query_params['hr_id'])
+	if request.query_params.get('status'):
+		qs = qs.filter(status=request.query_params['status'])
+	return _export(request, qs, TASK_EXPORT_COLUMNS, 'tasks')
 
 
 @api_view(['PUT'])
 def attendance_update(request, pk):
 	"""HR can update/correct attendance record."""
 	try:
-		att = Attendance.objects.get(pk=pk)
+		att = Attendance.objects.select_related('employee').get(pk=pk)
 	except Attendance.DoesNotExist:
 		return Response({'error': 'Attendance not found'}, status=status.HTTP_404_NOT_FOUND)
+	before = snapshot(att)
 	serializer = AttendanceSerializer(att, data=request.data, partial=True)
 	if serializer.is_valid():
-		serializer.save()
+		with transaction.atomic():
+			old_employee = att.employee
+			if serializer.validated_data.get('employee', old_employee).pk != old_employee.pk:
+				# the old employee's sync clients must drop the row
+				log_moved_out(att, old_employee)
+			att = serializer.save()
+			# the row may have been moved to another employee; count it out and back in
+			record_attendance_changes([
+				(old_employee.id, old_employee.department, att.date, before, None),
+				(att.employee_id, att.employee.department, att.date, None, snapshot(att)),
+			])
 		return Response(serializer.data)
 
 	# return validation errors if any
@@ -417,34 +778,43 @@ def change_password(request):
 
 	Expects JSON body: { old_password, new_password, confirm_password }
 	"""
-	# Support two modes:
-	# 1) Authenticated request: use request.user.email
-	# 2) Unauthenticated request: accept 'email' or 'employee' (id) in the JSON body
-	user = request.user
-	email = None
-	if getattr(user, 'is_authenticated', False):
-		email = getattr(user, 'email', None)
-	# fallback to values provided in payload for unauthenticated requests
-	if not email:
-		email = request.data.get('email')
-		# also accept numeric employee id under 'employee' or 'employee_id'
+	identity = token_user(request)
+	if identity is not None:
+		# the token names the employee
+		if not identity.is_employee:
+			return Response({'error': 'Only employees can change their password here'}, status=status.HTTP_403_FORBIDDEN)
+		emp = Employee.objects.filter(pk=identity.id).first()
+		if emp is None:
+			return Response({'error': 'Employee not found'}, status=status.HTTP_404_NOT_FOUND)
+	else:
+		# Support two modes:
+		# 1) Authenticated request: use request.user.email
+		# 2) Unauthenticated request: accept 'email' or 'employee' (id) in the JSON body
+		user = request.user
+		email = None
+		if getattr(user, 'is_authenticated', False):
+			email = getattr(user, 'email', None)
+		# fallback to values provided in payload for unauthenticated requests
 		if not email:
-			emp_id = request.data.get('employee') or request.data.get('employee_id')
-			if emp_id:
-				try:
-					emp_lookup = Employee.objects.get(pk=int(emp_id))
-					email = emp_lookup.email
-				except Exception:
-					email = None
-
-	if not email:
-		# if we still don't have an email, require the client to provide it
-		return Response({'error': 'Email or employee id required'}, status=status.HTTP_400_BAD_REQUEST)
+			email = request.data.get('email')
+			# also accept numeric employee id under 'employee' or 'employee_id'
+			if not email:
+				emp_id = request.data.get('employee') or request.data.get('employee_id')
+				if emp_id:
+					try:
+						emp_lookup = Employee.objects.get(pk=int(emp_id))
+						email = emp_lookup.email
+					except Exception:
+						email = None
 
-	try:
-		emp = Employee.objects.get(email=email)
-	except Employee.DoesNotExist:
-		return Response({'error': 'Employee not found'}, status=status.HTTP_404_NOT_FOUND)
+		if not email:
+			# if we still don't have an email, require the client to provide it
+			return Response({'error': 'Email or employee id required'}, status=status.HTTP_400_BAD_REQUEST)
+
+		try:
+			emp = Employee.objects.get(email=email)
+		except Employee.DoesNotExist:
+			return Response({'error': 'Employee not found'}, status=status.HTTP_404_NOT_FOUND)
 
 	old_password = request.data.get('old_password')
 	new_password = request.data.get('new_password')
@@ -463,57 +833,146 @@ def change_password(request):
 	if new_password == old_password:
 		return Response({'error': 'New password must be different from old password'}, status=status.HTTP_400_BAD_REQUEST)
 
-	# set and save new password
+	# set and save new password; tokens issued before the change stop working
 	emp.set_password(new_password)
 	emp.save()
-	return Response({'message': 'Password updated successfully'})
+	revoke_subject('employee', emp.id)
+	return Response({'message': 'Password updated successfully', 'token': issue_token('employee', emp.id, emp.hr_id)})
 
 
 @api_view(['GET'])
+@read_replica
 def attendance_stats_employee(request):
 	"""Return stats for an employee: total leaves taken, pending leaves, attendance %"""
 	emp_id = request.query_params.get('employee')
 	if not emp_id:
 		return Response({'error': 'Employee ID required'}, status=status.HTTP_400_BAD_REQUEST)
 	try:
-		total_leaves = Leave.objects.filter(employee_id=emp_id, status='Approved').count()
-		pending_leaves = Leave.objects.filter(employee_id=emp_id, status='Pending').count()
-		total_days = Attendance.objects.filter(employee_id=emp_id).count()
-		present_days = Attendance.objects.filter(employee_id=emp_id, status='Present').count()
-		attendance_percent = (present_days / total_days * 100) if total_days > 0 else 0
+		stats = employee_stats([int(emp_id)]).get(int(emp_id), EMPTY_EMPLOYEE_STATS)
 		return Response({
-			'total_leaves': total_leaves,
-			'pending_leaves': pending_leaves,
-			'attendance_percent': round(attendance_percent, 2)
+			'total_leaves': stats['approved_leaves'],
+			'pending_leaves': stats['pending_leaves'],
+			'attendance_percent': stats['attendance_percent']
 		})
+	except ValueError:
+		return Response({'error': 'Employee ID must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
 	except Exception as e:
 		return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
 @api_view(['GET'])
+@read_replica
+def attendance_stats_team(request):
+	"""Return stats for many employees in one request and one query.
+	Query params: ?employees=<id>,<id>,... or ?hr_id=<id> (everyone managed by that HR)
+	Response: [ { "employee_id", "employee_name", "total_leaves", "pending_leaves",
+	              "total_days", "present_days", "attendance_percent" }, ... ]
+	"""
+	ids_param = request.query_params.get('employees')
+	hr_id = request.query_params.get('hr_id')
+	try:
+		if ids_param:
+			employee_ids = [int(i) for i in ids_param.split(',') if i.strip()]
+		elif hr_id:
+			employee_ids = Employee.objects.filter(hr_id=int(hr_id)).values('id')
+		else:
+			return Response({'error': 'employees or hr_id query param required'}, status=status.HTTP_400_BAD_REQUEST)
+	except ValueError:
+		return Response({'error': 'Employee and HR ids must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+	data = [
+		{
+			'employee_id': s['id'],
+			'employee_name': s['name'],
+			'total_leaves': s['approved_leaves'],
+			'pending_leaves': s['pending_leaves'],
+			'total_days': s['total_days'],
+			'present_days': s['present_days'],
+			'attendance_percent': s['attendance_percent'],
+		}
+		for s in employee_stats(employee_ids).values()
+	]
+	return Response(data)
+
+
+def _days_window(request):
+	"""Parse ?days=<n> into the first date of the window (None when absent)."""
+	days = request.query_params.get('days')
+	if not days:
+		return None
+	days = int(days)
+	if days < 1:
+		raise ValueError(days)
+	return timezone.localdate() - timedelta(days=days - 1)
+
+
+@api_view(['GET'])
+@cached_response('attendance-punctuality', tags=('Employee', 'Attendance'))
+@read_replica
+def attendance_punctuality(request):
+	"""Return average, median and p90 check-in per employee or department.
+	Query params: ?group=employee|department (default employee), ?limit=<n>,
+	?days=<n> (default PUNCTUALITY_DEFAULT_DAYS)
+	Response: [ { "employee_id", "employee_name" (or "department"), "samples",
+	              "avg_check_in", "median_check_in", "p90_check_in", ...seconds }, ... ]
+	"""
+	group = request.query_params.get('group') or 'employee'
+	if group not in ('employee', 'department'):
+		return Response({'error': 'group must be employee or department'}, status=status.HTTP_400_BAD_REQUEST)
+	try:
+		since = _days_window(request)
+		limit = request.query_params.get('limit')
+		limit = int(limit) if limit else None
+		# SQLite reads LIMIT -1 as no limit
+		if limit is not None and limit < 1:
+			raise ValueError(limit)
+	except ValueError:
+		return Response({'error': 'days and limit must be positive integers'}, status=status.HTTP_400_BAD_REQUEST)
+	return Response(check_in_distribution(group, since=since, limit=limit))
+
+
+@api_view(['GET'])
+@cached_response('attendance-stats-hr', tags=('Employee', 'Attendance'))
+@read_replica
 def attendance_stats_hr(request):
-	"""Return HR analytics: department-wise attendance %, top punctual, lowest attendance"""
+	"""Return HR analytics: department-wise attendance %, top punctual, lowest attendance
+	Query params: ?days=<n> limits the punctuality ranking to the last n days
+	"""
 	try:
-		# department-wise attendance %
-		dept_stats = Employee.objects.values('department').annotate(
-			total=Count('attendances'),
-			present=Count('attendances', filter=Q(attendances__status='Present'))
-		)
+		since = _days_window(request)
+	except ValueError:
+		return Response({'error': 'days must be a positive integer'}, status=status.HTTP_400_BAD_REQUEST)
+	try:
+		# department-wise attendance %, from the per-department daily rollups
+		dept_stats = {
+			d['department']: d
+			for d in DepartmentDailyRollup.objects.values('department').annotate(
+				total=Sum(ROLLUP_TOTAL_DAYS),
+				present=Sum('present')
+			)
+		}
 		dept_summary = []
-		for d in dept_stats:
+		for department in Employee.objects.order_by('department').values_list('department', flat=True).distinct():
+			d = dept_stats.get(department, {'total': 0, 'present': 0})
 			pct = (d['present'] / d['total'] * 100) if d['total'] > 0 else 0
-			dept_summary.append({'department': d['department'], 'attendance_percent': round(pct, 2)})
+			dept_summary.append({'department': department, 'attendance_percent': round(pct, 2)})
 
 		# top punctual employees (earliest average check_in)
-		punctual = Attendance.objects.filter(check_in__isnull=False).values('employee__id', 'employee__name').annotate(avg_check_in=Count('check_in')).order_by('avg_check_in')[:5]
+		punctual = [
+			{'employee__id': p['employee_id'], 'employee__name': p['employee_name'], 'avg_check_in': p['avg_check_in'],
+			 'median_check_in': p['median_check_in'], 'p90_check_in': p['p90_check_in']}
+			for p in check_in_distribution('employee', since=since, limit=5)
+		]
 
 		# lowest attendance employees
-		lowest = Employee.objects.annotate(total=Count('attendances'), present=Count('attendances', filter=Q(attendances__status='Present'))).order_by('present')[:5]
+		lowest = Employee.objects.annotate(
+			total=Coalesce(Sum(F('attendance_rollups__present') + F('attendance_rollups__leave') + F('attendance_rollups__absent')), 0),
+			present=Coalesce(Sum('attendance_rollups__present'), 0)
+		).order_by('present')[:5]
 		lowest_list = [{'employee': e.name, 'present': e.present, 'total': e.total} for e in lowest]
 
 		return Response({
 			'departments': dept_summary,
-			'top_punctual': list(punctual),
+			'top_punctual': punctual,
 			'lowest_attendance': lowest_list
 		})
 	except Exception as e:
@@ -539,30 +998,45 @@ def _get_employee_by_id(emp_id):
     except (Employee.DoesNotExist, ValueError, TypeError):
         return None
 
+def _token_forbidden():
+    return Response({"error": TOKEN_FORBIDDEN}, status=status.HTTP_403_FORBIDDEN)
+
 @api_view(['GET', 'POST'])
+@conditional_collection('tasks')
 def tasks_list_create(request):
     """
     GET: list tasks for a given HR (requires ?hr_id=<id>)
     POST: create task - requires 'hr' (id) in body (or 'hr_id'); 'employee' id and task fields.
     """
+    identity = token_user(request)
     if request.method == 'GET':
         hr_id = request.query_params.get('hr_id')
+        if identity is not None:
+            hr_id = token_id(identity, 'hr', hr_id)
+            if hr_id is None:
+                return _token_forbidden()
+        else:
+            if not hr_id:
+                return Response({"error": "hr_id query param required"}, status=status.HTTP_400_BAD_REQUEST)
+            hr = _get_hr_by_id(hr_id)
+            if not hr:
+                return Response({"error": "HR not found"}, status=status.HTTP_404_NOT_FOUND)
+            hr_id = hr.id
+        return _list_response(request, Task.objects.filter(hr_id=hr_id).order_by('-created_at'), TASK_LIST)
+
+    # POST
+    hr_id = request.data.get('hr') or request.data.get('hr_id')
+    if identity is not None:
+        hr_id = token_id(identity, 'hr', hr_id)
+        if hr_id is None:
+            return _token_forbidden()
+    else:
         if not hr_id:
-            return Response({"error": "hr_id query param required"}, status=status.HTTP_400_BAD_REQUEST)
+            return Response({"error": "'hr' (id) is required in request body"}, status=status.HTTP_400_BAD_REQUEST)
         hr = _get_hr_by_id(hr_id)
         if not hr:
             return Response({"error": "HR not found"}, status=status.HTTP_404_NOT_FOUND)
-        tasks = Task.objects.filter(hr=hr).order_by('-created_at')
-        serializer = TaskSerializer(tasks, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
-
-    # POST
-    hr_id = request.data.get('hr') or request.data.get('hr_id')
-    if not hr_id:
-        return Response({"error": "'hr' (id) is required in request body"}, status=status.HTTP_400_BAD_REQUEST)
-    hr = _get_hr_by_id(hr_id)
-    if not hr:
-        return Response({"error": "HR not found"}, status=status.HTTP_404_NOT_FOUND)
+        hr_id = hr.id
 
     # ensure employee exists
     emp_id = request.data.get('employee')
@@ -573,28 +1047,29 @@ def tasks_list_create(request):
         return Response({"error": "Employee not found"}, status=status.HTTP_404_NOT_FOUND)
 
     data = request.data.copy()
-    data['hr'] = hr.id
+    data['hr'] = hr_id
     serializer = TaskSerializer(data=data)
     if serializer.is_valid():
-        serializer.save()
+        task = serializer.save()
+        broker.publish_on_commit('task.created', serializer.data, task_channels(task))
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 @api_view(['GET'])
+@read_replica
+@conditional_collection('tasks')
 def tasks_my_tasks(request):
     """
     GET: list tasks for an employee (requires ?employee_id=<id> or ?employee=<id>)
     """
-    employee_id = request.query_params.get('employee_id') or request.query_params.get('employee')
-    if not employee_id:
-        return Response({"error": "employee_id query param required"}, status=status.HTTP_400_BAD_REQUEST)
-    employee = _get_employee_by_id(employee_id)
-    if not employee:
+    try:
+        employee_id, vouched = my_tasks_employee(request.query_params, token_user(request))
+    except EndpointError as e:
+        return Response({"error": e.message}, status=e.status_code)
+    if not vouched and not Employee.objects.filter(pk=employee_id).exists():
         return Response({"error": "Employee not found"}, status=status.HTTP_404_NOT_FOUND)
 
-    tasks = Task.objects.filter(employee=employee).order_by('-created_at')
-    serializer = TaskSerializer(tasks, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    return _list_response(request, Task.objects.filter(employee_id=employee_id).order_by('-created_at'), TASK_LIST)
 
 @api_view(['PATCH'])
 def tasks_update_status(request, pk):
@@ -603,18 +1078,25 @@ def tasks_update_status(request, pk):
     Only the owning employee may update their task.
     """
     employee_id = request.data.get('employee') or request.query_params.get('employee_id')
-    if not employee_id:
-        return Response({"error": "employee id required (body 'employee' or ?employee_id)"}, status=status.HTTP_400_BAD_REQUEST)
-    employee = _get_employee_by_id(employee_id)
-    if not employee:
-        return Response({"error": "Employee not found"}, status=status.HTTP_404_NOT_FOUND)
+    identity = token_user(request)
+    if identity is not None:
+        employee_id = token_id(identity, 'employee', employee_id)
+        if employee_id is None:
+            return Response({"error": "You may only modify your own tasks"}, status=status.HTTP_403_FORBIDDEN)
+    else:
+        if not employee_id:
+            return Response({"error": "employee id required (body 'employee' or ?employee_id)"}, status=status.HTTP_400_BAD_REQUEST)
+        employee = _get_employee_by_id(employee_id)
+        if not employee:
+            return Response({"error": "Employee not found"}, status=status.HTTP_404_NOT_FOUND)
+        employee_id = employee.id
 
     try:
-        task = Task.objects.get(pk=pk)
+        task = Task.objects.select_related('hr', 'employee').get(pk=pk)
     except Task.DoesNotExist:
         return Response({"error": "Task not found"}, status=status.HTTP_404_NOT_FOUND)
 
-    if task.employee_id != employee.id:
+    if task.employee_id != employee_id:
         return Response({"error": "You may only modify your own tasks"}, status=status.HTTP_403_FORBIDDEN)
 
     allowed = {'status'}
@@ -624,6 +1106,7 @@ def tasks_update_status(request, pk):
 
     serializer = TaskSerializer(task, data=update_data, partial=True)
     if serializer.is_valid():
-        serializer.save()
+        run_write(serializer.save)
+        broker.publish_on_commit('task.updated', serializer.data, task_channels(task))
         return Response(serializer.data, status=status.HTTP_200_OK)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
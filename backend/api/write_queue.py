@@ -0,0 +1,132 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import connection, transaction
+
+
+# Single-writer queue for SQLite: every write transaction is handed to one
+# thread, which drains whatever has queued up and commits it as one group.
+# Each item runs in its own savepoint, so a failing write is rolled back and
+# reported to its caller without aborting the rest of the group.
+#
+# Every write an employee or HR makes in the normal course of a day goes
+# through run_write(): leave requests and decisions (single and bulk),
+# check-in and check-out, task status updates, employee creation and CSV
+# import chunks. Password hashes are computed before a write is queued, so
+# the writer never waits on the password pool. Rare administrative edits
+# (employee update/delete, attendance corrections, task creation, password
+# changes, logout revocations) still write on the request thread: they
+# cannot build up contention, and SQLite's busy timeout covers the odd clash.
+
+
+class WriteQueue:
+
+	def __init__(self, max_batch=64, max_delay=0.002):
+		self.max_batch = max_batch
+		self.max_delay = max_delay
+		self._queue = queue.Queue()
+		self._lock = threading.Lock()
+		self._thread = None
+		self._stats = {
+			'submitted': 0,
+			'committed': 0,
+			'failed': 0,
+			'batches': 0,
+			'max_batch_size': 0,
+			'commit_seconds_total': 0.0,
+			'commit_seconds_max': 0.0,
+			'commit_seconds_last': 0.0,
+		}
+
+	def _ensure_thread(self):
+		with self._lock:
+			if self._thread is None or not self._thread.is_alive():
+				self._thread = threading.Thread(target=self._run, name='db-writer', daemon=True)
+				self._thread.start()
+
+	def submit(self, fn, *args, **kwargs):
+		"""Queue fn(*args, **kwargs) for the writer thread; returns a Future."""
+		future = Future()
+		self._ensure_thread()
+		with self._lock:
+			self._stats['submitted'] += 1
+		self._queue.put((fn, args, kwargs, future))
+		return future
+
+	def run(self, fn, *args, **kwargs):
+		"""Run fn on the writer thread and wait for its committed result."""
+		return self.submit(fn, *args, **kwargs).result()
+
+	def _next_batch(self):
+		batch = [self._queue.get()]
+		deadline = time.monotonic() + self.max_delay
+		while len(batch) < self.max_batch:
+			remaining = deadline - time.monotonic()
+			try:
+				batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+			except queue.Empty:
+				break
+		return batch
+
+	def _run(self):
+		while True:
+			batch = self._next_batch()
+			results = []
+			start = time.perf_counter()
+			try:
+				with transaction.atomic():
+					for fn, args, kwargs, future in batch:
+						try:
+							with transaction.atomic():
+								results.append((future, fn(*args, **kwargs), None))
+						except Exception as e:
+							results.append((future, None, e))
+			except Exception as e:
+				# the group commit itself failed: nothing in the batch was written
+				results = [(future, None, e) for _, _, _, future in batch]
+				connection.close()
+			elapsed = time.perf_counter() - start
+			self._record(len(batch), elapsed, results)
+			for future, value, error in results:
+				if error is not None:
+					future.set_exception(error)
+				else:
+					future.set_result(value)
+
+	def _record(self, size, elapsed, results):
+		failed = sum(1 for _, _, error in results if error is not None)
+		with self._lock:
+			stats = self._stats
+			stats['batches'] += 1
+			stats['committed'] += size - failed
+			stats['failed'] += failed
+			stats['max_batch_size'] = max(stats['max_batch_size'], size)
+			stats['commit_seconds_total'] += elapsed
+			stats['commit_seconds_max'] = max(stats['commit_seconds_max'], elapsed)
+			stats['commit_seconds_last'] = elapsed
+
+	def stats(self):
+		"""Response: queue depth, totals and group-commit latency (seconds)."""
+		with self._lock:
+			stats = dict(self._stats)
+		stats['queue_depth'] = self._queue.qsize()
+		stats['commit_seconds_avg'] = stats['commit_seconds_total'] / stats['batches'] if stats['batches'] else 0.0
+		stats['enabled'] = getattr(settings, 'WRITE_QUEUE_ENABLED', False)
+		return stats
+
+
+writer = WriteQueue(
+	max_batch=getattr(settings, 'WRITE_QUEUE_MAX_BATCH', 64),
+	max_delay=getattr(settings, 'WRITE_QUEUE_MAX_DELAY_MS', 2) / 1000,
+)
+
+
+def run_write(fn, *args, **kwargs):
+	"""Run a write through the single-writer queue when WRITE_QUEUE_ENABLED,
+	otherwise directly on the calling thread."""
+	if getattr(settings, 'WRITE_QUEUE_ENABLED', False):
+		return writer.run(fn, *args, **kwargs)
+	return fn(*args, **kwargs)
@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -42,13 +44,18 @@ INSTALLED_APPS = [
     'api',
     
 ]
-CORS_ALLOW_ALL_ORIGINS = True
+# Credentialed requests (the read-your-writes cookie, see below) are only
+# allowed from the frontend's origins; never combine them with
+# CORS_ALLOW_ALL_ORIGINS, which would let any site read responses as the user.
+CORS_ALLOW_CREDENTIALS = True
 
 CORS_ALLOWED_ORIGINS =[
      'http://localhost:5173',
     'http://127.0.0.1:5173',
  ]
 MIDDLEWARE = [
+    'api.metrics.RequestMetricsMiddleware',
+    'api.profiling.RequestProfilerMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -57,6 +64,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.db_router.ReadYourWritesMiddleware',
 ]
 
 ROOT_URLCONF = 'backend.urls'
@@ -86,9 +94,54 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # reuse connections across requests, checking them before reuse
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# SQLite mode: 'default' keeps Django's stock connection; 'wal' configures each
+# connection for concurrent use (WAL journal, synchronous=NORMAL, busy timeout,
+# mmap), keeps connections open, and routes writes through the single-writer
+# group-commit queue in api/write_queue.py.
+SQLITE_MODE = os.environ.get('HR_SQLITE_MODE', 'default')
+if SQLITE_MODE == 'wal':
+    DATABASES['default'].update({
+        'OPTIONS': {
+            'init_command': (
+                'PRAGMA journal_mode=WAL;'
+                'PRAGMA synchronous=NORMAL;'
+                'PRAGMA busy_timeout=5000;'
+                'PRAGMA mmap_size=268435456;'
+            ),
+            # take the write lock at BEGIN instead of failing on upgrade
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 5,
+        },
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+    })
+WRITE_QUEUE_ENABLED = SQLITE_MODE == 'wal'
+WRITE_QUEUE_MAX_BATCH = 64
+WRITE_QUEUE_MAX_DELAY_MS = 2
+
+# Read replicas: HR_READ_REPLICAS=<n> adds aliases replica1..replicaN backed by
+# db.replicaN.sqlite3, kept in sync by `manage.py replicate_sqlite`. Views marked
+# @read_replica read from them; everything else, and any client that wrote in
+# the last REPLICA_STICKY_SECONDS, uses the primary. That pin is a signed
+# cookie, so browsers on another origin must send credentials (the frontend
+# sets axios withCredentials, hence CORS_ALLOW_CREDENTIALS).
+READ_REPLICAS = []
+for _i in range(1, int(os.environ.get('HR_READ_REPLICAS', '0')) + 1):
+    DATABASES[f'replica{_i}'] = {
+        **DATABASES['default'],
+        'NAME': BASE_DIR / f'db.replica{_i}.sqlite3',
+        'TEST': {'MIRROR': 'default'},
+    }
+    READ_REPLICAS.append(f'replica{_i}')
+DATABASE_ROUTERS = ['api.db_router.ReadReplicaRouter']
+REPLICA_STICKY_SECONDS = 5
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -131,4 +184,104 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 DEBUG = True
-ALLOWED_HOSTS = ['*']
\ No newline at end of file
+ALLOWED_HOSTS = ['*']
+# Outbox delivery (see api/outbox.py and `manage.py drain_outbox`)
+OUTBOX_ENDPOINTS = {
+    'welcome_email': 'http://localhost:3001/send-welcome-email',
+}
+OUTBOX_BATCH_SIZE = 50
+OUTBOX_MAX_ATTEMPTS = 8
+OUTBOX_BACKOFF_SECONDS = 30
+OUTBOX_HTTP_TIMEOUT = 5
+
+# Dashboard response cache (see api/cache.py). LocMem is per process; point
+# 'default' at django.core.cache.backends.filebased.FileBasedCache to share
+# entries, tag versions and hit/miss counters between worker processes.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'hr-portal',
+    }
+}
+RESPONSE_CACHE_TIMEOUT = 300
+
+# Delta sync log (api/changelog.py): `manage.py prune_changelog` deletes entries
+# older than this; clients holding an older cursor get 410 and reload.
+CHANGELOG_RETENTION_DAYS = 30
+
+# Check-in percentiles (api/stats.py) rank this many recent days unless the
+# request passes ?days=<n>.
+PUNCTUALITY_DEFAULT_DAYS = 90
+
+# Server-Sent Events (see api/events.py). The pub/sub is in-process, so serve
+# backend.asgi with a single worker process for every stream to see every event.
+EVENTS_REPLAY_SIZE = 1000
+EVENTS_SUBSCRIBER_QUEUE = 100
+EVENTS_HEARTBEAT_SECONDS = 15
+EVENTS_RETRY_MS = 3000
+
+# Request metrics served at /metrics (see api/metrics.py). Worker processes
+# share counters through files in this directory; clear it on every server
+# start so counters of old processes are not added in.
+METRICS_DIR = os.environ.get('HR_METRICS_DIR', os.path.join(tempfile.gettempdir(), 'hr-portal-metrics'))
+
+# Request profiler (see api/profiling.py and `manage.py profiles`). Requests
+# carrying a valid X-Profile-Token header are always profiled; set a sample
+# rate (0..1) to also profile a share of ordinary traffic.
+PROFILE_SAMPLE_RATE = float(os.environ.get('HR_PROFILE_SAMPLE_RATE', '0'))
+PROFILE_INTERVAL_MS = 5
+PROFILE_TOKEN_MAX_AGE = 3600
+PROFILE_SPOOL_DIR = os.environ.get('HR_PROFILE_SPOOL_DIR', os.path.join(tempfile.gettempdir(), 'hr-portal-profiles'))
+PROFILE_SPOOL_KEEP = 50
+
+# Password hashing pool (see api/passwords.py): PBKDF2 runs in this many worker
+# processes per web process, niced below the request workers. Once
+# PASSWORD_POOL_MAX_PENDING hashes are queued or running, login answers 503
+# with Retry-After instead of queueing more. Keep the limit well below the
+# server's thread count: every pending hash holds a request thread while it
+# waits. 0 workers hashes inline. CSV imports hash in the same pool and wait
+# for a free slot instead of being refused.
+PASSWORD_POOL_WORKERS = int(os.environ.get('HR_PASSWORD_POOL_WORKERS', max(1, (os.cpu_count() or 2) // 2)))
+PASSWORD_POOL_MAX_PENDING = int(os.environ.get('HR_PASSWORD_POOL_MAX_PENDING', 4 * max(PASSWORD_POOL_WORKERS, 1)))
+PASSWORD_POOL_NICE = 10
+
+# Signed access tokens from login (see api/tokens.py and `manage.py
+# access_tokens`). HR_ACCESS_TOKEN_KEYS="k2:<secret>,k1:<secret>": the first
+# key signs, every listed key verifies. To rotate, put a new key first and
+# remove the old one after ACCESS_TOKEN_TTL seconds. Unset, a key derived
+# from SECRET_KEY is used.
+ACCESS_TOKEN_KEYS = [
+    tuple(pair.split(':', 1)) for pair in os.environ.get('HR_ACCESS_TOKEN_KEYS', '').split(',') if ':' in pair
+]
+ACCESS_TOKEN_TTL = 12 * 3600
+ACCESS_TOKEN_REVOCATION_REFRESH = 30
+ACCESS_TOKEN_BLOOM_BITS = 1 << 16
+ACCESS_TOKEN_BLOOM_REBUILD = 3600
+# Revocations are announced to the other processes through this cache alias,
+# so it must be shared by every process serving the API: a file cache on one
+# host (HR_ACCESS_TOKEN_CACHE_DIR), Redis or Memcached across hosts. With a
+# per-process cache they only see new revocations on the
+# ACCESS_TOKEN_REVOCATION_REFRESH timer.
+ACCESS_TOKEN_CACHE = 'access-tokens'
+CACHES['access-tokens'] = {
+    'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+    'LOCATION': os.environ.get(
+        'HR_ACCESS_TOKEN_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'hr-portal-access-tokens'),
+    ),
+}
+
+REST_FRAMEWORK = {
+    # orjson-backed JSON rendering (api/renderers.py; orjson is in
+    # requirements.txt), falling back to DRF's encoder if it is missing.
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    # Bearer tokens (api/tokens.py) are tried before DRF's default session
+    # and basic authentication.
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'api.tokens.SignedTokenAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+        'rest_framework.authentication.BasicAuthentication',
+    ],
+}
@@ -7,6 +7,7 @@ import LeaveList from './components/LeaveList';
   import MyLeaves from './components/MyLeaves';
 import EmployeeTasks from './components/EmployeeTasks';
 import EmployeeAttendance from './components/EmployeeAttendance';
+import { signOut } from './auth.js';
 
 // EmployeeDashboard component re-uses HR dashboard layout CSS and Tailwind utilities for inner styling
 export default function EmployeeDashboard() {
@@ -243,7 +244,7 @@ export default function EmployeeDashboard() {
 
       <div
         className="hr-menu-item hr-logout"
-        onClick={() => { localStorage.removeItem('employeeUser'); window.location.href = '/login'; }}
+        onClick={async () => { await signOut('employeeUser'); window.location.href = '/login'; }}
         style={{ padding: '1rem 1.5rem', cursor: 'pointer', display: 'flex', alignItems: 'center', gap: 12, color: '#ff4d4f', fontWeight: 500, fontSize: 17 }}
       >
         Logout
@@ -361,7 +362,8 @@ export default function EmployeeDashboard() {
                           const res = await axios.post('http://127.0.0.1:8000/api/employees/change-password/', payload);
                           // on success
                           setShowPwModal(false);
-                          try { localStorage.removeItem('employeeUser'); } catch (e) {}
+                          // the change revoked every token issued so far
+                          await signOut('employeeUser');
                           window.alert(res.data?.message || 'Password updated successfully');
                           // redirect to login
                           navigateLocal('/login');
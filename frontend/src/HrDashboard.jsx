@@ -9,6 +9,7 @@ import HrLeaveManagement from './components/HrLeaveManagement';
 import HRAttendance from './components/HRAttendance';
 import HrCharts from './components/HrCharts';
 import HrTasks from './components/HrTasks'; // << added import
+import { signOut } from './auth.js';
 
 const sidebarMenu = [
   { label: 'Dashboard', icon: <FaHome />, path: 'dashboard' },
@@ -429,7 +430,7 @@ const HrDashboard = () => {
   const handleViewEmployees = () => { navigate('/hr-dashboard/view-employees'); setView('employees'); };
   const handleEditEmployee = (id) => { setSelectedEmployee(id); navigate(`/hr-dashboard/edit/${id}`); setView('editEmployee'); };
   const handleDeleteEmployee = (id) => { setSelectedEmployee(id); navigate(`/hr-dashboard/delete/${id}`); setView('deleteEmployee'); };
-  const handleLogout = () => { try { localStorage.removeItem('hrUser'); } catch (e) {} ; navigate('/login'); };
+  const handleLogout = async () => { await signOut('hrUser'); navigate('/login'); };
   const handleProfileMenu = () => { navigate('/profile'); };
   const handleNavigate = (path) => {
     // if full path provided, navigate directly
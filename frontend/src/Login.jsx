@@ -1,6 +1,7 @@
 import React, { useState } from 'react';
 import axios from 'axios';
 import { useNavigate } from 'react-router-dom';
+import { saveToken } from './auth.js';
 import './Login.css';
 
 const Login = () => {
@@ -14,11 +15,14 @@ const Login = () => {
     e.preventDefault();
     setLoading(true);
     setError('');
+    // a stale token from an earlier session must not ride along with the credentials
+    saveToken(null);
     try {
       const response = await axios.post('http://127.0.0.1:8000/api/login/', {
         email,
         password,
       });
+      saveToken(response.data.token);
       if (response.data.role === 'hr') {
         try { localStorage.setItem('hrUser', JSON.stringify(response.data.data)); } catch (e) {}
         navigate('/hr-dashboard');
@@ -0,0 +1,43 @@
+import axios from 'axios';
+
+// Signed access token from /api/login/, sent as `Authorization: Bearer` on
+// every API call (see installTokenHeader). Where the API checks it, it
+// takes the place of the employee/HR ids passed as parameters.
+const TOKEN_KEY = 'accessToken';
+
+export function saveToken(token) {
+  try {
+    if (token) localStorage.setItem(TOKEN_KEY, token);
+    else localStorage.removeItem(TOKEN_KEY);
+  } catch (e) {}
+}
+
+export function getToken() {
+  try { return localStorage.getItem(TOKEN_KEY); } catch (e) { return null; }
+}
+
+export function installTokenHeader() {
+  axios.interceptors.request.use((config) => {
+    const token = getToken();
+    if (token && !config.headers.Authorization) {
+      config.headers.Authorization = `Bearer ${token}`;
+    }
+    return config;
+  });
+  axios.interceptors.response.use(undefined, (error) => {
+    // expired or revoked: drop it so the next login starts clean
+    if (error.response?.status === 401 && error.config?.headers?.Authorization) saveToken(null);
+    return Promise.reject(error);
+  });
+}
+
+// Revoke the token server-side, then forget the signed-in user.
+export async function signOut(userKey) {
+  const token = getToken();
+  saveToken(null);
+  try { localStorage.removeItem(userKey); } catch (e) {}
+  if (!token) return;
+  try {
+    await axios.post('http://127.0.0.1:8000/api/auth/logout/', {}, { headers: { Authorization: `Bearer ${token}` } });
+  } catch (e) {}
+}
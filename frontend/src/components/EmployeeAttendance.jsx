@@ -16,7 +16,8 @@ export default function EmployeeAttendance({ employeeId }) {
     setLoading(true);
     try {
       const res = await axios.get('http://127.0.0.1:8000/api/attendance/', { params: { date: new Date().toISOString().slice(0,10), employee: employeeId } });
-      setTodayRecord(res.data && res.data.length ? res.data[0] : null);
+      const results = (res.data && res.data.results) || [];
+      setTodayRecord(results.length ? results[0] : null);
     } catch (err) {
       setError('Failed to fetch today\'s attendance');
     } finally {
@@ -32,8 +33,15 @@ export default function EmployeeAttendance({ employeeId }) {
       const params = { employee: employeeId };
       if (startDate) params.start_date = startDate;
       if (endDate) params.end_date = endDate;
-      const res = await axios.get('http://127.0.0.1:8000/api/attendance/', { params });
-      setRecords(res.data || []);
+      // follow the cursor so the selected range is shown in full
+      let all = [];
+      let cursor = null;
+      do {
+        const res = await axios.get('http://127.0.0.1:8000/api/attendance/', { params: cursor ? { ...params, cursor } : params });
+        all = all.concat(res.data.results || []);
+        cursor = res.data.next;
+      } while (cursor);
+      setRecords(all);
     } catch (err) {
       setError('Failed to fetch records');
       setRecords([]);
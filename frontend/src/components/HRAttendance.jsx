@@ -7,8 +7,10 @@ export default function HRAttendance() {
   const [records, setRecords] = useState([]);
   const [filters, setFilters] = useState({ q: '', department: '', start_date: '', end_date: '' });
   const [error, setError] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
 
-  const fetchRecords = async () => {
+  // pass a cursor to append the next page; without one the list is reloaded
+  const fetchRecords = async (cursor = null) => {
     setLoading(true);
     setError(null);
     try {
@@ -17,11 +19,15 @@ export default function HRAttendance() {
       if (filters.department) params.department = filters.department;
       if (filters.start_date) params.start_date = filters.start_date;
       if (filters.end_date) params.end_date = filters.end_date;
+      if (cursor) params.cursor = cursor;
       const res = await axios.get('http://127.0.0.1:8000/api/attendance/', { params });
-      setRecords(res.data);
+      const page = res.data.results || [];
+      setRecords(prev => (cursor ? [...prev, ...page] : page));
+      setNextCursor(res.data.next || null);
     } catch (err) {
       setError('Failed to load attendance records');
       setRecords([]);
+      setNextCursor(null);
     } finally {
       setLoading(false);
     }
@@ -40,7 +46,7 @@ export default function HRAttendance() {
           <input name="department" placeholder="Department" value={filters.department} onChange={handleFilterChange} />
           <input name="start_date" type="date" value={filters.start_date} onChange={handleFilterChange} />
           <input name="end_date" type="date" value={filters.end_date} onChange={handleFilterChange} />
-          <button className="btn-primary" onClick={fetchRecords}>Apply</button>
+          <button className="btn-primary" onClick={() => fetchRecords()}>Apply</button>
         </div>
       </div>
 
@@ -73,6 +79,9 @@ export default function HRAttendance() {
               )}
             </tbody>
           </table>
+          {nextCursor && (
+            <button className="btn-primary mt-3" onClick={() => fetchRecords(nextCursor)}>Load more</button>
+          )}
         </div>
       )}
       {error && <div className="text-red-600 mt-3">{error}</div>}
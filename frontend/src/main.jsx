@@ -1,8 +1,15 @@
 import { StrictMode } from 'react';
 import { createRoot } from 'react-dom/client';
 import { BrowserRouter } from 'react-router-dom';
+import axios from 'axios';
 import './index.css';
 import App from './App.jsx';
+import { installTokenHeader } from './auth.js';
+
+// the API pins a client to its primary database for a few seconds after a
+// write with a cookie, so send cookies on the cross-origin API calls
+axios.defaults.withCredentials = true;
+installTokenHeader();
 
 createRoot(document.getElementById('root')).render(
   <StrictMode>